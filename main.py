@@ -1,50 +1,100 @@
+import json
 import os
 from dotenv import load_dotenv
-from flask import Flask, render_template, request
-from app.api import WLEDAPI
-from app.control import reset_segment_and_apply_effect
-from app.WLED_data import get_effects_and_palettes
+from flask import Flask, Response, jsonify, render_template, request
+from src.utils.wled_cluster import controller_from_config
+from src.utils.web_control import MetadataCache, StateBroadcaster
 
-# Load environment variables from .env
+# Load environment variables from .env, falling back to config.json
 load_dotenv()
-WLED_IP = os.getenv("WLED_IP")
+with open("config.json", "r") as config_file:
+    config = json.load(config_file)
+WLED_IP = os.getenv("WLED_IP") or config.get("wled_ip")
+METADATA_TTL = config.get("metadata_ttl", 300)  # Seconds before effect/palette lists are refreshed
 
-if not WLED_IP:
-    raise ValueError("WLED_IP is not set in the .env file")
+if not WLED_IP and not config.get("devices"):
+    raise ValueError("WLED_IP is not set in the .env file or config.json")
 
-# Initialize Flask app and WLED API
+# State changes are queued to a background sender per board, so requests never wait on the LEDs
 app = Flask(__name__)
-api = WLEDAPI(WLED_IP)
+controller = controller_from_config({**config, "wled_ip": WLED_IP, "led_count": config.get("led_count", 100)},
+                                    pipelined=True)
+LED_COUNT = controller.led_count
+controller.reset_segments()  # The UI drives segment 0, so drop any bands left by hybrid_show
+metadata = MetadataCache(controller, ttl=METADATA_TTL)
+broadcaster = StateBroadcaster()
+
+
+def initial_state():
+    """
+    Seeds the UI state from the device, or from defaults if it does not answer.
+    """
+    state = controller.get_json("state") or {}
+    segment = (state.get("seg") or [{}])[0]
+    return {
+        "effect_id": segment.get("fx", 0),
+        "palette_id": segment.get("pal", 0),
+        "brightness": state.get("bri", 128),
+        "led_count": segment.get("stop", LED_COUNT),
+    }
+
+
+def apply_state(values):
+    """
+    Queues an effect change and publishes the new state to every browser.
+    :param values: Mapping with any of effect_id, palette_id, brightness and led_count.
+    :return: The merged state.
+    """
+    current = broadcaster.state
+    state = {key: int(values.get(key, current[key])) for key in ("effect_id", "palette_id", "brightness", "led_count")}
+    payload = {
+        "on": True,
+        "bri": state["brightness"],
+        "seg": [
+            {
+                "id": 0,
+                "start": 0,
+                "stop": state["led_count"],
+                "fx": state["effect_id"],
+                "pal": state["palette_id"],
+                "frz": False
+            }
+        ]
+    }
+    controller.set_state(payload)
+    return broadcaster.publish(state)
+
+
+broadcaster.publish(initial_state())
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    # Fetch dynamic data
-    effects, palettes = get_effects_and_palettes(api)
-
     if request.method == "POST":
-        effect_id = int(request.form.get("effect_id"))
-        palette_id = int(request.form.get("palette_id"))
-        brightness = int(request.form.get("brightness"))
-        led_count = int(request.form.get("led_count"))
-        
-        # Apply effect with the selected parameters
-        payload = {
-            "on": True,
-            "bri": brightness,
-            "seg": [
-                {
-                    "id": 0,
-                    "start": 0,
-                    "stop": led_count,
-                    "fx": effect_id,
-                    "pal": palette_id,
-                    "frz": False
-                }
-            ]
-        }
-        api.set_state(payload)
-
-    return render_template("index.html", effects=effects, palettes=palettes)
+        apply_state(request.form)
+
+    return render_template("index.html", effects=metadata.effects(), palettes=metadata.palettes(),
+                           state=broadcaster.state)
+
+
+@app.route("/state", methods=["POST"])
+def update_state():
+    try:
+        state = apply_state(request.get_json(silent=True) or request.form)
+    except (TypeError, ValueError):
+        return jsonify({"error": "effect_id, palette_id, brightness and led_count must be integers"}), 400
+    return jsonify(state), 202
+
+
+@app.route("/events")
+def events():
+    return Response(broadcaster.events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    try:
+        # The reloader would start a second controller and sender thread
+        app.run(debug=True, threaded=True, use_reloader=False)
+    finally:
+        controller.close()
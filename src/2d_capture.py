@@ -1,8 +1,13 @@
 import json
 import os
 import cv2
-from utils.wled_controller import WLEDController
+from utils.wled_cluster import controller_from_config
 from utils.camera_controller import CameraFeed, BrightSpot
+from utils.capture import capture_ids, capture_single, capture_binary, prepare_capture, setup_camera
+from utils.capture_journal import CaptureJournal
+from utils.capture_recording import record_capture, decode_recording
+from utils.led_map import json_to_binary, binary_path_for
+from utils.profiling import Profiler
 
 
 def main():
@@ -10,24 +15,27 @@ def main():
     with open("config.json", "r") as config_file:
         config = json.load(config_file)
 
-    WLED_IP = config["wled_ip"]
     LED_COUNT = config["led_count"]
     THRESHOLD = config.get("threshold", 200)  # Default threshold for bright spot detection
     MIN_CONTOUR_AREA = config.get("min_contour_area", 50)  # Default minimum contour area
     PREVIEW_WINDOW_NAME = "Camera Preview"
     OUTPUT_FOLDER = "data"
-    XRES = config.get("xres", 1920)
-    YRES = config.get("yres", 1080)
-    EXPOSURE = config.get("exposure", -7)
+    CAPTURE_MODE = config.get("capture_mode", "single")  # "single", "binary" or "record"
+    DETECT_DOWNSCALE = config.get("detect_downscale", 1)  # >1 enables the fast ROI detector
+    BACKGROUND_SUBTRACTION = config.get("background_subtraction", False)
+    REFERENCE_FRAMES = config.get("reference_frames", 5)
+    RETRY_FAILED = config.get("retry_failed", True)  # Second pass over LEDs that were not found
+    PROFILE = config.get("profile", False)  # Time each capture step and save data/capture_profile.json
+    RECORD_HOLD_MS = config.get("record_hold_ms")  # Time each LED is lit when recording, None to derive it
+    DECODE_WORKERS = config.get("decode_workers")  # Processes decoding a recording, None for one per core
 
     # Initialize components
-    wled = WLEDController(WLED_IP, LED_COUNT)
+    wled = controller_from_config(config)
     camera = CameraFeed(camera_index=0)
-    detector = BrightSpot(threshold=THRESHOLD, min_contour_area=MIN_CONTOUR_AREA)
+    detector = BrightSpot(threshold=THRESHOLD, min_contour_area=MIN_CONTOUR_AREA, downscale=DETECT_DOWNSCALE)
 
-    # Initialize camera
-    camera.initialize_camera()
-    camera.set_camera_parameters(resolution=(XRES, YRES), exposure=EXPOSURE)
+    # Initialize camera; detection runs on native frames and the transforms map the centroids
+    setup_camera(camera, config)
 
     # Allow the user to preview the camera feed before starting
     print("Previewing camera feed. Press 's' to start LED capture or 'q' to quit.")
@@ -53,41 +61,60 @@ def main():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     output_file = os.path.join(OUTPUT_FOLDER, "2d_map.json")
 
-    led_positions = []  # List to store LED position data
-
-    # Close preview and turn off all LEDs to start
-    wled.turn_off_all_leds()
-
-    print("Capturing LED positions...")
-    for led_id in range(LED_COUNT):
-        # Turn on a single LED
-        wled.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
-        # Wait for the LED to stabilize
-        cv2.waitKey(250)
-
-        # Capture frame from camera
-        ret, frame = camera.cap.read()
-        if not ret:
-            print(f"Error: Could not capture frame for LED {led_id}.")
-            led_positions.append({"id": led_id, "position": None})
-            continue
-
-        # Apply transformations and detect the bright spot
-        frame = camera.apply_transformations(frame)
-        bright_spot = detector.find_bright_spot(frame)
-        if bright_spot:
-            x, y = bright_spot
-            print(f"LED {led_id}: Bright spot found at ({x}, {y})")
-            led_positions.append({"id": led_id, "position": [x, y]})
-        else:
-            print(f"LED {led_id}: No bright spot detected.")
-            led_positions.append({"id": led_id, "position": None})
+    # Results are journaled as they arrive, so a crashed capture picks up where it stopped
+    try:
+        journal = CaptureJournal(os.path.join(OUTPUT_FOLDER, "2d_capture.journal"), LED_COUNT)
+    except ValueError as e:
+        print(e)
+        camera.close_camera()
+        return
+    if journal.entries:
+        print(f"Resuming capture: {len(journal.entries)} of {LED_COUNT} LEDs already recorded.")
+
+    # A recording reads the camera itself and stamps every frame, so it gets no grabber or reference
+    grabber, settle_ms, lead_ms, retries = prepare_capture(wled, camera, detector, config,
+                                                           recording=CAPTURE_MODE == "record")
+
+    profiler = Profiler(enabled=PROFILE)
+    print(f"Capturing LED positions ({CAPTURE_MODE} mode)...")
+    if CAPTURE_MODE == "record" and not journal.entries:
+        # Only drive the LEDs while frames stream to disk, then detect across every core
+        record_folder = os.path.join(OUTPUT_FOLDER, "recording")
+        record_capture(wled, camera, record_folder, LED_COUNT, settle_ms=settle_ms, lead_ms=lead_ms,
+                       hold_ms=RECORD_HOLD_MS, dark_frames=REFERENCE_FRAMES)
+        print(f"Decoding {record_folder}, re-run with src/decode_capture.py to try other thresholds.")
+        for led in decode_recording(record_folder, THRESHOLD, MIN_CONTOUR_AREA, BACKGROUND_SUBTRACTION,
+                                    workers=DECODE_WORKERS):
+            journal.record(led["id"], led["position"])
+    elif CAPTURE_MODE == "binary" and not journal.entries:
+        for led in capture_binary(wled, camera, detector, LED_COUNT, settle_ms=settle_ms, grabber=grabber,
+                                  retries=retries, profiler=profiler):
+            journal.record(led["id"], led["position"])
+    else:
+        capture_single(wled, camera, detector, LED_COUNT, settle_ms=settle_ms, grabber=grabber, journal=journal,
+                       retries=retries, profiler=profiler)
+
+    failed_ids = journal.failed_ids()
+    if RETRY_FAILED and failed_ids:
+        print(f"Retrying {len(failed_ids)} LEDs that were not found...")
+        wled.turn_off_all_leds()
+        capture_ids(wled, camera, detector, failed_ids, settle_ms=settle_ms, grabber=grabber, journal=journal,
+                    retries=retries, profiler=profiler)
+    led_positions = journal.positions(LED_COUNT)
+
+    if grabber is not None:
+        grabber.stop()
 
     # Save the captured data to JSON
     with open(output_file, "w") as json_file:
         json.dump(led_positions, json_file, indent=4)
+    json_to_binary(output_file, binary_path_for(output_file))
+    journal.remove()
 
     print(f"LED position capture complete. Data saved to {output_file}")
+    if PROFILE:
+        print(profiler.format())
+        profiler.dump(os.path.join(OUTPUT_FOLDER, "capture_profile.json"))
 
     # Turn off all LEDs and close the camera
     wled.turn_off_all_leds()
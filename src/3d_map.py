@@ -0,0 +1,52 @@
+import json
+import os
+import numpy as np
+from utils.led_map import load_positions, save_binary_map
+from utils.triangulation import triangulate
+
+
+def main():
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    LED_COUNT = config["led_count"]
+    OUTPUT_FOLDER = "data"
+    # Each view is a 2D map captured with the tree rotated to a known angle
+    VIEWS = config.get("views", [])
+
+    if len(VIEWS) < 2:
+        print("Error: At least two views are needed. Add them to config.json as "
+              "\"views\": [{\"map\": \"data/2d_map_0.json\", \"angle\": 0}, ...]")
+        return
+
+    observations = []
+    angles = []
+    for i, view in enumerate(VIEWS):
+        if not os.path.exists(view["map"]):
+            print(f"Error: {view['map']} not found.")
+            return
+        positions, valid = load_positions(view["map"], LED_COUNT)
+        print(f"View {view['map']}: {valid.sum()} of {LED_COUNT} LEDs seen")
+        observations.append(positions)
+        angles.append(view.get("angle", i * 360.0 / len(VIEWS)))
+
+    print(f"Triangulating {LED_COUNT} LEDs from {len(VIEWS)} views...")
+    positions, valid, errors = triangulate(np.stack(observations), angles)
+    for view, error in zip(VIEWS, errors):
+        print(f"  {view['map']}: reprojection error {error:.2f} px")
+
+    led_positions = [
+        {"id": led_id, "position": [round(float(v), 2) for v in positions[led_id]] if valid[led_id] else None}
+        for led_id in range(LED_COUNT)
+    ]
+    output_file = os.path.join(OUTPUT_FOLDER, "3d_map.json")
+    with open(output_file, "w") as json_file:
+        json.dump(led_positions, json_file, indent=4)
+    save_binary_map(os.path.join(OUTPUT_FOLDER, "3d_map.bin"), np.arange(LED_COUNT), positions, valid)
+
+    print(f"3D map complete: {valid.sum()} of {LED_COUNT} LEDs solved. Data saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
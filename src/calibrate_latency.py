@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+from utils.wled_cluster import controller_from_config
+from utils.camera_controller import CameraFeed, BrightSpot
+from utils.capture import setup_camera
+from utils.latency import LATENCY_FILE, measure_latency, save_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure command-to-light latency for adaptive settle times.")
+    parser.add_argument("--led", type=int, default=0, help="LED to toggle; it must be visible to the camera.")
+    parser.add_argument("--trials", type=int, default=20, help="Number of on/off cycles.")
+    args = parser.parse_args()
+
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    wled = controller_from_config(config)
+    camera = CameraFeed(camera_index=0)
+    detector = BrightSpot(threshold=config.get("threshold", 200),
+                          min_contour_area=config.get("min_contour_area", 50),
+                          downscale=config.get("detect_downscale", 1))
+    setup_camera(camera, config)
+
+    # Exposure timestamps from the grabber are much tighter than blocking read times
+    grabber = camera.start_grabber() if config.get("threaded_capture", False) else None
+    try:
+        print(f"Toggling LED {args.led} {args.trials} times...")
+        samples, round_trips = measure_latency(wled, camera, detector, args.led, args.trials, grabber)
+    finally:
+        if grabber is not None:
+            grabber.stop()
+        camera.close_camera()
+        wled.close()
+
+    os.makedirs(os.path.dirname(LATENCY_FILE), exist_ok=True)
+    summary = save_latency(LATENCY_FILE, samples, round_trips)
+    if "p95_ms" not in summary:
+        print(f"Error: LED {args.led} was never detected, check the camera view and threshold.")
+        return
+    print(f"Latency p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, "
+          f"max {summary['max_ms']:.1f} ms, round trip {summary['round_trip_ms']:.1f} ms, "
+          f"{summary['missed']} missed. Saved to {LATENCY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+from utils.led_map import json_to_binary, binary_to_json
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python src/convert_map.py <input> <output>  (.json <-> .bin)")
+        return
+
+    source, destination = sys.argv[1], sys.argv[2]
+    if not os.path.exists(source):
+        print(f"Error: {source} not found.")
+        return
+
+    if source.endswith(".json") and destination.endswith(".bin"):
+        json_to_binary(source, destination)
+    elif source.endswith(".bin") and destination.endswith(".json"):
+        binary_to_json(source, destination)
+    else:
+        print("Error: Convert either .json to .bin or .bin to .json.")
+        return
+    print(f"Converted {source} to {destination}")
+
+
+if __name__ == "__main__":
+    main()
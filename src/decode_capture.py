@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+from utils.capture_recording import decode_recording
+from utils.led_map import json_to_binary, binary_path_for
+
+
+def main():
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    parser = argparse.ArgumentParser(description="Detect LED positions in a recording made with capture_mode 'record'.")
+    parser.add_argument("folder", nargs="?", default=os.path.join("data", "recording"), help="Recording folder.")
+    parser.add_argument("--output", default=os.path.join("data", "2d_map.json"), help="Map file to write.")
+    parser.add_argument("--threshold", type=int, default=config.get("threshold", 200))
+    parser.add_argument("--min-area", type=int, default=config.get("min_contour_area", 50))
+    parser.add_argument("--background", action=argparse.BooleanOptionalAction,
+                        default=config.get("background_subtraction", False),
+                        help="Subtract the dark frames recorded before the first LED.")
+    parser.add_argument("--settle-ms", type=float, help="Override the recorded settle time.")
+    parser.add_argument("--lead-ms", type=float, help="Override the recorded lead time.")
+    parser.add_argument("--workers", type=int, default=config.get("decode_workers"),
+                        help="Decode processes, defaults to one per core.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.folder):
+        print(f"Error: {args.folder} not found.")
+        return
+
+    led_positions = decode_recording(args.folder, args.threshold, args.min_area, args.background,
+                                     args.settle_ms, args.lead_ms, args.workers)
+    with open(args.output, "w") as json_file:
+        json.dump(led_positions, json_file, indent=4)
+    json_to_binary(args.output, binary_path_for(args.output))
+
+    found = sum(1 for led in led_positions if led["position"])
+    print(f"Decoded {found} of {len(led_positions)} LEDs. Data saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,37 @@
 import json
-from src.utils.wled_controller import WLEDController
+import os
+from src.utils.wled_cluster import controller_from_config
+from src.utils.spatial_index import load_or_build_index
 
 # Load configuration from config.json
 with open("config.json", "r") as config_file:
     config = json.load(config_file)
 
 # Configuration variables
-WLED_IP = config["wled_ip"]
-LED_COUNT = config["led_count"]
+MAP_FILE = os.path.join("data", "2d_map.json")
 
 def main():
-    # Initialize the WLEDController
-    controller = WLEDController(WLED_IP, LED_COUNT)
+    # Initialize the WLEDController, or a cluster when config lists several devices
+    controller = controller_from_config(config)
+    LED_COUNT = controller.led_count
 
     # Turn off all LEDs
     controller.turn_off_all_leds()
 
-    # Prompt the user for the LED ID
+    # Prompt the user for the LED ID, or a map coordinate to highlight the nearest LED
     try:
-        led_id = int(input(f"Enter the LED ID to highlight (0 to {LED_COUNT - 1}): ").strip())
-        
+        entry = input(f"Enter the LED ID to highlight (0 to {LED_COUNT - 1}) or an x,y map position: ").strip()
+        if "," in entry:
+            point = [float(value) for value in entry.split(",")]
+            if not os.path.exists(MAP_FILE):
+                print(f"Error: {MAP_FILE} not found.")
+                return
+            ids, distances = load_or_build_index(MAP_FILE, LED_COUNT).nearest([point])
+            led_id = int(ids[0])
+            print(f"Nearest LED to {tuple(point)} is {led_id} ({distances[0]:.1f} away).")
+        else:
+            led_id = int(entry)
+
         # Check if the input is within range
         if 0 <= led_id < LED_COUNT:
             # Highlight the specified LED
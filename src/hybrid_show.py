@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+from utils.wled_cluster import controller_from_config
+from utils.led_map import load_positions, normalize_positions, preferred_map_path
+from utils.segment_planner import MAX_SEGMENTS, plan_bands, segment_effects
+
+MAP_FILE = preferred_map_path(os.path.join("data", "2d_map.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run native WLED effects per height band of the tree.")
+    parser.add_argument("--bands", type=int, default=4, help="Number of equal height bands.")
+    parser.add_argument("--fx", type=int, nargs="+", default=[9], help="Effect ID per band, repeated if fewer.")
+    parser.add_argument("--pal", type=int, nargs="+", default=[0], help="Palette ID per band, repeated if fewer.")
+    parser.add_argument("--speed", type=int, nargs="+", default=[128], help="Effect speed per band (0-255).")
+    parser.add_argument("--brightness", type=int, help="Master brightness (0-255).")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without sending it.")
+    parser.add_argument("--reset", action="store_true", help="Restore a single full-strip segment and exit.")
+    args = parser.parse_args()
+
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    if args.reset:
+        controller = controller_from_config(config)
+        try:
+            controller.reset_segments()
+        finally:
+            controller.close()
+        print("Restored a single full-strip segment.")
+        return
+
+    LED_COUNT = config["led_count"]
+    MAX_SEGMENTS_PER_DEVICE = config.get("max_segments", MAX_SEGMENTS)  # 16 on ESP8266, 32 on ESP32 builds
+    if config.get("devices"):
+        # Bands crossing a board boundary become a segment on each board
+        LED_COUNT = max(device["start"] + device["count"] for device in config["devices"])
+
+    positions, valid = load_positions(MAP_FILE, LED_COUNT)
+    plan = plan_bands(normalize_positions(positions), valid, bands=args.bands, max_segments=MAX_SEGMENTS_PER_DEVICE)
+    effects = [{"fx": args.fx[band % len(args.fx)], "pal": args.pal[band % len(args.pal)],
+                "sx": args.speed[band % len(args.speed)]} for band in range(args.bands)]
+    segments = segment_effects(plan, effects)
+
+    for band, segment in zip((run["band"] for run in plan), segments):
+        print(f"LEDs {segment['start']}-{segment['stop'] - 1}: band {band}, effect {segment['fx']}, "
+              f"palette {segment['pal']}{', reversed' if segment['rev'] else ''}")
+    if args.dry_run:
+        return
+
+    controller = controller_from_config(config)
+    try:
+        controller.set_segments(segments, args.brightness, MAX_SEGMENTS_PER_DEVICE)
+    finally:
+        controller.close()
+    print(f"Sent {len(segments)} segments for {args.bands} bands.")
+
+
+if __name__ == "__main__":
+    main()
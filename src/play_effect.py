@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+from utils.wled_cluster import controller_from_config
+from utils.effects import EffectEngine, PlaneSweep, RadialWave, NoiseField, TextScroll
+from utils.scheduler import FrameScheduler
+from utils.led_map import preferred_map_path
+
+EFFECTS = {
+    "sweep": PlaneSweep,
+    "radial": RadialWave,
+    "noise": NoiseField,
+    "text": TextScroll,
+}
+
+
+def main():
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    LED_COUNT = config["led_count"]
+    FPS = config.get("fps", 40)
+    MAP_FILE = preferred_map_path(os.path.join("data", "2d_map.json"))
+    effect_name = sys.argv[1] if len(sys.argv) > 1 else "sweep"
+
+    if effect_name not in EFFECTS:
+        print(f"Error: Unknown effect '{effect_name}'. Choose from {', '.join(EFFECTS)}.")
+        return
+
+    controller = controller_from_config(config, realtime_protocol=config.get("realtime_protocol", "ddp"))
+    engine = EffectEngine.from_map(MAP_FILE, LED_COUNT)
+    engine.set_effect(EFFECTS[effect_name]())
+
+    print(f"Playing '{effect_name}' at {FPS} FPS. Press Ctrl+C to stop.")
+    scheduler = FrameScheduler(
+        render=lambda frame_index, t: engine.render(t),
+        send=controller.send_frame,
+        fps=FPS,
+        report_every=5.0,
+    )
+    try:
+        scheduler.run()
+    finally:
+        controller.close()
+
+
+if __name__ == "__main__":
+    main()
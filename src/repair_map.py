@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+from utils.led_map import load_positions, json_to_binary, binary_path_for
+from utils.map_repair import find_outliers, interpolate_missing
+
+
+def recapture(config, led_ids):
+    """
+    Re-captures only the given LEDs with the camera, returning {id: position or None}.
+    """
+    from utils.wled_cluster import controller_from_config
+    from utils.camera_controller import CameraFeed, BrightSpot
+    from utils.capture import capture_ids, prepare_capture, setup_camera
+
+    wled = controller_from_config(config)
+    camera = CameraFeed(camera_index=0)
+    detector = BrightSpot(threshold=config.get("threshold", 200),
+                          min_contour_area=config.get("min_contour_area", 50),
+                          downscale=config.get("detect_downscale", 1))
+    # The map being repaired was captured with these transforms, so new points must be too
+    setup_camera(camera, config)
+    grabber = None
+    try:
+        # Same grabber, settle time, retries and dark reference as 2d_capture.py
+        grabber, settle_ms, _, retries = prepare_capture(wled, camera, detector, config)
+        results = capture_ids(wled, camera, detector, led_ids, settle_ms=settle_ms, grabber=grabber,
+                              retries=retries)
+    finally:
+        if grabber is not None:
+            grabber.stop()
+        wled.turn_off_all_leds()
+        wled.close()
+        camera.close_camera()
+    return {led["id"]: led["position"] for led in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag, re-capture and interpolate bad LED map points.")
+    parser.add_argument("--map", default=os.path.join("data", "2d_map.json"), help="Map file to repair in place.")
+    parser.add_argument("--factor", type=float, default=4.0, help="Outlier distance as a multiple of LED spacing.")
+    parser.add_argument("--min-step", type=float, default=0.05,
+                        help="Fraction of LED spacing below which two LEDs are on the same spot.")
+    parser.add_argument("--recapture", action="store_true", help="Re-capture flagged LEDs with the camera first.")
+    args = parser.parse_args()
+
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+    LED_COUNT = config["led_count"]
+
+    if not os.path.exists(args.map):
+        print(f"Error: {args.map} not found.")
+        return
+
+    positions, valid = load_positions(args.map, LED_COUNT)
+    outliers = find_outliers(positions, args.factor, args.min_step)
+    flagged = np.flatnonzero(outliers | ~valid)
+    print(f"{outliers.sum()} outliers and {(~valid).sum()} missing LEDs: {flagged.tolist()}")
+
+    if args.recapture and len(flagged):
+        print(f"Re-capturing {len(flagged)} LEDs...")
+        for led_id, position in recapture(config, flagged.tolist()).items():
+            positions[led_id] = position if position else np.nan
+        # Anything still far from its neighbors is dropped rather than trusted
+        outliers = find_outliers(positions, args.factor, args.min_step)
+    positions[outliers] = np.nan
+
+    filled, interpolated = interpolate_missing(positions)
+    print(f"Interpolated {interpolated.sum()} LEDs from their neighbors.")
+
+    # A map written after the backup comes from a new capture, so it becomes the unrepaired original
+    backup = os.path.splitext(args.map)[0] + ".raw.json"
+    if not os.path.exists(backup) or os.path.getmtime(args.map) > os.path.getmtime(backup):
+        shutil.copyfile(args.map, backup)
+
+    led_positions = []
+    for led_id in range(LED_COUNT):
+        led = {"id": led_id, "position": None if np.isnan(filled[led_id]).any() else
+               [round(float(v), 2) for v in filled[led_id]]}
+        if interpolated[led_id]:
+            led["interpolated"] = True
+        led_positions.append(led)
+    with open(args.map, "w") as json_file:
+        json.dump(led_positions, json_file, indent=4)
+    json_to_binary(args.map, binary_path_for(args.map))
+
+    # The repaired map must not look like a new capture the next time it is repaired
+    repaired_time = os.path.getmtime(args.map)
+    if os.path.getmtime(backup) < repaired_time:
+        os.utime(backup, (repaired_time, repaired_time))
+
+    print(f"Repaired map saved to {args.map} (original kept at {backup})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,48 @@
 import json
-import time
-from utils.wled_controller import WLEDController
+from utils.wled_cluster import controller_from_config
+from utils.scheduler import FrameScheduler
+from utils.latency import LATENCY_FILE, load_settle_ms
 
 # Load configuration from config.json
 with open("config.json", "r") as config_file:
     config = json.load(config_file)
 
 # Configuration variables
-WLED_IP = config["wled_ip"]
 LED_COUNT = config["led_count"]
-SEQUENCE_WAIT = config["sequence_wait"]  # Delay in seconds between LEDs
+SEQUENCE_WAIT = config["sequence_wait"]  # Delay in seconds between LEDs, or "auto" for the measured latency
+if SEQUENCE_WAIT == "auto":
+    SEQUENCE_WAIT = load_settle_ms(LATENCY_FILE, default=250) / 1000.0
+
+
+def chase_order(led_count):
+    """
+    LED IDs for the forward, reverse, forward chase.
+    """
+    return list(range(led_count)) + list(reversed(range(led_count))) + list(range(led_count))
+
 
 def main():
-    # Initialize the WLEDController
-    controller = WLEDController(WLED_IP, LED_COUNT)
+    # Initialize the WLEDController, or a cluster when config lists several devices
+    controller = controller_from_config(config)
 
     # Turn off all LEDs
     controller.turn_off_all_leds()
 
-    # Sequentially turn on each LED
-    for led_id in range(LED_COUNT):
-        controller.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
-        time.sleep(SEQUENCE_WAIT)  # Wait before turning on the next LED
-
-    for led_id in reversed(range(LED_COUNT)):
-        controller.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
-        time.sleep(SEQUENCE_WAIT)
-
-    for led_id in range(LED_COUNT):
-        controller.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
-        time.sleep(SEQUENCE_WAIT)
+    # Step through the chase on a fixed clock; slow requests drop steps instead of adding drift
+    order = chase_order(LED_COUNT)
+    scheduler = FrameScheduler(
+        render=lambda frame_index, t: order[frame_index] if frame_index < len(order) else None,
+        send=lambda led_id: controller.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255),
+        fps=1.0 / SEQUENCE_WAIT,
+        report_every=5.0,
+    )
+    scheduler.run()
+    print(f"Sequence complete: {scheduler.metrics.format()}")
 
     # Turn off all LEDs at the end of the sequence
     controller.turn_off_all_leds()
+    controller.close()
+
 
 if __name__ == "__main__":
     main()
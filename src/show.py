@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import numpy as np
+from utils.wled_cluster import controller_from_config
+from utils.effects import EffectEngine
+from utils.scheduler import FrameScheduler
+from utils.show_cache import ShowCache, compile_show
+from utils.led_map import preferred_map_path
+from play_effect import EFFECTS
+from sequence import chase_order, SEQUENCE_WAIT
+
+SHOW_FOLDER = os.path.join("data", "shows")
+MAP_FILE = preferred_map_path(os.path.join("data", "2d_map.json"))
+
+
+def chase_frames(led_count):
+    """
+    Frames for the forward, reverse, forward chase in sequence.py.
+    """
+    frame = np.zeros((led_count, 3), dtype=np.uint8)
+    for led_id in chase_order(led_count):
+        frame.fill(0)
+        frame[led_id] = 255
+        yield frame
+
+
+def effect_frames(engine, fps, duration):
+    """
+    Frames of a spatial effect rendered at a fixed rate.
+    """
+    for frame_index in range(int(duration * fps)):
+        yield engine.render(frame_index / fps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile and play pre-rendered shows.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="Render a show to a file.")
+    compile_parser.add_argument("source", choices=["chase"] + list(EFFECTS))
+    compile_parser.add_argument("--duration", type=float, default=30.0, help="Seconds of effect to render.")
+    compile_parser.add_argument("--delta", action="store_true", help="Store only changed pixels between frames.")
+    play_parser = subparsers.add_parser("play", help="Play compiled shows in a loop.")
+    play_parser.add_argument("names", nargs="+", help="Show names in data/shows, played in turn.")
+    play_parser.add_argument("--loops", type=int, default=1, help="Times to play each show.")
+    args = parser.parse_args()
+
+    # Load configuration
+    with open("config.json", "r") as config_file:
+        config = json.load(config_file)
+
+    LED_COUNT = config["led_count"]
+    FPS = config.get("fps", 40)
+
+    if args.command == "compile":
+        path = os.path.join(SHOW_FOLDER, f"{args.source}.show")
+        if args.source == "chase":
+            fps = 1.0 / SEQUENCE_WAIT
+            frames = chase_frames(LED_COUNT)
+        else:
+            fps = FPS
+            engine = EffectEngine.from_map(MAP_FILE, LED_COUNT)
+            engine.set_effect(EFFECTS[args.source]())
+            frames = effect_frames(engine, fps, args.duration)
+        count = compile_show(path, frames, LED_COUNT, fps, delta=args.delta)
+        print(f"Compiled {count} frames to {path} ({os.path.getsize(path)} bytes).")
+        return
+
+    controller = controller_from_config(config, realtime_protocol=config.get("realtime_protocol", "ddp"))
+    cache = ShowCache()
+    try:
+        for name in args.names:
+            show = cache.open(os.path.join(SHOW_FOLDER, f"{name}.show"))
+            if show.led_count != LED_COUNT:
+                print(f"Error: {name} was compiled for {show.led_count} LEDs, config has {LED_COUNT}.")
+                continue
+            total = len(show) * args.loops
+            print(f"Playing {name}: {len(show)} frames at {show.fps:.1f} FPS x{args.loops}")
+            scheduler = FrameScheduler(
+                render=lambda frame_index, t: show.frame(frame_index % len(show)) if frame_index < total else None,
+                send=controller.send_frame,
+                fps=show.fps,
+                report_every=5.0,
+            )
+            scheduler.run()
+    finally:
+        cache.close()
+        controller.close()
+
+
+if __name__ == "__main__":
+    main()
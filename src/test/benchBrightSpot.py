@@ -0,0 +1,73 @@
+import glob
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from src.utils.camera_controller import BrightSpot
+
+FRAME_LIMIT = 200
+
+
+def load_frames(source):
+    """
+    Loads recorded frames from a folder of images or a video file.
+    """
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "*.png")) + glob.glob(os.path.join(source, "*.jpg")))
+        return [cv2.imread(path) for path in paths[:FRAME_LIMIT]]
+
+    frames = []
+    cap = cv2.VideoCapture(source)
+    while len(frames) < FRAME_LIMIT:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_frames(count=50, resolution=(1920, 1080)):
+    """
+    Dark noisy frames with one blurred LED each, for when no recording is given.
+    """
+    rng = np.random.default_rng(0)
+    w, h = resolution
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 40, (h, w, 3), dtype=np.uint8)
+        cv2.circle(frame, (int(rng.integers(50, w - 50)), int(rng.integers(50, h - 50))), 7, (255, 255, 255), -1)
+        frames.append(cv2.GaussianBlur(frame, (9, 9), 0))
+    return frames
+
+
+def benchmark(detector, frames, repeats=3):
+    results = [detector.find_bright_spot(frame) for frame in frames]  # Warm up and keep results
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            detector.find_bright_spot(frame)
+    return len(frames) * repeats / (time.perf_counter() - start), results
+
+
+def main():
+    frames = load_frames(sys.argv[1]) if len(sys.argv) > 1 else synthetic_frames()
+    if not frames:
+        print("Error: No frames loaded.")
+        return
+    print(f"Benchmarking on {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    baseline_fps, baseline = benchmark(BrightSpot(threshold=200, min_contour_area=50), frames)
+    print(f"  full resolution: {baseline_fps:.1f} frames/sec")
+    for downscale in (2, 4):
+        fps, results = benchmark(BrightSpot(threshold=200, min_contour_area=50, downscale=downscale), frames)
+        offsets = [np.hypot(a[0] - b[0], a[1] - b[1]) for a, b in zip(baseline, results) if a and b]
+        misses = sum(1 for a, b in zip(baseline, results) if bool(a) != bool(b))
+        drift = f"{np.mean(offsets):.2f}" if offsets else "-"
+        print(f"  fast x{downscale}: {fps:.1f} frames/sec ({fps / baseline_fps:.1f}x), "
+              f"mean offset {drift} px, disagreements {misses}")
+
+
+if __name__ == "__main__":
+    main()
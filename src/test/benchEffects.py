@@ -0,0 +1,25 @@
+import time
+import numpy as np
+from src.utils.effects import EffectEngine, PlaneSweep, RadialWave, NoiseField, TextScroll
+
+LED_COUNT = 5000
+FRAMES = 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    engine = EffectEngine(rng.random((LED_COUNT, 2), dtype=np.float32))
+
+    for effect in (PlaneSweep(), RadialWave(), NoiseField(), TextScroll()):
+        engine.set_effect(effect)
+        engine.render(0.0)  # Warm up
+
+        start = time.perf_counter()
+        for i in range(FRAMES):
+            engine.render(i / 60)
+        per_frame = (time.perf_counter() - start) / FRAMES
+        print(f"{type(effect).__name__:>12}: {per_frame * 1000:.3f} ms/frame for {LED_COUNT} LEDs")
+
+
+if __name__ == "__main__":
+    main()
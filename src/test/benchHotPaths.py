@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+from src.utils.camera_controller import CameraFeed, BrightSpot
+from src.utils.color_pipeline import ColorPipeline
+from src.utils.led_map import load_positions, save_binary_map, json_to_binary
+from src.utils.profiling import Profiler
+from src.utils.simulator import SyntheticCamera, spiral_tree, project
+from src.utils.structured_light import pattern_led_ids
+from src.utils.wled_controller import WLEDController
+
+RESOLUTION = (1920, 1080)
+LED_COUNT = 500
+FIXTURE_FRAMES = 8
+REPEAT = 50
+SEED = 3
+
+
+class PayloadController(WLEDController):
+    """
+    WLEDController that builds and serializes payloads without sending them.
+    """
+    def _post(self, payload):
+        json.dumps(payload)
+        return True
+
+
+def fixture_frames(path=None):
+    """
+    Frames with a single lit LED each, loaded from a recording or rendered from a fixed seed.
+    :param path: Optional .npz with a "frames" array recorded from a real camera.
+    :return: (frames, dark frame).
+    """
+    if path:
+        with np.load(path) as recorded:
+            return list(recorded["frames"]), recorded["dark"] if "dark" in recorded else None
+    points = project(spiral_tree(LED_COUNT, seed=SEED), angle=0, resolution=RESOLUTION)
+    camera = SyntheticCamera(None, points, resolution=RESOLUTION, led_radius=9, seed=SEED,
+                             ambient=[(120, 100, 20, 255)])
+    pixels = np.zeros((LED_COUNT, 3), dtype=np.uint8)
+    dark = camera.render(pixels)
+    frames = []
+    for led_id in np.random.default_rng(SEED).choice(LED_COUNT, FIXTURE_FRAMES, replace=False):
+        pixels.fill(0)
+        pixels[led_id] = 255
+        frames.append(camera.render(pixels))
+    return frames, dark
+
+
+def bench(profiler, name, function, inputs, repeat=REPEAT):
+    function(inputs[0])  # Warm up buffers and caches
+    for _ in range(repeat):
+        for value in inputs:
+            with profiler.span(name):
+                function(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the capture and detection hot paths on fixture frames.")
+    parser.add_argument("--frames", help="Recorded .npz with 'frames' (and optionally 'dark') arrays.")
+    parser.add_argument("--json", help="Write the timing summary to this JSON file.")
+    args = parser.parse_args()
+
+    profiler = Profiler()
+    frames, dark = fixture_frames(args.frames)
+    print(f"{len(frames)} fixture frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    # Detection
+    for downscale in (1, 4):
+        detector = BrightSpot(threshold=200, min_contour_area=50, downscale=downscale)
+        bench(profiler, f"find_bright_spot x{downscale}", detector.find_bright_spot, frames)
+        if dark is not None:
+            detector.set_reference(dark)
+            bench(profiler, f"find_bright_spot x{downscale} ref", detector.find_bright_spot, frames)
+    bench(profiler, "find_bright_spots", BrightSpot().find_bright_spots, frames)
+
+    # Frame transforms
+    camera = CameraFeed()
+    for rotation, mirror in ((0, False), (90, False), (180, True)):
+        camera.rotation, camera.mirror = rotation, mirror
+        bench(profiler, f"apply_transformations {rotation}{'m' if mirror else ''}",
+              camera.apply_transformations, frames)
+    centroids = project(spiral_tree(LED_COUNT, seed=SEED), angle=0, resolution=RESOLUTION)
+    camera.set_undistortion([[1400, 0, RESOLUTION[0] / 2], [0, 1400, RESOLUTION[1] / 2], [0, 0, 1]],
+                            [-0.2, 0.05, 0, 0, 0])
+    camera.set_homography([[1.02, 0.01, -4], [0.0, 0.98, 6], [0.0, 0.00001, 1]])
+    bench(profiler, f"transform_points x{LED_COUNT}",
+          lambda points: camera.transform_points(points, frames[0].shape), [centroids])
+
+    # Map load and save
+    with tempfile.TemporaryDirectory() as folder:
+        json_path = os.path.join(folder, "map.json")
+        bin_path = os.path.join(folder, "map.bin")
+        positions = project(spiral_tree(LED_COUNT, seed=SEED), angle=0, resolution=RESOLUTION)
+        with open(json_path, "w") as json_file:
+            json.dump([{"id": i, "position": [round(float(x), 2), round(float(y), 2)]}
+                       for i, (x, y) in enumerate(positions)], json_file)
+        json_to_binary(json_path, bin_path)
+        valid = np.ones(LED_COUNT, dtype=bool)
+        ids = np.arange(LED_COUNT)
+        bench(profiler, "load_positions json", lambda path: load_positions(path, LED_COUNT), [json_path])
+        bench(profiler, "load_positions bin", lambda path: load_positions(path, LED_COUNT), [bin_path])
+        bench(profiler, "save_binary_map", lambda path: save_binary_map(path, ids, positions, valid), [bin_path])
+        bench(profiler, "json_to_binary", lambda path: json_to_binary(json_path, path), [bin_path])
+
+    # Output color stage; every other frame is over the current budget
+    for led_count in (LED_COUNT, 5000):
+        pipeline = ColorPipeline(led_count, gamma=2.2, white_balance=(1.0, 0.85, 0.7), max_amps=led_count * 0.02)
+        colors = np.random.default_rng(SEED).integers(0, 256, (2, led_count, 3), dtype=np.uint8)
+        colors[1] = 255
+        bench(profiler, f"color_pipeline x{led_count}", pipeline.apply, list(colors))
+
+    # Payload construction
+    controller = PayloadController("127.0.0.1", LED_COUNT)
+    bench(profiler, "turn_on_single_led payload",
+          lambda led_id: controller.turn_on_single_led(led_id), list(range(0, LED_COUNT, 50)))
+    patterns = [pattern_led_ids(LED_COUNT, bit) for bit in range(4)]
+    bench(profiler, "set_leds payload", controller.set_leds, patterns)
+    controller.close()
+
+    print(profiler.format())
+    if args.json:
+        profiler.dump(args.json)
+        print(f"Saved timings to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+import numpy as np
+from src.utils.camera_controller import CameraFeed, BrightSpot
+from src.utils.capture import capture_ids, capture_single, capture_binary, capture_dark_reference
+from src.utils.capture_recording import record_capture, decode_recording
+from src.utils.effects import EffectEngine, PlaneSweep
+from src.utils.latency import measure_latency
+from src.utils.led_map import normalize_positions
+from src.utils.scheduler import FrameScheduler
+from src.utils.simulator import SimulatedWLED, SyntheticCamera, spiral_tree, project
+from src.utils.wled_controller import WLEDController
+
+LED_COUNT = 150
+RESOLUTION = (640, 480)
+CAMERA_FPS = 60
+PLAYBACK_FPS = 60
+PLAYBACK_SECONDS = 3.0
+SEED = 7
+MAX_ERROR_PX = 2.0  # The simulator draws LEDs at whole pixels, so a true centroid is within about 1 px
+
+
+def map_accuracy(led_positions, truth):
+    """
+    Detection rate and pixel error of a captured map against the simulator's ground truth.
+    """
+    found = [led for led in led_positions if led["position"]]
+    if not found:
+        return "0 LEDs found"
+    errors = np.array([np.linalg.norm(np.subtract(led["position"], truth[led["id"]])) for led in found])
+    return (f"{len(found)}/{len(led_positions)} found, error mean {errors.mean():.2f} px, "
+            f"p95 {np.percentile(errors, 95):.2f} px, max {errors.max():.2f} px")
+
+
+def run_capture(name, capture, truth, max_error=None):
+    start = time.perf_counter()
+    led_positions = capture()
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {elapsed:.2f} s ({elapsed / LED_COUNT * 1000:.1f} ms/LED), {map_accuracy(led_positions, truth)}")
+    if max_error is not None:
+        # A wrong position is worse than a missing one: it is never retried
+        wrong = [led["id"] for led in led_positions
+                 if led["position"] and np.linalg.norm(np.subtract(led["position"], truth[led["id"]])) > max_error]
+        assert not wrong, f"{name}: LEDs {wrong} are more than {max_error} px off"
+    return led_positions
+
+
+def main():
+    device = SimulatedWLED(LED_COUNT).start()
+    truth = project(spiral_tree(LED_COUNT, seed=SEED), angle=0, resolution=RESOLUTION)
+    source = SyntheticCamera(device, truth, resolution=RESOLUTION, fps=CAMERA_FPS, seed=SEED,
+                             reflections=[(LED_COUNT // 3, (60, 25), 0.5)],  # Dim ghost in a window
+                             ambient=[(40, 40, 12, 255)])  # A lamp in the corner
+    camera = CameraFeed()
+    camera.cap = source
+    grabber = camera.start_grabber()
+
+    wled = WLEDController(device.ip, LED_COUNT, realtime_port=device.ddp_port)
+    detector = BrightSpot(threshold=200, min_contour_area=50)
+
+    # The lamp would otherwise be detected in every frame
+    wled.turn_off_all_leds()
+    time.sleep(0.1)
+    detector.set_reference(capture_dark_reference(camera, 5, grabber))
+
+    # Settle on the measured latency rather than a guess
+    samples, round_trips = measure_latency(wled, camera, detector, led_id=LED_COUNT // 2, trials=10, grabber=grabber)
+    samples -= np.nanmedian(round_trips)  # Capture waits from the acknowledgement
+    settle_ms = int(np.ceil(np.nanpercentile(samples, 95) * 1000))
+    lead_ms = max(int(np.nanmin(samples) * 1000), 0)
+    print(f"Measured latency p50 {np.nanmedian(samples) * 1000:.1f} ms, settling {settle_ms} ms")
+
+    run_capture("single capture", lambda: capture_single(wled, camera, detector, LED_COUNT, settle_ms,
+                                                         grabber, retries=1), truth, MAX_ERROR_PX)
+    led_positions = run_capture("binary capture", lambda: capture_binary(wled, camera, detector, LED_COUNT,
+                                                                         settle_ms, grabber=grabber),
+                                truth, MAX_ERROR_PX)
+
+    # LEDs binary capture could not separate go through the per-LED retry, as in 2d_capture.py
+    def retry_missing():
+        missing = [led["id"] for led in led_positions if not led["position"]]
+        wled.turn_off_all_leds()
+        found = {led["id"]: led for led in capture_ids(wled, camera, detector, missing, settle_ms, grabber,
+                                                       retries=1)}
+        return [found.get(led["id"], led) for led in led_positions]
+    run_capture("binary capture + retry", retry_missing, truth, MAX_ERROR_PX)
+    grabber.stop()
+
+    # Record every frame, then decode offline across processes
+    with tempfile.TemporaryDirectory() as folder:
+        folder = os.path.join(folder, "recording")
+        start = time.perf_counter()
+        record_capture(wled, camera, folder, LED_COUNT, settle_ms, lead_ms)
+        elapsed = time.perf_counter() - start
+        print(f"record capture: {elapsed:.2f} s ({elapsed / LED_COUNT * 1000:.1f} ms/LED)")
+        start = time.perf_counter()
+        led_positions = decode_recording(folder, threshold=200, min_contour_area=50, background_subtraction=True)
+        print(f"record decode: {time.perf_counter() - start:.2f} s, {map_accuracy(led_positions, truth)}")
+
+    # Playback: frames the device actually completed over UDP
+    engine = EffectEngine(normalize_positions(truth))
+    engine.set_effect(PlaneSweep())
+    received = device.frames_received
+    scheduler = FrameScheduler(
+        render=lambda frame_index, t: engine.render(t) if t < PLAYBACK_SECONDS else None,
+        send=wled.send_frame,
+        fps=PLAYBACK_FPS,
+    )
+    metrics = scheduler.run()
+    time.sleep(0.1)
+    print(f"playback: {(device.frames_received - received) / PLAYBACK_SECONDS:.1f} FPS received "
+          f"of {PLAYBACK_FPS} target, {metrics['dropped']} dropped")
+
+    wled.close()
+    device.stop()
+
+
+if __name__ == "__main__":
+    main()
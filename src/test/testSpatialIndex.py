@@ -0,0 +1,46 @@
+import time
+import numpy as np
+from src.utils.spatial_index import GridIndex, MAX_CELLS_PER_LED
+
+LED_COUNT = 5000
+SEED = 5
+
+
+def brute_force_nearest(positions, points):
+    distances = np.linalg.norm(points[:, None, :] - positions[None, :, :], axis=2)
+    return distances.argmin(axis=1), distances.min(axis=1)
+
+
+def check(name, index, positions, points, limit_s):
+    start = time.perf_counter()
+    ids, distances = index.nearest(points)
+    elapsed = time.perf_counter() - start
+    expected_ids, expected_distances = brute_force_nearest(positions, points)
+    assert np.allclose(distances, expected_distances), f"{name}: wrong distances"
+    assert (positions[ids] == positions[expected_ids]).all(), f"{name}: wrong LEDs"
+    assert elapsed < limit_s, f"{name}: took {elapsed:.2f} s"
+    print(f"{name}: {len(points)} queries in {elapsed * 1000:.1f} ms, OK")
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    positions = rng.uniform(0, 100, (LED_COUNT, 3))
+    index = GridIndex(positions)
+
+    check("inside", index, positions, rng.uniform(0, 100, (500, 3)), 1.0)
+    check("just outside", index, positions, rng.uniform(-50, 150, (500, 3)), 1.0)
+    check("far outside", index, positions, np.array([[1000.0, 1000.0, 1000.0], [-350.0, 50.0, 50.0],
+                                                     [450.0, -450.0, 0.0]]), 1.0)
+    check("mixed", index, positions, np.vstack((rng.uniform(0, 100, (100, 3)),
+                                                rng.uniform(-5000, 5000, (100, 3)))), 1.0)
+
+    # A tiny cell size must not allocate a cube of cells
+    small = GridIndex(positions, cell_size=1e-3)
+    cells = int(np.prod(small.shape))
+    assert cells <= MAX_CELLS_PER_LED * LED_COUNT, f"small cells: {cells} cells for {LED_COUNT} LEDs"
+    print(f"small cells: {small.shape.tolist()} grid, {cells} cells")
+    check("small cells", small, positions, rng.uniform(-50, 150, (500, 3)), 1.0)
+
+
+if __name__ == "__main__":
+    main()
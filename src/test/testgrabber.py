@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from src.utils.camera_controller import FrameGrabber, VideoFileSource
+
+FPS = 30
+
+
+def write_test_video(path, frames=60, resolution=(640, 480)):
+    """
+    Writes a short video whose frames carry their index in the top-left pixel.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, resolution)
+    for i in range(frames):
+        frame = np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+        frame[:16, :16] = i * 4
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "grabber_test.avi")
+    if len(sys.argv) <= 1:
+        write_test_video(path)
+
+    grabber = FrameGrabber(VideoFileSource(path, fps=FPS), ring_size=8)
+    grabber.start()
+
+    waits = []
+    for _ in range(20):
+        time.sleep(np.random.uniform(0.0, 0.05))  # Stand-in for an LED command round trip
+        acknowledged = time.perf_counter()
+        timestamp, frame = grabber.get_frame_after(acknowledged)
+        if frame is None:
+            print("Error: Timed out waiting for a frame.")
+            break
+        assert timestamp >= acknowledged
+        waits.append(time.perf_counter() - acknowledged)
+
+    grabber.stop()
+    print(f"get_frame_after waited {np.mean(waits) * 1000:.1f} ms on average, "
+          f"max {np.max(waits) * 1000:.1f} ms (frame interval {1000 / FPS:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
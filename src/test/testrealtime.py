@@ -0,0 +1,75 @@
+import socket
+import threading
+import time
+import numpy as np
+from src.utils.wled_controller import WLEDController
+from src.utils.wled_realtime import decode_ddp, decode_wled_udp
+
+LED_COUNT = 1500
+FRAMES = 400
+TARGET_FPS = 60
+
+
+def start_receiver(frame, completed):
+    """
+    Local UDP receiver that decodes packets into `frame` and counts completed frames.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(0.5)
+
+    def receive():
+        while True:
+            try:
+                packet = sock.recv(2048)
+            except socket.timeout:
+                return
+            if packet[0] & 0xC0 == 0x40:  # DDP version 1 flags
+                if decode_ddp(packet, frame):
+                    completed.append(time.perf_counter())
+            else:
+                start, count = decode_wled_udp(packet, frame)
+                if start + count == len(frame):
+                    completed.append(time.perf_counter())
+
+    thread = threading.Thread(target=receive, daemon=True)
+    thread.start()
+    return sock.getsockname()[1], thread
+
+
+def run(protocol):
+    received = np.zeros((LED_COUNT, 3), dtype=np.uint8)
+    completed = []
+    port, thread = start_receiver(received, completed)
+    controller = WLEDController("127.0.0.1", LED_COUNT, realtime_protocol=protocol, realtime_port=port)
+
+    frame = np.zeros((LED_COUNT, 3), dtype=np.uint8)
+    ramp = np.arange(LED_COUNT * 3, dtype=np.uint8).reshape(LED_COUNT, 3)
+    period = 1.0 / TARGET_FPS
+    send_times = []
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        np.add(ramp, i % 256, out=frame)
+        t0 = time.perf_counter()
+        controller.send_frame(frame)
+        send_times.append(time.perf_counter() - t0)
+        deadline = start + (i + 1) * period
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    thread.join()
+    controller.close()
+    elapsed = completed[-1] - completed[0] if len(completed) > 1 else float("nan")
+    print(f"{protocol}: {len(completed)}/{FRAMES} frames received, "
+          f"{(len(completed) - 1) / elapsed:.1f} FPS, "
+          f"send p99 {np.percentile(send_times, 99) * 1000:.3f} ms, "
+          f"last frame intact: {np.array_equal(received, frame)}")
+
+
+def main():
+    for protocol in ("ddp", "dnrgb"):
+        run(protocol)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.wled_controller import WLEDController, PipelinedWLEDController
+
+LED_COUNT = 100
+UPDATES = 300
+STUB_DELAY = 0.005  # Simulated device processing time per request
+
+
+class StubWLEDHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Allow keep-alive connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.payloads.append(json.loads(body))
+        time.sleep(STUB_DELAY)
+        reply = b'{"success":true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWLEDHandler)
+    server.connections = 0
+    server.payloads = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(controller_class):
+    server = start_stub()
+    controller = controller_class(f"127.0.0.1:{server.server_port}", LED_COUNT)
+
+    start = time.perf_counter()
+    for i in range(UPDATES):
+        controller.turn_on_single_led(led_id=i % LED_COUNT)
+    issue_time = time.perf_counter() - start
+    if isinstance(controller, PipelinedWLEDController):
+        controller.flush()
+    total_time = time.perf_counter() - start
+    controller.close()
+    server.shutdown()
+
+    last = server.payloads[-1]["seg"][0]["start"]
+    print(f"{controller_class.__name__}:")
+    print(f"  issued {UPDATES} updates in {issue_time * 1000:.1f} ms, drained in {total_time * 1000:.1f} ms")
+    print(f"  device received {len(server.payloads)} payloads over {server.connections} connection(s)")
+    print(f"  coalesced: {getattr(controller, 'coalesced', 0)}, final LED: {last} (expected {(UPDATES - 1) % LED_COUNT})")
+    print(f"  latency: {controller.stats.summary()}")
+
+
+def main():
+    run(WLEDController)
+    run(PipelinedWLEDController)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import json
+import threading
+import time
+
 import cv2
 import numpy as np
 
 
+SPOT_DTYPE = np.dtype([("x", "<f4"), ("y", "<f4"), ("area", "<i4"), ("peak", "u1"), ("confidence", "<f4")])
+
+
 class CameraFeed:
     def __init__(self, camera_index=0):
         """
@@ -12,6 +19,10 @@ class CameraFeed:
         self.cap = None
         self.rotation = 0  # Default rotation: 0 degrees
         self.mirror = False  # Default: No mirroring
+        self.camera_matrix = None  # Lens intrinsics for undistortion, None to skip it
+        self.dist_coeffs = None
+        self.homography = None  # 3x3 map applied after rotation and mirroring, None to skip it
+        self.exposure_latency = 0.0  # Seconds from a frame's exposure to its arrival, for frame timestamps
 
     def initialize_camera(self):
         """
@@ -57,9 +68,119 @@ class CameraFeed:
         self.mirror = mirror
         print(f"Camera feed mirroring set to: {'Enabled' if mirror else 'Disabled'}")
 
+    def set_exposure_latency(self, seconds):
+        """
+        Sets how long after its exposure a frame arrives. Grabbed and recorded frames are
+        stamped with their arrival time minus this, so a frame is only taken as showing a
+        command when it was exposed after it.
+        :param seconds: Exposure to arrival delay in seconds.
+        """
+        self.exposure_latency = seconds
+        print(f"Camera exposure latency set to: {seconds * 1000:.1f} ms")
+
+    def set_undistortion(self, camera_matrix, dist_coeffs):
+        """
+        Sets the lens intrinsics used to undistort detected points.
+        :param camera_matrix: 3x3 camera matrix from cv2.calibrateCamera, or None to disable.
+        :param dist_coeffs: Distortion coefficients from cv2.calibrateCamera.
+        """
+        if camera_matrix is None:
+            self.camera_matrix = self.dist_coeffs = None
+        else:
+            self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64).reshape(3, 3)
+            self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()
+        print(f"Lens undistortion: {'Enabled' if camera_matrix is not None else 'Disabled'}")
+
+    def set_homography(self, homography):
+        """
+        Sets a perspective map applied to points after rotation and mirroring,
+        e.g. from cv2.findHomography between the rotated view and a reference plane.
+        :param homography: 3x3 matrix, or None to disable.
+        """
+        self.homography = None if homography is None else np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        print(f"Homography: {'Enabled' if homography is not None else 'Disabled'}")
+
+    def load_calibration(self, path):
+        """
+        Loads "camera_matrix", "dist_coeffs" and "homography" from a JSON file; any may be missing.
+        """
+        with open(path, "r") as json_file:
+            calibration = json.load(json_file)
+        if calibration.get("camera_matrix") is not None:
+            self.set_undistortion(calibration["camera_matrix"], calibration.get("dist_coeffs", []))
+        if calibration.get("homography") is not None:
+            self.set_homography(calibration["homography"])
+
+    def get_transform(self):
+        """
+        The point transform settings as a JSON serializable dict, for set_transform.
+        """
+        as_list = lambda value: None if value is None else value.tolist()
+        return {"rotation": self.rotation, "mirror": self.mirror, "camera_matrix": as_list(self.camera_matrix),
+                "dist_coeffs": as_list(self.dist_coeffs), "homography": as_list(self.homography)}
+
+    def set_transform(self, transform):
+        """
+        Restores settings saved with get_transform, without printing.
+        """
+        self.rotation = transform["rotation"]
+        self.mirror = transform["mirror"]
+        self.camera_matrix = self.dist_coeffs = self.homography = None
+        if transform["camera_matrix"] is not None:
+            self.camera_matrix = np.asarray(transform["camera_matrix"], dtype=np.float64)
+            self.dist_coeffs = np.asarray(transform["dist_coeffs"], dtype=np.float64)
+        if transform["homography"] is not None:
+            self.homography = np.asarray(transform["homography"], dtype=np.float64)
+
+    def transform_points(self, points, frame_shape):
+        """
+        Maps points detected on a native camera frame into output coordinates: lens
+        undistortion, then the rotation and mirroring apply_transformations gives the
+        frame, then the homography. Detecting on native frames and transforming only the
+        centroids avoids copying every frame and keeps sub-pixel precision.
+        :param points: (N, 2) x, y in native frame pixels.
+        :param frame_shape: Shape of the native frame the points were found in.
+        :return: (N, 2) float64 transformed points.
+        """
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        if not len(points):
+            return points
+        h, w = frame_shape[:2]
+
+        if self.camera_matrix is not None:
+            points = cv2.undistortPoints(points.reshape(-1, 1, 2), self.camera_matrix, self.dist_coeffs,
+                                         P=self.camera_matrix).reshape(-1, 2)
+
+        # Pixel centers, so these match cv2.rotate and cv2.flip exactly
+        x, y = points[:, 0], points[:, 1]
+        if self.rotation == 90:
+            x, y, w, h = h - 1 - y, x, h, w
+        elif self.rotation == 180:
+            x, y = w - 1 - x, h - 1 - y
+        elif self.rotation == 270:
+            x, y, w, h = y, w - 1 - x, h, w
+        if self.mirror:
+            x = w - 1 - x
+        points = np.stack((x, y), axis=1)
+
+        if self.homography is not None:
+            points = cv2.perspectiveTransform(points.reshape(-1, 1, 2), self.homography).reshape(-1, 2)
+        return points
+
+    def transform_point(self, point, frame_shape):
+        """
+        transform_points for a single (x, y), rounded to 2 decimals.
+        :return: [x, y], or None if point is None.
+        """
+        if point is None:
+            return None
+        x, y = self.transform_points(point, frame_shape)[0]
+        return [round(float(x), 2), round(float(y), 2)]
+
     def apply_transformations(self, frame):
         """
-        Applies rotation and mirroring transformations to the frame.
+        Applies rotation and mirroring transformations to the frame. Only needed for display:
+        detection runs on native frames and transform_points maps the results.
         :param frame: Input frame from the camera.
         :return: Transformed frame.
         """
@@ -75,6 +196,22 @@ class CameraFeed:
 
         return frame
 
+    def start_grabber(self, ring_size=8, exposure_latency=None):
+        """
+        Starts a background FrameGrabber reading from this camera.
+        :param ring_size: Number of preallocated frames kept in the ring.
+        :param exposure_latency: Seconds between a frame's exposure and its arrival,
+                                 defaults to the one set with set_exposure_latency.
+        :return: The running FrameGrabber.
+        """
+        if not self.cap:
+            raise RuntimeError("Error: Camera not initialized. Call `initialize_camera()` first.")
+        if exposure_latency is None:
+            exposure_latency = self.exposure_latency
+        grabber = FrameGrabber(self.cap, ring_size=ring_size, exposure_latency=exposure_latency)
+        grabber.start()
+        return grabber
+
     def show_camera_feed(self, window_name="Camera Feed"):
         """
         Opens the camera feed and displays it in a window. The feed will close when the user presses 'q'.
@@ -110,53 +247,355 @@ class CameraFeed:
         print("Camera feed closed.")
 
 
+
+class VideoFileSource:
+    def __init__(self, path, fps=None, loop=True):
+        """
+        Camera stand-in that plays a video file at its real frame rate.
+        :param path: Path to the video file.
+        :param fps: Playback rate, defaults to the rate stored in the file.
+        :param loop: True to restart from the beginning at the end of the file.
+        """
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Error: Could not open video file {path}.")
+        self.period = 1.0 / (fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        self.loop = loop
+        self.next_frame = time.perf_counter()
+
+    def read(self, image=None):
+        """
+        Returns the next frame once it is due, like cv2.VideoCapture.read.
+        """
+        time.sleep(max(0.0, self.next_frame - time.perf_counter()))
+        self.next_frame = max(self.next_frame + self.period, time.perf_counter() - self.period)
+        ret, frame = self._read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._read(image)
+        return ret, frame
+
+    def _read(self, image):
+        return self.cap.read() if image is None else self.cap.read(image)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class FrameGrabber:
+    def __init__(self, source, ring_size=8, exposure_latency=0.0):
+        """
+        Reads frames on a background thread into a ring of preallocated buffers,
+        so callers always get fresh frames instead of OpenCV's stale internal buffer.
+        :param source: Anything with a cv2.VideoCapture style read(), e.g. CameraFeed.cap or VideoFileSource.
+        :param ring_size: Number of frames kept.
+        :param exposure_latency: Seconds subtracted from each arrival time to estimate when the frame was exposed.
+        """
+        self.source = source
+        self.ring_size = ring_size
+        self.exposure_latency = exposure_latency
+        self.ring = None
+        self.timestamps = np.zeros(ring_size, dtype=np.float64)
+        self.numbers = np.full(ring_size, -1, dtype=np.int64)
+        self.latest = -1
+        self.running = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        """
+        Reads the first frame to size the ring, then starts the capture thread.
+        """
+        ret, frame = self.source.read()
+        if not ret:
+            raise RuntimeError("Error: Could not read from the frame source.")
+        self.ring = np.empty((self.ring_size,) + frame.shape, dtype=frame.dtype)
+        self._store(0, frame, time.perf_counter())
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self.thread.start()
+
+    def _store(self, slot, frame, arrived):
+        number = self.latest + 1
+        if frame.ctypes.data != self.ring[slot].ctypes.data:
+            np.copyto(self.ring[slot], frame)
+        with self.condition:
+            self.timestamps[slot] = arrived - self.exposure_latency
+            self.numbers[slot] = number
+            self.latest = number
+            self.condition.notify_all()
+
+    def _run(self):
+        direct = isinstance(self.source, (cv2.VideoCapture, VideoFileSource))
+        while self.running:
+            slot = (self.latest + 1) % self.ring_size
+            with self.condition:
+                self.numbers[slot] = -1  # Being overwritten
+            if direct:
+                ret, frame = self.source.read(self.ring[slot])
+            else:
+                ret, frame = self.source.read()
+            if not ret:
+                time.sleep(0.005)
+                continue
+            self._store(slot, frame, time.perf_counter())
+
+    def _copy(self, number, out):
+        slot = number % self.ring_size
+        timestamp = self.timestamps[slot]
+        if out is None:
+            out = np.empty_like(self.ring[slot])
+        np.copyto(out, self.ring[slot])
+        # The writer may have lapped us while copying
+        with self.condition:
+            if self.numbers[slot] != number:
+                return None, None
+        return timestamp, out
+
+    def get_frame_after(self, t, timeout=1.0, out=None):
+        """
+        Returns the first frame exposed at or after time t, waiting for it if needed.
+        :param t: time.perf_counter() timestamp, e.g. when an LED command was acknowledged.
+        :param timeout: Maximum seconds to wait.
+        :param out: Optional buffer to copy the frame into.
+        :return: (timestamp, frame), or (None, None) on timeout.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            with self.condition:
+                ready = lambda: self._first_after(t) is not None
+                if not self.condition.wait_for(ready, max(0.0, deadline - time.perf_counter())):
+                    return None, None
+                number = self._first_after(t)
+            timestamp, frame = self._copy(number, out)
+            if frame is not None:
+                return timestamp, frame
+
+    def _first_after(self, t):
+        valid = (self.numbers >= 0) & (self.timestamps >= t)
+        if not valid.any():
+            return None
+        return int(self.numbers[valid].min())
+
+    def get_latest(self, out=None):
+        """
+        Returns the most recent frame.
+        :param out: Optional buffer to copy the frame into.
+        :return: (timestamp, frame).
+        """
+        while True:
+            with self.condition:
+                number = self.latest
+            timestamp, frame = self._copy(number, out)
+            if frame is not None:
+                return timestamp, frame
+
+    def stop(self):
+        """
+        Stops the capture thread. The source itself is left open.
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+
+
 import cv2
 
 class BrightSpot:
-    def __init__(self, threshold=200, min_contour_area=50):
+    def __init__(self, threshold=200, min_contour_area=50, downscale=1, roi_radius=24):
         """
         Initializes the BrightSpot class.
         :param threshold: Brightness threshold for detecting bright spots (0-255).
         :param min_contour_area: Minimum contour area to filter out noise.
+        :param downscale: Factor to shrink frames by when searching for candidates. 1 keeps the
+                          original full resolution search, larger values enable the fast path.
+        :param roi_radius: Half size in full resolution pixels of the window used to refine the centroid.
         """
         self.threshold = threshold
         self.min_contour_area = min_contour_area
+        self.downscale = downscale
+        self.roi_radius = roi_radius
+
+        # Buffers reused across calls by the fast path, allocated for the first frame size seen
+        self._frame_shape = None
+        self._small = None
+        self._small_gray = None
+        self._small_thresh = None
+        self._roi_gray = np.empty((2 * roi_radius + 1) ** 2, dtype=np.uint8)
+        self._roi_thresh = np.empty_like(self._roi_gray)
+        self._roi_diff = np.empty((2 * roi_radius + 1) ** 2 * 3, dtype=np.uint8)
+
+        # Optional dark frame subtracted before detection
+        self.reference = None
+        self._small_reference = None
+        self._diff = None
+
+    def set_reference(self, reference):
+        """
+        Sets the dark reference frame subtracted from every frame before detection,
+        so ambient light and reflections that are present with all LEDs off are ignored.
+        :param reference: BGR frame captured with all LEDs off, or None to detect on raw frames.
+        """
+        self.reference = None if reference is None else np.ascontiguousarray(reference, dtype=np.uint8)
+        self._small_reference = None
+        self._diff = None
+
+    def subtract_reference(self, frame):
+        """
+        Returns the frame minus the dark reference (saturating at 0), reusing one buffer.
+        :param frame: BGR frame with the same shape as the reference.
+        :return: The difference frame, or the input frame if no reference is set.
+        """
+        if self.reference is None:
+            return frame
+        if self.reference.shape != frame.shape:
+            raise ValueError(f"Reference frame shape {self.reference.shape} does not match frame {frame.shape}.")
+        if self._diff is None:
+            self._diff = np.empty_like(self.reference)
+        return cv2.subtract(frame, self.reference, dst=self._diff)
 
     def find_bright_spot(self, frame):
         """
         Finds the brightest spot in a given frame.
         :param frame: The frame to process (numpy array).
         :return: (x, y) coordinates of the brightest spot, or None if no spot is found.
+                 The fast path (downscale > 1) returns sub-pixel float coordinates.
         """
-        # Convert frame to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # Apply a threshold to isolate bright areas
-        _, thresh = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.downscale > 1:
+            return self._find_bright_spot_fast(frame)
+        spots = self.find_bright_spots(frame)  # Sorted largest first
+        if not len(spots):
+            return None  # No bright spots found
+        return int(round(spots["x"][0])), int(round(spots["y"][0]))
 
-        # Find contours of the bright areas
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    def _allocate(self, frame):
+        h, w = frame.shape[:2]
+        small_size = (h // self.downscale, w // self.downscale)
+        self._small = np.empty(small_size + (3,), dtype=np.uint8)
+        self._small_gray = np.empty(small_size, dtype=np.uint8)
+        self._small_thresh = np.empty(small_size, dtype=np.uint8)
+        self._small_reference = None
+        self._frame_shape = frame.shape
 
-        if not contours:
-            return None  # No bright spots found
+    def _find_bright_spot_fast(self, frame):
+        """
+        Finds candidates on a downscaled grayscale frame, then refines the centroid
+        of the largest one inside a small full resolution window.
+        """
+        if frame.shape != self._frame_shape:
+            self._allocate(frame)
+        d = self.downscale
 
-        # Filter contours by area
-        contours = [c for c in contours if cv2.contourArea(c) >= self.min_contour_area]
+        # Nearest sampling keeps original intensities; any spot bigger than min_contour_area
+        # still covers several samples as long as downscale <= sqrt(min_contour_area) / 2
+        cv2.resize(frame, self._small_gray.shape[::-1], dst=self._small, interpolation=cv2.INTER_NEAREST)
+        if self.reference is not None:
+            if self._small_reference is None:
+                self._small_reference = cv2.resize(self.reference, self._small_gray.shape[::-1],
+                                                   interpolation=cv2.INTER_NEAREST)
+            cv2.subtract(self._small, self._small_reference, dst=self._small)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._small_gray)
+        cv2.threshold(self._small_gray, self.threshold, 255, cv2.THRESH_BINARY, dst=self._small_thresh)
+        contours, _ = cv2.findContours(self._small_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if not contours:
-            return None  # No valid contours remain
+            return None
 
-        # Find the largest bright spot
         largest_contour = max(contours, key=cv2.contourArea)
         x, y, w, h = cv2.boundingRect(largest_contour)
+        cx, cy = (x + w / 2) * d, (y + h / 2) * d
 
-        # Calculate centroid for higher precision
-        moments = cv2.moments(largest_contour)
-        if moments["m00"] != 0:
-            # cx, cy = x + w // 2, y + h // 2
-            cx = int(moments["m10"] / moments["m00"])
-            cy = int(moments["m01"] / moments["m00"])
-        else:
-            # Fallback to bounding box center
-            cx, cy = x + w // 2, y + h // 2
+        # Refine at full resolution using intensity-weighted moments above the threshold
+        frame_h, frame_w = frame.shape[:2]
+        r = self.roi_radius
+        x0, y0 = max(0, int(cx) - r), max(0, int(cy) - r)
+        x1, y1 = min(frame_w, int(cx) + r + 1), min(frame_h, int(cy) + r + 1)
+        roi_shape = (y1 - y0, x1 - x0)
+        roi_gray = self._roi_gray[:roi_shape[0] * roi_shape[1]].reshape(roi_shape)
+        roi_thresh = self._roi_thresh[:roi_gray.size].reshape(roi_shape)
+        roi = frame[y0:y1, x0:x1]
+        if self.reference is not None:
+            roi = cv2.subtract(roi, self.reference[y0:y1, x0:x1],
+                               dst=self._roi_diff[:roi_gray.size * 3].reshape(roi_shape + (3,)))
+        cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=roi_gray)
+        cv2.threshold(roi_gray, self.threshold, 255, cv2.THRESH_TOZERO, dst=roi_thresh)
+
+        moments = cv2.moments(roi_thresh)
+        if moments["m00"] == 0 or cv2.countNonZero(roi_thresh) < self.min_contour_area:
+            return None
+        return x0 + moments["m10"] / moments["m00"], y0 + moments["m01"] / moments["m00"]
+
+    def find_bright_spots(self, frame):
+        """
+        Finds every bright spot in a given frame in a single contour pass.
+        Each blob is measured inside its own bounding box only, and its centroid is
+        weighted by brightness above the threshold, so it is sub-pixel.
+        Confidence is 1 for a round, saturated blob and drops for elongated shapes
+        (such as two LEDs merged together) and for blobs barely above the threshold.
+        :param frame: The frame to process (numpy array).
+        :return: SPOT_DTYPE array of (x, y, area, peak, confidence), largest area first.
+        """
+        gray = cv2.cvtColor(self.subtract_reference(frame), cv2.COLOR_BGR2GRAY)
+        _, thresh = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        spots = np.empty(len(contours), dtype=SPOT_DTYPE)
+        count = 0
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h < self.min_contour_area:
+                continue  # Too small even if it filled its box
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.drawContours(mask, [contour], -1, 255, cv2.FILLED, offset=(-x, -y))
+            cv2.bitwise_and(mask, thresh[y:y + h, x:x + w], dst=mask)
+            area = cv2.countNonZero(mask)
+            if area < self.min_contour_area:
+                continue
+
+            roi = gray[y:y + h, x:x + w]
+            weights = np.where(mask, roi.astype(np.float32) - (self.threshold - 1), np.float32(0))
+            moments = cv2.moments(weights)
+            peak = cv2.minMaxLoc(roi, mask)[1]
+
+            # Ratio of the blob's minor to major axis from its second central moments
+            mu20, mu02, mu11 = moments["mu20"], moments["mu02"], moments["mu11"]
+            spread = np.hypot(mu20 - mu02, 2 * mu11)
+            roundness = np.sqrt(max(mu20 + mu02 - spread, 0.0) / max(mu20 + mu02 + spread, 1e-9))
+            contrast = min(max((peak - self.threshold) / max(255 - self.threshold, 1), 0.0), 1.0)
+            spots[count] = (x + moments["m10"] / moments["m00"], y + moments["m01"] / moments["m00"],
+                            area, peak, roundness * (0.5 + 0.5 * contrast))
+            count += 1
+
+        spots = spots[:count]
+        return spots[np.argsort(-spots["area"], kind="stable")]
+
+
+class DarkReference:
+    def __init__(self, window=5):
+        """
+        Rolling per-pixel median of frames captured with all LEDs off.
+        :param window: Number of most recent dark frames the median is taken over.
+        """
+        self.window = window
+        self.frames = None
+        self.count = 0
+        self.reference = None
+
+    def update(self, frame):
+        """
+        Adds a dark frame and recomputes the reference.
+        :param frame: BGR frame captured with all LEDs off.
+        :return: The updated reference frame.
+        """
+        if self.frames is None or self.frames.shape[1:] != frame.shape:
+            self.frames = np.empty((self.window,) + frame.shape, dtype=np.uint8)
+            self.count = 0
+        self.frames[self.count % self.window] = frame
+        self.count += 1
 
-        return cx, cy
+        stack = self.frames[:min(self.count, self.window)]
+        middle = len(stack) // 2
+        self.reference = np.partition(stack, middle, axis=0)[middle]
+        return self.reference
@@ -0,0 +1,300 @@
+import time
+
+import cv2
+import numpy as np
+
+from .camera_controller import DarkReference
+from .latency import LATENCY_FILE, load_settle_ms
+from .profiling import NULL_PROFILER
+from .structured_light import bit_count, pattern_led_ids, sample_intensity, decode_signatures, region_centroids
+
+STALE_SPOT_PX = 1.0  # A spot this close to the previous LED's may be a frame from before the command
+MIN_PLANE_CONTRAST = 0.5  # Fraction of lit pixels a bit plane must tell apart, or its frames were stale
+
+
+def setup_camera(camera, config):
+    """
+    Opens the camera and applies the capture settings from config: resolution, exposure,
+    the exposure latency frame timestamps are corrected by, and the rotation, mirroring
+    and calibration that map detected points.
+    Detection runs on native frames, so the rotation only turns the preview.
+    :param camera: A CameraFeed that has not been initialized yet.
+    :param config: Loaded config.json.
+    """
+    camera.initialize_camera()
+    camera.set_camera_parameters(resolution=(config.get("xres", 1920), config.get("yres", 1080)),
+                                 exposure=config.get("exposure", -7))
+    latency_ms = config.get("exposure_latency_ms")
+    if latency_ms is None:
+        # A frame cannot arrive sooner than one frame interval after its exposure started
+        fps = camera.cap.get(cv2.CAP_PROP_FPS)
+        latency_ms = 1000.0 / fps if fps > 0 else 0.0
+    camera.set_exposure_latency(latency_ms / 1000.0)
+    camera.set_rotation(config.get("rotation", 0))  # Degrees clockwise
+    camera.set_mirror(config.get("mirror", False))
+    if config.get("camera_calibration"):  # JSON with camera_matrix, dist_coeffs and homography
+        camera.load_calibration(config["camera_calibration"])
+
+
+def prepare_capture(wled, camera, detector, config, recording=False):
+    """
+    Gets a capture ready the way config asks: starts the threaded frame grabber, picks
+    the settle time and retries, turns all LEDs off and sets the dark reference.
+    Shared by 2d_capture.py and repair_map.py, so a repair detects as well as the capture it fixes.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: A CameraFeed set up with setup_camera.
+    :param detector: The BrightSpot detector the dark reference is set on.
+    :param config: Loaded config.json.
+    :param recording: True when the caller records the camera itself; no grabber or reference is made.
+    :return: (grabber, settle_ms, lead_ms, retries); the grabber is None or must be stopped by the caller.
+    """
+    # Read frames on a background thread so each LED gets the first frame exposed after its command
+    grabber = None
+    settle_ms = config.get("settle_ms", 250)
+    lead_ms = 0
+    if config.get("threaded_capture", False) and not recording:
+        grabber = camera.start_grabber()
+        settle_ms = config.get("grab_settle_ms", 40)  # Settle after the acknowledged command
+    adaptive_settle = config.get("adaptive_settle", True)  # Use data/latency.json from calibrate_latency.py
+    if adaptive_settle and (grabber is not None or recording):
+        # Waits start once each command is acknowledged, so the round trip is not waited twice.
+        # Only timestamped frames can wait this little: a blocking read may return a frame the
+        # driver buffered before the LED changed, so without a grabber settle_ms is kept
+        measured_ms = load_settle_ms(LATENCY_FILE, after_ack=True)
+        if measured_ms is not None:
+            print(f"Using measured p95 latency of {measured_ms} ms after the acknowledgement as the settle time.")
+            settle_ms = measured_ms
+            lead_ms = load_settle_ms(LATENCY_FILE, "min_ms", default=0, after_ack=True)
+    retries = config.get("settle_retries", 2) if adaptive_settle else 0  # Extra reads for an LED not seen
+
+    wled.turn_off_all_leds()
+    if config.get("background_subtraction", False) and not recording:
+        # Detect on the difference from a dark frame so ambient lights and reflections cancel out
+        if grabber is None:
+            cv2.waitKey(settle_ms)
+        else:
+            time.sleep(settle_ms / 1000.0)
+        frames = config.get("reference_frames", 5)
+        reference = capture_dark_reference(camera, frames, grabber)
+        if reference is None:
+            print("Error: Could not capture a dark reference frame, detecting on raw frames.")
+        else:
+            print(f"Captured dark reference from {frames} frames.")
+        detector.set_reference(reference)
+    return grabber, settle_ms, lead_ms, retries
+
+
+def read_frame(camera, grabber=None, after=None):
+    """
+    Reads a native frame from the camera. Detection runs on native frames and
+    CameraFeed.transform_points maps the results, so the frame is not transformed.
+    :param camera: An initialized CameraFeed.
+    :param grabber: Optional running FrameGrabber to take the frame from.
+    :param after: With a grabber, only accept a frame exposed at or after this perf_counter time.
+    :return: The frame, or None if the read failed.
+    """
+    if grabber is not None:
+        _, frame = grabber.get_frame_after(time.perf_counter() if after is None else after)
+    else:
+        ret, frame = camera.cap.read()
+        if not ret:
+            frame = None
+    return frame
+
+
+def settle_and_read(camera, settle_ms, grabber=None):
+    """
+    Waits for the LEDs to settle after a command, then reads a frame.
+    With a grabber only the settle time itself is waited: the first frame exposed
+    after it is returned instead of a blunt fixed wait plus a possibly stale read.
+    :param camera: An initialized CameraFeed.
+    :param settle_ms: Milliseconds between the acknowledged command and a usable frame. Without a
+                      grabber it must also cover frames the driver buffered before the command.
+    :param grabber: Optional running FrameGrabber.
+    :return: The frame, or None if the read failed.
+    """
+    if grabber is None:
+        cv2.waitKey(settle_ms)
+        return read_frame(camera)
+    return read_frame(camera, grabber, after=time.perf_counter() + settle_ms / 1000.0)
+
+
+def capture_dark_reference(camera, frames=5, grabber=None):
+    """
+    Builds a dark reference from the median of several frames. Call with all LEDs off.
+    :param camera: An initialized CameraFeed.
+    :param frames: Number of frames to take the median over.
+    :param grabber: Optional running FrameGrabber.
+    :return: The reference frame, or None if no frame could be read.
+    """
+    dark = DarkReference(window=frames)
+    after = time.perf_counter()
+    for _ in range(frames):
+        frame = read_frame(camera, grabber, after)
+        after = time.perf_counter()
+        if frame is not None:
+            dark.update(frame)
+    return dark.reference
+
+
+def capture_ids(wled, camera, detector, led_ids, settle_ms=250, grabber=None, journal=None, retries=0,
+                profiler=NULL_PROFILER):
+    """
+    Captures the positions of specific LEDs by lighting them one at a time.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: An initialized CameraFeed.
+    :param detector: The BrightSpot detector.
+    :param led_ids: Iterable of LED IDs to capture.
+    :param settle_ms: Time to wait after each LED command before grabbing a frame.
+    :param grabber: Optional running FrameGrabber; settle_ms then counts from the acknowledged command.
+    :param journal: Optional CaptureJournal each result is written to as soon as it is known.
+    :param retries: Extra settle-and-read attempts for an LED that is not seen, or seen where the
+                    previous LED was, covering slow outliers when settle_ms is a measured
+                    percentile rather than a worst case.
+    :param profiler: Optional Profiler timing the command, frame wait, detection and journal write per LED.
+    :return: List of {"id", "position"} dicts in the order of led_ids.
+    """
+    led_positions = []
+    previous_spot = None  # Where the LED lit before this one was seen, in native frame pixels
+    for led_id in led_ids:
+        # Turn on a single LED
+        with profiler.span("led.command"):
+            wled.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
+
+        # Wait for the LED to stabilize and capture a frame from the camera
+        position = None
+        for attempt in range(retries + 1):
+            with profiler.span("led.settle_read"):
+                frame = settle_and_read(camera, settle_ms, grabber)
+            if frame is None:
+                print(f"Error: Could not capture frame for LED {led_id}.")
+                continue
+            with profiler.span("led.detect"):
+                bright_spot = detector.find_bright_spot(frame)
+            if bright_spot and previous_spot and attempt < retries:
+                if np.hypot(bright_spot[0] - previous_spot[0], bright_spot[1] - previous_spot[1]) <= STALE_SPOT_PX:
+                    continue  # Most likely the previous LED in a frame exposed before this command
+            if bright_spot:
+                x, y = position = camera.transform_point(bright_spot, frame.shape)
+                retried = f" after {attempt} retries" if attempt else ""
+                print(f"LED {led_id}: Bright spot found at ({x}, {y}){retried}")
+                break
+        if position is None:
+            print(f"LED {led_id}: No bright spot detected.")
+        previous_spot = bright_spot if position is not None else None
+
+        led_positions.append({"id": led_id, "position": position})
+        if journal is not None:
+            with profiler.span("led.journal"):
+                journal.record(led_id, position)
+
+    return led_positions
+
+
+def capture_single(wled, camera, detector, led_count, settle_ms=250, grabber=None, journal=None, retries=0,
+                   profiler=NULL_PROFILER):
+    """
+    Captures LED positions by lighting one LED at a time.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: An initialized CameraFeed.
+    :param detector: The BrightSpot detector.
+    :param led_count: Total number of LEDs.
+    :param settle_ms: Time to wait after each LED command before grabbing a frame.
+    :param grabber: Optional running FrameGrabber; settle_ms then counts from the acknowledged command.
+    :param journal: Optional CaptureJournal; LEDs it already holds are skipped.
+    :param retries: Extra settle-and-read attempts for an LED that is not seen.
+    :param profiler: Optional Profiler timing each step per LED.
+    :return: List of {"id", "position"} dicts for the LEDs captured in this call.
+    """
+    led_ids = range(led_count) if journal is None else journal.pending_ids(led_count)
+    return capture_ids(wled, camera, detector, led_ids, settle_ms, grabber, journal, retries, profiler)
+
+
+def capture_binary(wled, camera, detector, led_count, settle_ms=250, min_contrast=10, sample_radius=1,
+                   grabber=None, retries=2, profiler=NULL_PROFILER):
+    """
+    Captures LED positions with Gray-code bit-plane patterns.
+    One all-on frame finds every lit pixel, then each bit plane and its complement are
+    lit so each pixel's on/off signature decodes to the LED ID lighting it. LEDs are
+    located per decoded region rather than per blob, so neighbours that merge into one
+    blob are told apart; regions that do not look like a single whole LED are left
+    unfound for the per-LED retry.
+    Needs 1 + 2 * ceil(log2(led_count)) frames instead of led_count.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: An initialized CameraFeed.
+    :param detector: The BrightSpot detector; its threshold, reference and min_contour_area are used.
+    :param led_count: Total number of LEDs.
+    :param settle_ms: Time to wait after each pattern before grabbing a frame.
+    :param min_contrast: Smallest pattern/complement brightness difference accepted per bit.
+    :param sample_radius: Half size of the window each pixel is averaged over before decoding.
+    :param grabber: Optional running FrameGrabber; settle_ms then counts from the acknowledged command.
+    :param retries: Extra grabs of a dark all-on frame, or of a bit plane whose pattern and
+                    complement frames look alike.
+    :param profiler: Optional Profiler timing each pattern and the decode.
+    :return: List of {"id", "position"} dicts.
+    """
+    def grab_gray(led_ids):
+        with profiler.span("pattern.command"):
+            wled.set_leds(led_ids, color=(255, 255, 255), brightness=255)
+        with profiler.span("pattern.settle_read"):
+            frame = settle_and_read(camera, settle_ms, grabber)
+        if frame is None:
+            raise RuntimeError("Error: Could not capture frame for structured light pattern.")
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    led_positions = [{"id": led_id, "position": None} for led_id in range(led_count)]
+
+    # Find every lit pixel with all LEDs lit, reading again if the frame was still dark
+    wled.set_leds(range(led_count), color=(255, 255, 255), brightness=255)
+    for attempt in range(retries + 1):
+        frame = settle_and_read(camera, settle_ms, grabber)
+        if frame is None:
+            print("Error: Could not capture the all-on reference frame.")
+            return led_positions
+
+        with profiler.span("pattern.detect"):
+            gray = cv2.cvtColor(detector.subtract_reference(frame), cv2.COLOR_BGR2GRAY)
+            lit = (gray >= detector.threshold).astype(np.uint8)
+            ys, xs = np.nonzero(lit)
+        if len(xs):
+            break
+    if not len(xs):
+        print("No bright spots detected with all LEDs lit.")
+        return led_positions
+    blob_count, labels = cv2.connectedComponents(lit, connectivity=8)
+    pixels = np.stack((xs, ys), axis=1)
+    print(f"Found {blob_count - 1} blobs, decoding {bit_count(led_count)} bit planes...")
+
+    # Only the lit pixels are kept from each pattern; the differences cancel the dark reference
+    bits = bit_count(led_count)
+    pattern_samples = np.empty((bits, len(pixels)), dtype=np.float32)
+    complement_samples = np.empty((bits, len(pixels)), dtype=np.float32)
+    for bit in range(bits):
+        for attempt in range(retries + 1):
+            pattern_samples[bit] = sample_intensity(grab_gray(pattern_led_ids(led_count, bit)), pixels,
+                                                    sample_radius)
+            complement_samples[bit] = sample_intensity(grab_gray(pattern_led_ids(led_count, bit, complement=True)),
+                                                       pixels, sample_radius)
+            # One frame read before its pattern showed makes the whole plane undecodable
+            contrast = np.mean(np.abs(pattern_samples[bit] - complement_samples[bit]) >= min_contrast)
+            if contrast >= MIN_PLANE_CONTRAST:
+                break
+            print(f"Bit plane {bit}: only {contrast:.0%} of lit pixels changed, grabbing it again...")
+
+    with profiler.span("pattern.decode"):
+        ids, _ = decode_signatures(pattern_samples, complement_samples, led_count, min_contrast)
+        weights = gray[ys, xs].astype(np.float32) - (detector.threshold - 1)
+        positions = region_centroids(labels[ys, xs], ids, xs, ys, weights, led_count,
+                                     min_pixels=max(detector.min_contour_area // 2, 1))
+
+    found = np.flatnonzero(~np.isnan(positions[:, 0]))
+    for led_id, (x, y) in zip(found, camera.transform_points(positions[found], frame.shape)):
+        led_positions[led_id]["position"] = [round(float(x), 2), round(float(y), 2)]
+
+    for led in led_positions:
+        if led["position"]:
+            print(f"LED {led['id']}: Bright spot found at ({led['position'][0]}, {led['position'][1]})")
+        else:
+            print(f"LED {led['id']}: No single LED region decoded.")
+
+    return led_positions
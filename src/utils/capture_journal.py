@@ -0,0 +1,90 @@
+import json
+import os
+
+
+class CaptureJournal:
+    def __init__(self, path, led_count=None):
+        """
+        Append-only journal of capture results, one JSON line per detected LED after a
+        {"led_count": N} header. Every line is flushed to disk as it is written, so an
+        interrupted capture can resume from what was already recorded.
+        :param path: Journal file path.
+        :param led_count: LED count of this setup; a journal recorded for another count is refused.
+        """
+        self.path = path
+        self.led_count = led_count
+        self.entries = {}
+        if os.path.exists(path):
+            self._load()
+        self.file = None
+
+    def _load(self):
+        with open(self.path, "rb") as journal_file:
+            data = journal_file.read()
+        if data and not data.endswith(b"\n"):
+            # Torn final line from a crash mid-write: drop it so the next entry starts on a fresh line
+            data = data[:data.rfind(b"\n") + 1]
+            os.truncate(self.path, len(data))
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "led_count" in entry:
+                if self.led_count is not None and entry["led_count"] != self.led_count:
+                    raise ValueError(f"Error: {self.path} was recorded for {entry['led_count']} LEDs, not "
+                                     f"{self.led_count}. Delete it to start a new capture.")
+                self.led_count = entry["led_count"]
+                continue
+            self.entries[entry["id"]] = entry["position"]
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, led_id, position):
+        """
+        Appends one result and forces it to disk. Later entries for the same ID win.
+        :param led_id: The LED ID.
+        :param position: The detected position, or None if the LED was not found.
+        """
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "a")
+            if self.file.tell() == 0 and self.led_count is not None:
+                self._write({"led_count": self.led_count})
+        self._write({"id": led_id, "position": position})
+        self.entries[led_id] = position
+
+    def pending_ids(self, led_count):
+        """
+        LED IDs that have no result yet.
+        """
+        return [led_id for led_id in range(led_count) if led_id not in self.entries]
+
+    def failed_ids(self):
+        """
+        LED IDs whose latest result has no position.
+        """
+        return sorted(led_id for led_id, position in self.entries.items() if position is None)
+
+    def positions(self, led_count):
+        """
+        The journal's results in the 2d_map.json layout.
+        """
+        return [{"id": led_id, "position": self.entries.get(led_id)} for led_id in range(led_count)]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """
+        Deletes the journal once its results have been saved elsewhere.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = {}
@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from .camera_controller import BrightSpot, CameraFeed, DarkReference
+
+RECORDING_VERSION = 1
+META_FILE = "recording.json"
+FRAMES_FILE = "frames.u8"  # Raw (frame_count, height, width, 3) uint8 stack
+TIMESTAMPS_FILE = "timestamps.npy"
+FRAME_MARGIN = 1.5  # Extra frames preallocated over the expected recording length
+
+
+class FrameRecorder:
+    def __init__(self, source, path, max_frames, exposure_latency=0.0):
+        """
+        Reads every camera frame on a background thread straight into a memory-mapped
+        frame stack on disk, with a perf_counter timestamp per frame. Nothing is
+        analysed while recording, so it keeps up with the camera's frame rate.
+        :param source: Anything with a cv2.VideoCapture style read(), e.g. CameraFeed.cap.
+        :param path: File the raw frames are written to.
+        :param max_frames: Frames preallocated; recording stops when they are used up.
+        :param exposure_latency: Seconds subtracted from each arrival time to estimate when the frame was exposed.
+        """
+        self.source = source
+        self.path = path
+        self.max_frames = max_frames
+        self.exposure_latency = exposure_latency
+        self.frames = None
+        self.frame_shape = None
+        self.timestamps = np.zeros(max_frames, dtype=np.float64)
+        self.count = 0
+        self.running = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    @property
+    def full(self):
+        return self.count >= self.max_frames
+
+    def start(self):
+        """
+        Reads the first frame to size the stack, then starts the recording thread.
+        """
+        ret, frame = self.source.read()
+        if not ret:
+            raise RuntimeError("Error: Could not read from the frame source.")
+        self.frame_shape = frame.shape
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode="w+", shape=(self.max_frames,) + frame.shape)
+        self._store(frame, time.perf_counter())
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-recorder", daemon=True)
+        self.thread.start()
+        return self
+
+    def _store(self, frame, arrived):
+        slot = self.frames[self.count]
+        if frame.ctypes.data != slot.ctypes.data:
+            np.copyto(slot, frame)
+        with self.condition:
+            self.timestamps[self.count] = arrived - self.exposure_latency
+            self.count += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        while self.running and not self.full:
+            ret, frame = self.source.read(self.frames[self.count])
+            if not ret:
+                time.sleep(0.005)
+                continue
+            self._store(frame, time.perf_counter())
+        with self.condition:
+            self.condition.notify_all()
+
+    def wait_until(self, t, timeout=2.0):
+        """
+        Waits for the first frame exposed at or after time t.
+        :return: True once it is recorded, False on timeout or when the stack is full.
+        """
+        latest_after = lambda: self.count > 0 and self.timestamps[self.count - 1] >= t
+        with self.condition:
+            self.condition.wait_for(lambda: latest_after() or self.full or not self.running, timeout)
+            return latest_after()
+
+    def stop(self):
+        """
+        Stops recording, trims the frame file to the frames actually recorded and saves their timestamps.
+        :return: Number of frames recorded.
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self.frames is None:
+            return 0
+        self.frames.flush()
+        self.frames = None
+        os.truncate(self.path, self.count * int(np.prod(self.frame_shape)))
+        np.save(os.path.join(os.path.dirname(self.path), TIMESTAMPS_FILE), self.timestamps[:self.count])
+        return self.count
+
+
+def record_capture(wled, camera, folder, led_count, settle_ms=250, lead_ms=0, hold_ms=None, dark_frames=5,
+                   max_frames=None):
+    """
+    Lights each LED in turn for a fixed hold time while every camera frame streams to disk,
+    without waiting on detection. decode_recording later matches frames to the command log.
+    LED i is taken from frames exposed between settle_ms after its command and lead_ms after
+    the next command, so the hold only has to cover the latency jitter (settle_ms - lead_ms)
+    plus a frame, not the whole latency.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: An initialized CameraFeed; it must not have a FrameGrabber running.
+    :param folder: Recording folder, created if needed. An existing recording is replaced.
+    :param led_count: Total number of LEDs.
+    :param settle_ms: Time after an acknowledged command by which the LED is surely lit, e.g. the p95 latency.
+    :param lead_ms: Time after a command before its LED can possibly be lit, e.g. the minimum latency.
+    :param hold_ms: Time each LED stays on; defaults to the jitter plus two frame periods.
+    :param dark_frames: Frames recorded with every LED off first, for the dark reference.
+    :param max_frames: Frames preallocated on disk; defaults to the expected length plus a margin.
+    :return: The recording metadata dict, also saved as recording.json.
+    """
+    get = getattr(camera.cap, "get", None)
+    fps = (get(cv2.CAP_PROP_FPS) if get else 0) or 30.0
+    if hold_ms is None:
+        hold_ms = max(settle_ms - lead_ms, 0) + 2000.0 / fps
+    if max_frames is None:
+        duration = (dark_frames + 2) / fps + led_count * hold_ms / 1000.0 + settle_ms / 1000.0
+        max_frames = int(duration * fps * FRAME_MARGIN) + 1
+
+    os.makedirs(folder, exist_ok=True)
+    wled.turn_off_all_leds()
+    time.sleep(settle_ms / 1000.0)
+    recorder = FrameRecorder(camera.cap, os.path.join(folder, FRAMES_FILE), max_frames,
+                             exposure_latency=camera.exposure_latency).start()
+
+    commands = []
+    try:
+        for _ in range(dark_frames):
+            recorder.wait_until(time.perf_counter())
+        for led_id in range(led_count):
+            if recorder.full:
+                raise RuntimeError(f"Error: Recording filled {max_frames} frames at LED {led_id}, "
+                                   f"raise max_frames.")
+            wled.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
+            acknowledged = time.perf_counter()
+            commands.append([led_id, acknowledged])
+            time.sleep(max(0.0, acknowledged + hold_ms / 1000.0 - time.perf_counter()))
+        wled.turn_off_all_leds()
+        end = time.perf_counter()
+        recorder.wait_until(end + settle_ms / 1000.0)
+    finally:
+        frame_count = recorder.stop()
+
+    meta = {
+        "version": RECORDING_VERSION,
+        "led_count": led_count,
+        "frame_count": frame_count,
+        "frame_shape": list(recorder.frame_shape),
+        "dark_frames": dark_frames,
+        "settle_ms": settle_ms,
+        "lead_ms": lead_ms,
+        "hold_ms": hold_ms,
+        "transform": camera.get_transform(),
+        "commands": commands,
+        "end": end,
+    }
+    with open(os.path.join(folder, META_FILE), "w") as json_file:
+        json.dump(meta, json_file, indent=4)
+    print(f"Recorded {frame_count} frames for {led_count} LEDs in {end - commands[0][1]:.1f} s.")
+    return meta
+
+
+def load_recording(folder):
+    """
+    Opens a recording read-only.
+    :param folder: Folder written by record_capture.
+    :return: (meta dict, (frame_count, h, w, 3) memmap, timestamps array).
+    """
+    with open(os.path.join(folder, META_FILE), "r") as json_file:
+        meta = json.load(json_file)
+    if meta.get("version") != RECORDING_VERSION:
+        raise ValueError(f"Unsupported recording version {meta.get('version')} in {folder}.")
+    timestamps = np.load(os.path.join(folder, TIMESTAMPS_FILE))
+    frames = np.memmap(os.path.join(folder, FRAMES_FILE), dtype=np.uint8, mode="r",
+                       shape=(meta["frame_count"],) + tuple(meta["frame_shape"]))
+    return meta, frames, timestamps
+
+
+def command_windows(meta, timestamps, settle_ms=None, lead_ms=None):
+    """
+    The range of frames that show each commanded LED on its own.
+    :param meta: Recording metadata.
+    :param timestamps: Frame timestamps.
+    :param settle_ms: Overrides the recorded settle time.
+    :param lead_ms: Overrides the recorded lead time.
+    :return: List of (led_id, first frame, stop frame).
+    """
+    settle = (meta["settle_ms"] if settle_ms is None else settle_ms) / 1000.0
+    lead = (meta["lead_ms"] if lead_ms is None else lead_ms) / 1000.0
+    commands = meta["commands"]
+    ends = [t for _, t in commands[1:]] + [meta["end"]]
+    windows = []
+    for (led_id, t), end in zip(commands, ends):
+        first, stop = np.searchsorted(timestamps, (t + settle, end + lead))
+        windows.append((led_id, int(first), int(max(first, stop))))
+    return windows
+
+
+_worker = {}
+
+
+def _init_decoder(folder, detector_args, reference):
+    _, frames, _ = load_recording(folder)
+    detector = BrightSpot(**detector_args)
+    detector.set_reference(reference)
+    _worker.update(frames=frames, detector=detector)
+
+
+def _decode_window(window):
+    """
+    Detects an LED in every native frame of its window and keeps the largest spot.
+    """
+    led_id, first, stop = window
+    frames, detector = _worker["frames"], _worker["detector"]
+    position, best_area = None, 0
+    for index in range(first, stop):
+        spots = detector.find_bright_spots(frames[index])
+        if len(spots) and spots["area"][0] > best_area:
+            best_area = spots["area"][0]
+            position = (float(spots["x"][0]), float(spots["y"][0]))
+    return led_id, position
+
+
+def decode_recording(folder, threshold=200, min_contour_area=50, background_subtraction=False, settle_ms=None,
+                     lead_ms=None, workers=None):
+    """
+    Finds each LED in a recording, spreading the frames across a pool of processes.
+    Can be re-run with other thresholds or timings without lighting the tree again.
+    :param folder: Folder written by record_capture.
+    :param threshold: BrightSpot threshold.
+    :param min_contour_area: BrightSpot minimum contour area.
+    :param background_subtraction: Subtract the median of the dark frames recorded before the first LED.
+    :param settle_ms: Overrides the recorded settle time.
+    :param lead_ms: Overrides the recorded lead time.
+    :param workers: Number of processes; None uses every core, 1 decodes in this process.
+    :return: List of {"id", "position"} dicts for every LED.
+    """
+    meta, frames, timestamps = load_recording(folder)
+    windows = command_windows(meta, timestamps, settle_ms, lead_ms)
+
+    reference = None
+    if background_subtraction and meta["dark_frames"]:
+        dark = DarkReference(window=meta["dark_frames"])
+        for frame in frames[:meta["dark_frames"]]:
+            dark.update(frame)
+        reference = dark.reference
+    del frames
+
+    detector_args = {"threshold": threshold, "min_contour_area": min_contour_area}
+    if workers == 1:
+        _init_decoder(folder, detector_args, reference)
+        results = map(_decode_window, windows)
+    else:
+        pool = Pool(workers, initializer=_init_decoder, initargs=(folder, detector_args, reference))
+        results = pool.imap(_decode_window, windows, chunksize=4)
+
+    try:
+        found = {led_id: position for led_id, position in results if position is not None}
+    finally:
+        if workers != 1:
+            pool.close()
+            pool.join()
+        _worker.clear()
+
+    # Map every native centroid into output coordinates in one call
+    camera = CameraFeed()
+    camera.set_transform(meta["transform"])
+    points = camera.transform_points(list(found.values()), meta["frame_shape"])
+    positions = {led_id: [round(float(x), 2), round(float(y), 2)] for led_id, (x, y) in zip(found, points)}
+
+    led_positions = []
+    for led_id in range(meta["led_count"]):
+        position = positions.get(led_id)
+        if position:
+            print(f"LED {led_id}: Bright spot found at ({position[0]}, {position[1]})")
+        else:
+            print(f"LED {led_id}: No bright spot detected.")
+        led_positions.append({"id": led_id, "position": position})
+    return led_positions
@@ -0,0 +1,102 @@
+import numpy as np
+
+MA_PER_CHANNEL = 20.0  # WS2812B / WS2811 draw at a full channel
+IDLE_MA_PER_LED = 1.0  # Quiescent draw of each pixel driver
+
+
+def build_lut(gamma=1.0, white_balance=(1.0, 1.0, 1.0)):
+    """
+    Builds per-channel uint8 lookup tables for gamma correction and white balance.
+    :param gamma: Gamma exponent, or one per channel (R, G, B).
+    :param white_balance: Gain per channel (R, G, B), normally at most 1.
+    :return: (3, 256) uint8 array.
+    """
+    gamma = np.broadcast_to(np.asarray(gamma, dtype=np.float64), (3,))
+    gains = np.broadcast_to(np.asarray(white_balance, dtype=np.float64), (3,))
+    levels = np.arange(256, dtype=np.float64) / 255.0
+    lut = 255.0 * gains[:, None] * levels[None, :] ** gamma[:, None]
+    return np.clip(np.round(lut), 0, 255).astype(np.uint8)
+
+
+class ColorPipeline:
+    def __init__(self, led_count, gamma=1.0, white_balance=(1.0, 1.0, 1.0), max_amps=None,
+                 ma_per_channel=MA_PER_CHANNEL, idle_ma_per_led=IDLE_MA_PER_LED):
+        """
+        Output stage between a frame source and the LEDs: per-channel gamma and white
+        balance through one lookup table, then a global scale down whenever the
+        estimated current draw of the frame is over the supply's budget.
+        Every buffer is preallocated, so apply() does not allocate.
+        :param led_count: Number of LEDs in each frame.
+        :param gamma: Gamma exponent, or one per channel (R, G, B).
+        :param white_balance: Gain per channel (R, G, B).
+        :param max_amps: Current budget of the supply, None for no limit.
+        :param ma_per_channel: mA one channel draws at full level, or one per channel (R, G, B).
+        :param idle_ma_per_led: mA every LED draws even when dark.
+        """
+        self.led_count = led_count
+        self.lut = build_lut(gamma, white_balance)
+        self.max_amps = max_amps
+        self.ma_per_level = np.broadcast_to(np.asarray(ma_per_channel, dtype=np.float64), (3,)) / 255.0
+        self.idle_ma = led_count * idle_ma_per_led
+
+        self.staging = np.empty((led_count, 3), dtype=np.uint8)
+        self._index = np.empty((led_count, 3), dtype=np.uint16)
+        self._offsets = np.arange(3, dtype=np.uint16) * 256  # Row of each channel in the flattened table
+        self._flat_lut = self.lut.ravel()
+        self._levels = np.arange(256, dtype=np.float32)
+        self._scaled_levels = np.empty(256, dtype=np.float32)
+        self._scale_lut = np.empty(256, dtype=np.uint8)
+        self._channel_sums = np.empty(3, dtype=np.uint64)
+
+        self.last_ma = 0.0  # Estimated draw of the last frame, after limiting
+        self.last_scale = 1.0
+        self.limited_frames = 0
+
+    def estimate_ma(self, frame):
+        """
+        Estimated current draw of a frame in mA, linear in each channel's level.
+        """
+        np.sum(frame, axis=0, dtype=np.uint64, out=self._channel_sums)
+        return float(self._channel_sums @ self.ma_per_level) + self.idle_ma
+
+    def apply(self, frame, out=None):
+        """
+        Applies the lookup tables and the current limit.
+        :param frame: (led_count, 3) uint8 RGB array; it is only read unless it is also out.
+        :param out: Buffer to write to, defaults to the pipeline's staging buffer. Pass frame to work in place.
+        :return: The corrected frame.
+        """
+        out = self.staging if out is None else out
+        np.add(frame, self._offsets, out=self._index)
+        np.take(self._flat_lut, self._index, out=out, mode="clip")
+
+        self.last_scale = 1.0
+        self.last_ma = self.estimate_ma(out)
+        if self.max_amps is not None and self.last_ma > self.max_amps * 1000.0:
+            # Rounding the scaled levels down keeps the result under the budget
+            self.last_scale = max(self.max_amps * 1000.0 - self.idle_ma, 0.0) / (self.last_ma - self.idle_ma)
+            np.multiply(self._levels, self.last_scale, out=self._scaled_levels)
+            np.floor(self._scaled_levels, out=self._scaled_levels)
+            self._scale_lut[:] = self._scaled_levels
+            np.take(self._scale_lut, out, out=out, mode="clip")
+            self.last_ma = self.estimate_ma(out)
+            self.limited_frames += 1
+        return out
+
+
+def color_pipeline_from_config(config, led_count):
+    """
+    Builds a ColorPipeline from "gamma", "white_balance", "max_amps", "ma_per_channel" and
+    "idle_ma_per_led" config keys.
+    :param config: Loaded config.json, or a device entry of it.
+    :param led_count: Number of LEDs the pipeline feeds.
+    :return: The ColorPipeline, or None if none of the keys are set.
+    """
+    keys = ("gamma", "white_balance", "max_amps", "ma_per_channel", "idle_ma_per_led")
+    if all(config.get(key) is None for key in keys):
+        return None
+    return ColorPipeline(led_count, gamma=config.get("gamma", 1.0),
+                         white_balance=config.get("white_balance", (1.0, 1.0, 1.0)),
+                         max_amps=config.get("max_amps"),
+                         ma_per_channel=config.get("ma_per_channel", MA_PER_CHANNEL),
+                         idle_ma_per_led=config.get("idle_ma_per_led", IDLE_MA_PER_LED))
@@ -0,0 +1,326 @@
+import numpy as np
+
+from .led_map import load_positions, normalize_positions
+
+# 5x7 column-major glyphs, bit 0 is the top row
+FONT_5X7 = {
+    " ": (0x00, 0x00, 0x00, 0x00, 0x00), "!": (0x00, 0x00, 0x5F, 0x00, 0x00),
+    "-": (0x08, 0x08, 0x08, 0x08, 0x08), ".": (0x00, 0x60, 0x60, 0x00, 0x00),
+    "*": (0x14, 0x08, 0x3E, 0x08, 0x14),
+    "0": (0x3E, 0x51, 0x49, 0x45, 0x3E), "1": (0x00, 0x42, 0x7F, 0x40, 0x00),
+    "2": (0x42, 0x61, 0x51, 0x49, 0x46), "3": (0x21, 0x41, 0x45, 0x4B, 0x31),
+    "4": (0x18, 0x14, 0x12, 0x7F, 0x10), "5": (0x27, 0x45, 0x45, 0x45, 0x39),
+    "6": (0x3C, 0x4A, 0x49, 0x49, 0x30), "7": (0x01, 0x71, 0x09, 0x05, 0x03),
+    "8": (0x36, 0x49, 0x49, 0x49, 0x36), "9": (0x06, 0x49, 0x49, 0x29, 0x1E),
+    "A": (0x7E, 0x11, 0x11, 0x11, 0x7E), "B": (0x7F, 0x49, 0x49, 0x49, 0x36),
+    "C": (0x3E, 0x41, 0x41, 0x41, 0x22), "D": (0x7F, 0x41, 0x41, 0x22, 0x1C),
+    "E": (0x7F, 0x49, 0x49, 0x49, 0x41), "F": (0x7F, 0x09, 0x09, 0x09, 0x01),
+    "G": (0x3E, 0x41, 0x49, 0x49, 0x7A), "H": (0x7F, 0x08, 0x08, 0x08, 0x7F),
+    "I": (0x00, 0x41, 0x7F, 0x41, 0x00), "J": (0x20, 0x40, 0x41, 0x3F, 0x01),
+    "K": (0x7F, 0x08, 0x14, 0x22, 0x41), "L": (0x7F, 0x40, 0x40, 0x40, 0x40),
+    "M": (0x7F, 0x02, 0x0C, 0x02, 0x7F), "N": (0x7F, 0x04, 0x08, 0x10, 0x7F),
+    "O": (0x3E, 0x41, 0x41, 0x41, 0x3E), "P": (0x7F, 0x09, 0x09, 0x09, 0x06),
+    "Q": (0x3E, 0x41, 0x51, 0x21, 0x5E), "R": (0x7F, 0x09, 0x19, 0x29, 0x46),
+    "S": (0x46, 0x49, 0x49, 0x49, 0x31), "T": (0x01, 0x01, 0x7F, 0x01, 0x01),
+    "U": (0x3F, 0x40, 0x40, 0x40, 0x3F), "V": (0x1F, 0x20, 0x40, 0x20, 0x1F),
+    "W": (0x3F, 0x40, 0x38, 0x40, 0x3F), "X": (0x63, 0x14, 0x08, 0x14, 0x63),
+    "Y": (0x07, 0x08, 0x70, 0x08, 0x07), "Z": (0x61, 0x51, 0x49, 0x45, 0x43),
+}
+
+
+def gradient_palette(*colors):
+    """
+    Builds a 256 entry palette by blending evenly spaced colors.
+    :param colors: Two or more RGB tuples.
+    :return: (256, 3) uint8 array.
+    """
+    stops = np.linspace(0, 255, len(colors))
+    colors = np.asarray(colors, dtype=np.float32)
+    steps = np.arange(256)
+    palette = np.stack([np.interp(steps, stops, colors[:, c]) for c in range(3)], axis=1)
+    return np.ascontiguousarray(np.rint(palette).astype(np.uint8))
+
+
+def rainbow_palette():
+    """
+    Builds a full saturation hue wheel palette.
+    :return: (256, 3) uint8 array.
+    """
+    return gradient_palette((255, 0, 0), (255, 255, 0), (0, 255, 0), (0, 255, 255),
+                            (0, 0, 255), (255, 0, 255), (255, 0, 0))
+
+
+class Effect:
+    def __init__(self, palette=None):
+        """
+        Base class for spatial effects.
+        Subclasses precompute per-LED data in bind() and fill self.field with values
+        between 0 and 1 in evaluate(); the field is then mapped through the palette.
+        :param palette: (256, 3) uint8 palette, defaults to the effect's own.
+        """
+        self.palette = palette if palette is not None else self.default_palette()
+
+    def default_palette(self):
+        return rainbow_palette()
+
+    def bind(self, positions):
+        """
+        Allocates every buffer the effect needs for a given LED map.
+        :param positions: (N, D) float32 normalized positions with no NaNs.
+        """
+        count = len(positions)
+        self.field = np.empty(count, dtype=np.float32)
+        self.index = np.empty(count, dtype=np.intp)
+
+    def evaluate(self, t):
+        raise NotImplementedError
+
+    def render(self, t, out):
+        """
+        Renders the effect at time t into an RGB buffer without allocating.
+        :param t: Time in seconds.
+        :param out: (N, 3) uint8 buffer to write into.
+        """
+        self.evaluate(t)
+        np.multiply(self.field, 255, out=self.field)
+        np.copyto(self.index, self.field, casting="unsafe")
+        np.take(self.palette, self.index, axis=0, out=out, mode="clip")
+
+
+class PlaneSweep(Effect):
+    def __init__(self, direction=(0, 1), speed=0.5, width=0.15, palette=None):
+        """
+        A band of light sweeping across the tree along a direction.
+        :param direction: Direction of travel in map space (bottom to top by default).
+        :param speed: Map units per second.
+        :param width: Half width of the band in map units.
+        """
+        super().__init__(palette)
+        self.direction = np.asarray(direction, dtype=np.float32)
+        self.speed = speed
+        self.width = width
+
+    def default_palette(self):
+        return gradient_palette((0, 0, 0), (255, 140, 20), (255, 255, 255))
+
+    def bind(self, positions):
+        super().bind(positions)
+        direction = np.zeros(positions.shape[1], dtype=np.float32)
+        direction[:len(self.direction)] = self.direction[:positions.shape[1]]
+        direction /= np.linalg.norm(direction) or 1.0
+        self.projection = np.ascontiguousarray(positions @ direction, dtype=np.float32)
+        self.low = float(self.projection.min()) - self.width
+        self.span = float(self.projection.max()) + self.width - self.low
+
+    def evaluate(self, t):
+        phase = self.low + (t * self.speed) % self.span
+        np.subtract(self.projection, phase, out=self.field)
+        np.abs(self.field, out=self.field)
+        np.multiply(self.field, -1.0 / self.width, out=self.field)
+        np.add(self.field, 1.0, out=self.field)
+        np.maximum(self.field, 0.0, out=self.field)
+
+
+class RadialWave(Effect):
+    def __init__(self, center=(0.5, 0.5), wavelength=0.25, speed=0.5, palette=None):
+        """
+        Rings of color expanding out from a point.
+        :param center: Wave origin in map space.
+        :param wavelength: Distance between rings in map units.
+        :param speed: Rings per second.
+        """
+        super().__init__(palette)
+        self.center = center
+        self.wavelength = wavelength
+        self.speed = speed
+
+    def bind(self, positions):
+        super().bind(positions)
+        center = np.full(positions.shape[1], 0.5, dtype=np.float32)
+        center[:len(self.center)] = self.center[:positions.shape[1]]
+        distance = np.linalg.norm(positions - center, axis=1)
+        self.phase = np.ascontiguousarray(distance * (2 * np.pi / self.wavelength), dtype=np.float32)
+
+    def evaluate(self, t):
+        np.subtract(self.phase, 2 * np.pi * self.speed * t, out=self.field)
+        np.sin(self.field, out=self.field)
+        np.multiply(self.field, 0.5, out=self.field)
+        np.add(self.field, 0.5, out=self.field)
+
+
+class NoiseField(Effect):
+    def __init__(self, scale=4.0, velocity=(0.4, 0.15), octaves=2, seed=0, palette=None):
+        """
+        Drifting value noise over the first two map axes.
+        :param scale: Noise cells per map unit for the first octave.
+        :param velocity: Drift of the noise in cells per second.
+        :param octaves: Number of layered noise frequencies.
+        :param seed: Seed for the lattice values.
+        """
+        super().__init__(palette)
+        self.scale = scale
+        self.velocity = velocity
+        self.octaves = octaves
+        rng = np.random.default_rng(seed)
+        self.perm = np.tile(rng.permutation(256), 2).astype(np.intp)
+        self.values = rng.random(256).astype(np.float32)
+
+    def default_palette(self):
+        return gradient_palette((0, 0, 0), (0, 90, 10), (200, 0, 0), (255, 220, 120))
+
+    def bind(self, positions):
+        super().bind(positions)
+        count = len(positions)
+        self.x = np.ascontiguousarray(positions[:, 0] * self.scale, dtype=np.float32)
+        self.y = np.ascontiguousarray(positions[:, 1] * self.scale, dtype=np.float32)
+        self.fx, self.fy, self.ux, self.uy, self.tmp = (np.empty(count, dtype=np.float32) for _ in range(5))
+        self.corners = [np.empty(count, dtype=np.float32) for _ in range(4)]
+        self.ix, self.iy, self.hx0, self.hx1, self.hash, self.cell = (np.empty(count, dtype=np.intp) for _ in range(6))
+
+    def _lattice(self, coords, offset, frac, cell):
+        np.add(coords, offset, out=frac)
+        np.floor(frac, out=self.tmp)
+        np.copyto(cell, self.tmp, casting="unsafe")
+        np.bitwise_and(cell, 255, out=cell)
+        np.subtract(frac, self.tmp, out=frac)
+
+    def _smoothstep(self, frac, out):
+        np.multiply(frac, -2.0, out=out)
+        np.add(out, 3.0, out=out)
+        np.multiply(out, frac, out=out)
+        np.multiply(out, frac, out=out)
+
+    def _corner(self, hx, dy, out):
+        np.add(hx, self.iy, out=self.hash)
+        if dy:
+            np.add(self.hash, 1, out=self.hash)
+        np.take(self.perm, self.hash, out=self.cell, mode="wrap")
+        np.take(self.values, self.cell, out=out, mode="wrap")
+
+    def evaluate(self, t):
+        self.field.fill(0.0)
+        amplitude = 1.0
+        total = 0.0
+        n00, n10, n01, n11 = self.corners
+        for octave in range(self.octaves):
+            frequency = 2 ** octave
+            np.multiply(self.x, frequency, out=self.ux)
+            self._lattice(self.ux, t * self.velocity[0] * frequency, self.fx, self.ix)
+            np.multiply(self.y, frequency, out=self.uy)
+            self._lattice(self.uy, t * self.velocity[1] * frequency + 17.0 * octave, self.fy, self.iy)
+            self._smoothstep(self.fx, self.ux)
+            self._smoothstep(self.fy, self.uy)
+
+            np.take(self.perm, self.ix, out=self.hx0, mode="wrap")
+            np.add(self.ix, 1, out=self.hash)
+            np.take(self.perm, self.hash, out=self.hx1, mode="wrap")
+            self._corner(self.hx0, 0, n00)
+            self._corner(self.hx1, 0, n10)
+            self._corner(self.hx0, 1, n01)
+            self._corner(self.hx1, 1, n11)
+
+            # Bilinear blend: n00 + ux * (n10 - n00), then the same along y
+            np.subtract(n10, n00, out=n10)
+            np.multiply(n10, self.ux, out=n10)
+            np.add(n00, n10, out=n00)
+            np.subtract(n11, n01, out=n11)
+            np.multiply(n11, self.ux, out=n11)
+            np.add(n01, n11, out=n01)
+            np.subtract(n01, n00, out=n01)
+            np.multiply(n01, self.uy, out=n01)
+            np.add(n00, n01, out=n00)
+
+            np.multiply(n00, amplitude, out=n00)
+            np.add(self.field, n00, out=self.field)
+            total += amplitude
+            amplitude *= 0.5
+        np.multiply(self.field, 1.0 / total, out=self.field)
+
+
+class TextScroll(Effect):
+    def __init__(self, text="MERRY CHRISTMAS", speed=6.0, band=(0.35, 0.65), palette=None):
+        """
+        Text scrolling right to left across a horizontal band of the tree.
+        :param text: Text to scroll, unsupported characters render as spaces.
+        :param speed: Font columns per second.
+        :param band: (bottom, top) of the text band in map units.
+        """
+        super().__init__(palette)
+        self.text = text.upper()
+        self.speed = speed
+        self.band = band
+
+    def default_palette(self):
+        return gradient_palette((0, 0, 0), (255, 255, 255))
+
+    def bind(self, positions):
+        super().bind(positions)
+        columns = []
+        for char in self.text + "   ":
+            columns.extend(FONT_5X7.get(char, FONT_5X7[" "]))
+            columns.append(0)
+        bits = np.array(columns, dtype=np.uint8)
+        bitmap = (bits[None, :] >> np.arange(7, dtype=np.uint8)[:, None]) & 1
+        self.width = bitmap.shape[1]
+        self.bitmap = np.ascontiguousarray(bitmap.reshape(-1), dtype=np.float32)
+
+        # Rows only depend on height, so resolve them once
+        bottom, top = self.band
+        pixel = (top - bottom) / 7
+        rows = np.floor((top - positions[:, 1]) / pixel).astype(np.intp)
+        self.mask = ((rows >= 0) & (rows < 7)).astype(np.float32)
+        self.row_offset = np.clip(rows, 0, 6) * self.width
+        self.column = np.ascontiguousarray(positions[:, 0] / pixel, dtype=np.float32)
+        self.tmp = np.empty(len(positions), dtype=np.float32)
+
+    def evaluate(self, t):
+        np.add(self.column, t * self.speed, out=self.tmp)
+        np.floor(self.tmp, out=self.tmp)
+        np.copyto(self.index, self.tmp, casting="unsafe")
+        np.remainder(self.index, self.width, out=self.index)
+        np.add(self.index, self.row_offset, out=self.index)
+        np.take(self.bitmap, self.index, out=self.field, mode="clip")
+        np.multiply(self.field, self.mask, out=self.field)
+
+
+class EffectEngine:
+    def __init__(self, positions, valid=None):
+        """
+        Renders spatial effects for every LED into a reusable RGB buffer.
+        :param positions: (N, 2) or (N, 3) normalized positions, NaN for unmapped LEDs.
+        :param valid: Optional (N,) bool mask of mapped LEDs.
+        """
+        positions = np.asarray(positions, dtype=np.float32)
+        self.valid = valid if valid is not None else ~np.isnan(positions).any(axis=1)
+        self.positions = np.ascontiguousarray(np.nan_to_num(positions, nan=0.0))
+        self.mask = self.valid.astype(np.uint8)[:, None]
+        self.frame = np.zeros((len(positions), 3), dtype=np.uint8)
+        self.effect = None
+
+    @classmethod
+    def from_map(cls, path, led_count=None):
+        """
+        Builds an engine from a map JSON file such as data/2d_map.json.
+        :param path: Path to the map file.
+        :param led_count: Total number of LEDs.
+        """
+        positions, valid = load_positions(path, led_count)
+        return cls(normalize_positions(positions), valid)
+
+    def set_effect(self, effect):
+        """
+        Binds an effect to this engine's LED map.
+        :param effect: An Effect instance.
+        """
+        effect.bind(self.positions)
+        self.effect = effect
+
+    def render(self, t):
+        """
+        Renders the current effect at time t. Unmapped LEDs stay dark.
+        :param t: Time in seconds.
+        :return: The engine's (N, 3) uint8 frame buffer.
+        """
+        self.effect.render(t, self.frame)
+        np.multiply(self.frame, self.mask, out=self.frame)
+        return self.frame
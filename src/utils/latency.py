@@ -0,0 +1,114 @@
+import json
+import time
+
+import numpy as np
+
+LATENCY_FILE = "data/latency.json"
+
+
+def _next_frame(camera, grabber, after):
+    """
+    Reads the next frame and the time it was taken.
+    """
+    if grabber is not None:
+        timestamp, frame = grabber.get_frame_after(after)
+    else:
+        ret, frame = camera.cap.read()
+        timestamp = time.perf_counter() - camera.exposure_latency if ret else None
+        if not ret:
+            frame = None
+    if frame is None:
+        return None, None
+    return timestamp, frame
+
+
+def measure_latency(wled, camera, detector, led_id=0, trials=20, grabber=None, timeout=2.0):
+    """
+    Measures end to end command-to-light latency: HTTP round trip, controller refresh
+    and camera exposure. Each trial turns the LED off, waits until the camera sees it
+    dark, then times from sending the on command to the first frame showing the spot.
+    :param wled: The WLEDController driving the LEDs.
+    :param camera: An initialized CameraFeed.
+    :param detector: The BrightSpot detector.
+    :param led_id: LED to toggle; pick one clearly in view.
+    :param trials: Number of on/off cycles.
+    :param grabber: Optional running FrameGrabber; its frames are read as soon as they arrive.
+                    Either way frames are stamped with the camera's exposure latency taken off.
+    :param timeout: Seconds to wait for each transition before giving up on the trial.
+    :return: (latencies, round_trips) arrays in seconds: latency from sending the on command,
+             NaN for trials where the LED was never seen, and how long that command took to be acknowledged.
+    """
+    samples = np.full(trials, np.nan)
+    round_trips = np.full(trials, np.nan)
+    for trial in range(trials):
+        wled.turn_off_all_leds()
+        after = time.perf_counter()
+        deadline = after + timeout
+        while time.perf_counter() < deadline:
+            timestamp, frame = _next_frame(camera, grabber, after)
+            if frame is not None:
+                after = timestamp + 1e-6
+                if not detector.find_bright_spot(frame):
+                    break
+
+        sent = time.perf_counter()
+        wled.turn_on_single_led(led_id=led_id, color=(255, 255, 255), brightness=255)
+        round_trips[trial] = time.perf_counter() - sent
+        after = sent
+        deadline = sent + timeout
+        while time.perf_counter() < deadline:
+            timestamp, frame = _next_frame(camera, grabber, after)
+            if frame is None:
+                continue
+            if detector.find_bright_spot(frame):
+                samples[trial] = timestamp - sent
+                break
+            after = timestamp + 1e-6
+    wled.turn_off_all_leds()
+    return samples, round_trips
+
+
+def save_latency(path, samples, round_trips=None):
+    """
+    Writes the measured latency distribution to JSON.
+    :param path: Output path, normally data/latency.json.
+    :param samples: Latencies in seconds, NaN for missed trials.
+    :param round_trips: Optional command round trips in seconds, saved as their median round_trip_ms.
+    :return: The saved summary dict.
+    """
+    seen = np.asarray(samples, dtype=np.float64)
+    seen = seen[~np.isnan(seen)] * 1000.0
+    summary = {"trials": len(samples), "missed": len(samples) - len(seen),
+               "samples_ms": [round(float(v), 2) for v in seen]}
+    if len(seen):
+        p50, p95, p99 = np.percentile(seen, [50, 95, 99])
+        summary.update(min_ms=float(seen.min()), p50_ms=float(p50), p95_ms=float(p95), p99_ms=float(p99),
+                       max_ms=float(seen.max()))
+    if round_trips is not None and not np.isnan(round_trips).all():
+        summary["round_trip_ms"] = float(np.nanmedian(round_trips) * 1000.0)
+    with open(path, "w") as json_file:
+        json.dump(summary, json_file, indent=4)
+    return summary
+
+
+def load_settle_ms(path=LATENCY_FILE, percentile="p95_ms", default=None, after_ack=False):
+    """
+    Reads a settle time from a saved latency distribution.
+    :param path: Latency JSON written by save_latency.
+    :param percentile: Which summary key to use.
+    :param default: Returned when there is no usable measurement.
+    :param after_ack: True when the wait starts once the command is acknowledged rather than sent;
+                      the saved latencies count from sending, so the round trip is subtracted.
+    :return: Settle time in whole milliseconds, or default.
+    """
+    try:
+        with open(path, "r") as json_file:
+            summary = json.load(json_file)
+    except (OSError, ValueError):
+        return default
+    value = summary.get(percentile)
+    if value is None:
+        return default
+    if after_ack:
+        value = max(value - summary.get("round_trip_ms", 0.0), 0.0)
+    return int(np.ceil(value))
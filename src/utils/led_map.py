@@ -0,0 +1,187 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAP_MAGIC = b"XMAP"
+MAP_VERSION = 1
+MAP_HEADER_FORMAT = "<4sHHII16x"  # magic, version, dims, LED count, records offset
+MAP_HEADER_SIZE = struct.calcsize(MAP_HEADER_FORMAT)
+MAP_DTYPE = np.dtype([("id", "<u4"), ("xyz", "<f4", (3,)), ("confidence", "<f4")])
+
+
+def load_positions(path, led_count=None):
+    """
+    Loads an LED map into a contiguous float array indexed by LED ID.
+    :param path: Path to a map JSON file such as data/2d_map.json, or a binary .bin map.
+    :param led_count: Number of rows to allocate, defaults to the highest ID in the map + 1.
+    :return: (positions, valid) where positions is (N, D) float32 with NaN for missing LEDs
+             and valid is an (N,) bool mask.
+    """
+    if path.endswith(".bin"):
+        return BinaryMap(path).dense_positions(led_count)
+
+    with open(path, "r") as json_file:
+        led_positions = json.load(json_file)
+
+    dims = next((len(led["position"]) for led in led_positions if led["position"]), 2)
+    count = led_count if led_count is not None else max((led["id"] for led in led_positions), default=-1) + 1
+
+    positions = np.full((count, dims), np.nan, dtype=np.float32)
+    for led in led_positions:
+        if led["position"] and 0 <= led["id"] < count:
+            positions[led["id"]] = led["position"]
+    return positions, ~np.isnan(positions).any(axis=1)
+
+
+def normalize_positions(positions, flip_y=True):
+    """
+    Scales positions into the unit box while keeping their aspect ratio.
+    Image coordinates grow downwards, so y is flipped to make 0 the bottom of the tree.
+    :param positions: (N, D) float array, NaN rows are left as NaN.
+    :param flip_y: True to flip the y axis.
+    :return: (N, D) float32 array with every axis starting at 0 and the longest axis spanning 0-1.
+    """
+    positions = np.array(positions, dtype=np.float32)
+    if flip_y:
+        positions[:, 1] *= -1
+    lo = np.nanmin(positions, axis=0)
+    extent = float(np.nanmax(np.nanmax(positions, axis=0) - lo)) or 1.0
+    positions -= lo
+    positions /= extent
+    return np.ascontiguousarray(positions)
+
+
+def save_binary_map(path, ids, positions, valid, confidence=None):
+    """
+    Writes an LED map in the versioned binary format: a 32 byte header, a validity
+    bitmask padded to 8 bytes, then one (id, xyz, confidence) record per LED.
+    :param path: Output file path, conventionally ending in .bin.
+    :param ids: (N,) LED IDs.
+    :param positions: (N, 2) or (N, 3) positions; invalid rows are stored as NaN.
+    :param valid: (N,) bool mask of mapped LEDs.
+    :param confidence: Optional (N,) detection confidence, defaults to 1 for valid LEDs.
+    """
+    positions = np.asarray(positions, dtype=np.float32)
+    valid = np.asarray(valid, dtype=bool)
+    count, dims = positions.shape
+
+    records = np.zeros(count, dtype=MAP_DTYPE)
+    records["id"] = ids
+    records["xyz"][:, :dims] = positions
+    records["xyz"][~valid] = np.nan
+    records["confidence"] = valid if confidence is None else confidence
+
+    mask = np.packbits(valid)
+    mask = np.concatenate((mask, np.zeros(-len(mask) % 8, dtype=np.uint8)))
+    with open(path, "wb") as map_file:
+        map_file.write(struct.pack(MAP_HEADER_FORMAT, MAP_MAGIC, MAP_VERSION, dims, count,
+                                   MAP_HEADER_SIZE + len(mask)))
+        map_file.write(mask.tobytes())
+        map_file.write(records.tobytes())
+
+
+class BinaryMap:
+    def __init__(self, path):
+        """
+        Opens a binary LED map. Records are memory mapped, so nothing is parsed
+        until a field is used.
+        :param path: Path to the .bin map.
+        """
+        with open(path, "rb") as map_file:
+            header = map_file.read(MAP_HEADER_SIZE)
+        if len(header) < MAP_HEADER_SIZE or header[:4] != MAP_MAGIC:
+            raise ValueError(f"Error: {path} is not a binary LED map.")
+        _, version, dims, count, records_offset = struct.unpack(MAP_HEADER_FORMAT, header)
+        if version != MAP_VERSION:
+            raise ValueError(f"Error: {path} has unsupported map version {version}.")
+
+        self.path = path
+        self.dims = dims
+        self.count = count
+        self.records = np.memmap(path, dtype=MAP_DTYPE, mode="r", offset=records_offset, shape=(count,)) \
+            if count else np.zeros(0, dtype=MAP_DTYPE)
+        self._mask = np.memmap(path, dtype=np.uint8, mode="r", offset=MAP_HEADER_SIZE,
+                               shape=(records_offset - MAP_HEADER_SIZE,)) if count else np.zeros(0, dtype=np.uint8)
+
+    @property
+    def ids(self):
+        return self.records["id"]
+
+    @property
+    def positions(self):
+        """
+        (N, dims) view of the stored positions.
+        """
+        return self.records["xyz"][:, :self.dims]
+
+    @property
+    def confidence(self):
+        return self.records["confidence"]
+
+    @property
+    def valid(self):
+        return np.unpackbits(self._mask, count=self.count).astype(bool)
+
+    def dense_positions(self, led_count=None):
+        """
+        Positions scattered into a contiguous array indexed by LED ID, like load_positions.
+        :param led_count: Number of rows to allocate, defaults to the highest ID + 1.
+        :return: (positions, valid).
+        """
+        ids = np.asarray(self.ids, dtype=np.int64)
+        count = led_count if led_count is not None else (int(ids.max()) + 1 if len(ids) else 0)
+        keep = self.valid & (ids < count)
+        positions = np.full((count, self.dims), np.nan, dtype=np.float32)
+        positions[ids[keep]] = self.positions[keep]
+        return positions, ~np.isnan(positions).any(axis=1)
+
+
+def json_to_binary(json_path, binary_path):
+    """
+    Converts a JSON map ({"id", "position"} entries, optional "confidence") to the binary format.
+    """
+    with open(json_path, "r") as json_file:
+        led_positions = json.load(json_file)
+    dims = next((len(led["position"]) for led in led_positions if led["position"]), 2)
+
+    ids = np.array([led["id"] for led in led_positions], dtype=np.uint32)
+    valid = np.array([bool(led["position"]) for led in led_positions], dtype=bool)
+    positions = np.array([led["position"] if led["position"] else [np.nan] * dims for led in led_positions],
+                         dtype=np.float32).reshape(len(led_positions), dims)
+    confidence = np.array([led.get("confidence", 1.0 if led["position"] else 0.0) for led in led_positions],
+                          dtype=np.float32)
+    save_binary_map(binary_path, ids, positions, valid, confidence)
+
+
+def binary_to_json(binary_path, json_path):
+    """
+    Converts a binary map back to the JSON format written by 2d_capture.py.
+    """
+    binary_map = BinaryMap(binary_path)
+    valid = binary_map.valid
+    led_positions = [
+        {"id": int(led_id), "position": [round(float(v), 2) for v in position] if ok else None}
+        for led_id, position, ok in zip(binary_map.ids, binary_map.positions, valid)
+    ]
+    with open(json_path, "w") as json_file:
+        json.dump(led_positions, json_file, indent=4)
+
+
+def binary_path_for(json_path):
+    """
+    The binary map path that sits next to a JSON map, e.g. data/2d_map.bin.
+    """
+    return os.path.splitext(json_path)[0] + ".bin"
+
+
+def preferred_map_path(json_path):
+    """
+    Returns the binary sidecar of a JSON map when it is at least as new, otherwise the JSON path.
+    """
+    binary_path = binary_path_for(json_path)
+    if os.path.exists(binary_path) and (not os.path.exists(json_path)
+                                        or os.path.getmtime(binary_path) >= os.path.getmtime(json_path)):
+        return binary_path
+    return json_path
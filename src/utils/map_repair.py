@@ -0,0 +1,88 @@
+import numpy as np
+
+from .spatial_index import GridIndex
+
+
+def neighbor_distances(positions):
+    """
+    Distance from each LED to the previous and next LED along the string.
+    :param positions: (N, D) float array with NaN for missing LEDs.
+    :return: (previous, next) arrays of shape (N,), NaN where a neighbor is missing.
+    """
+    steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+    previous = np.concatenate(([np.nan], steps))
+    following = np.concatenate((steps, [np.nan]))
+    return previous, following
+
+
+def step_spacing(steps, factor=4.0, min_step=0.05, iterations=3):
+    """
+    Typical LED spacing along the string, ignoring degenerate steps between LEDs detected
+    on the same spot and jumps to misplaced LEDs. It starts from the upper quartile, which
+    is still a real step when up to half of the LEDs collapsed onto one hotspot.
+    :param steps: Distances between consecutive LEDs, NaN where one is missing.
+    :param factor: Steps longer than factor times the spacing are jumps.
+    :param min_step: Steps shorter than this fraction of the spacing are degenerate.
+    :param iterations: Refinement passes.
+    :return: The spacing, or NaN if there are no steps.
+    """
+    steps = steps[~np.isnan(steps)]
+    if not len(steps):
+        return np.nan
+    spacing = float(np.percentile(steps, 75))
+    for _ in range(iterations):
+        usable = steps[(steps >= min_step * spacing) & (steps <= factor * spacing)]
+        if spacing <= 0 or not len(usable):
+            break
+        spacing = float(np.median(usable))
+    return spacing
+
+
+def find_outliers(positions, factor=4.0, min_step=0.05):
+    """
+    Flags LEDs that were almost certainly mis-detected. Consecutive LEDs are physically
+    close, so an LED further than factor times the typical LED spacing from every mapped
+    neighbor is flagged. So are both LEDs of a step much shorter than the spacing, and
+    LEDs sharing their position with two or more others: the common failure where many
+    LEDs are detected on one bright spot. Two LEDs on opposite sides of the tree can line
+    up in a 2D view, so a position shared by two LEDs alone is not flagged.
+    :param positions: (N, D) float array with NaN for missing LEDs.
+    :param factor: Multiple of the LED spacing beyond which an LED is an outlier.
+    :param min_step: Fraction of the LED spacing below which two positions are the same spot.
+    :return: (N,) bool mask of outliers. Missing LEDs are never flagged.
+    """
+    previous, following = neighbor_distances(positions)
+    spacing = step_spacing(previous, factor, min_step)
+    if np.isnan(spacing) or spacing <= 0:
+        return np.zeros(len(positions), dtype=bool)
+
+    with np.errstate(invalid="ignore"):
+        nearest = np.fmin(previous, following)  # Ignores a missing neighbor
+        far = nearest > factor * spacing
+        degenerate = (previous < min_step * spacing) | (following < min_step * spacing)
+
+    # Count every LED within min_step of each mapped LED, itself included
+    valid = ~np.isnan(positions).any(axis=1)
+    shared = np.zeros(len(positions), dtype=bool)
+    if valid.sum() > 2:
+        offsets, _ = GridIndex(positions).query_radius(positions[valid], min_step * spacing)
+        shared[valid] = np.diff(offsets) > 2
+    return far | degenerate | shared
+
+
+def interpolate_missing(positions):
+    """
+    Fills missing LEDs by interpolating between the nearest mapped LEDs along the string.
+    LEDs before the first or after the last mapped LED take the nearest mapped position.
+    :param positions: (N, D) float array with NaN for missing LEDs.
+    :return: (filled, interpolated) with filled (N, D) and interpolated an (N,) bool mask.
+    """
+    missing = np.isnan(positions).any(axis=1)
+    filled = np.array(positions, dtype=np.float64)
+    if missing.all() or not missing.any():
+        return filled, missing & ~missing.all()
+
+    ids = np.arange(len(positions))
+    for axis in range(positions.shape[1]):
+        filled[missing, axis] = np.interp(ids[missing], ids[~missing], filled[~missing, axis])
+    return filled, missing
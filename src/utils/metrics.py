@@ -0,0 +1,52 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyStats:
+    def __init__(self, window=1000):
+        """
+        Keeps a rolling window of latency samples.
+        :param window: Number of most recent samples to keep.
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Records a single latency sample.
+        :param seconds: The measured latency in seconds.
+        """
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def reset(self):
+        """
+        Clears all recorded samples.
+        """
+        with self.lock:
+            self.samples.clear()
+            self.count = 0
+
+    def summary(self):
+        """
+        Summarises the recorded samples in milliseconds.
+        :return: Dict with count, mean, p50, p99 and max latency.
+        """
+        with self.lock:
+            values = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+            count = self.count
+        if not len(values):
+            return {"count": count, "mean_ms": None, "p50_ms": None, "p99_ms": None, "max_ms": None}
+        values *= 1000.0
+        p50, p99 = np.percentile(values, [50, 99])
+        return {
+            "count": count,
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max()),
+        }
@@ -0,0 +1,96 @@
+import numpy as np
+
+JSON_MAX_BYTES = 8192  # Comfortably under the JSON buffer of ESP8266 (10 KB) and ESP32 (24 KB+) builds
+MIN_RANGE = 3  # Shorter runs are cheaper as consecutive colors than as [start, stop, color]
+PAYLOAD_OVERHEAD = 96  # {"seg": [{"id": 0, "start": 0, "stop": N, "on": true, "bri": B, "i": [...]}]}
+
+
+def color_runs(frame, changed=None):
+    """
+    Splits a frame into runs of equal color.
+    :param frame: (N, 3) uint8 RGB array.
+    :param changed: Optional (N,) bool mask; only runs of changed LEDs are returned.
+    :return: (starts, stops, colors) where colors are "RRGGBB" strings.
+    """
+    count = len(frame)
+    if changed is None:
+        changed = np.ones(count, dtype=bool)
+    continues = np.zeros(count, dtype=bool)
+    continues[1:] = (frame[1:] == frame[:-1]).all(axis=1) & changed[1:] & changed[:-1]
+    starts = np.flatnonzero(changed & ~continues)
+    stops = np.flatnonzero(changed & ~np.append(continues[1:], False)) + 1
+    packed = frame[starts].astype(np.uint32)
+    packed = (packed[:, 0] << 16) | (packed[:, 1] << 8) | packed[:, 2]
+    return starts, stops, ["%06X" % value for value in packed.tolist()]
+
+
+class PixelEncoder:
+    def __init__(self, led_count, max_bytes=JSON_MAX_BYTES):
+        """
+        Encodes RGB frames as WLED per-LED "i" arrays for segment 0. Runs of one color
+        become [start, stop, "RRGGBB"], single LEDs become [index, "RRGGBB", ...] with
+        following LEDs continuing the sequence, and only LEDs that differ from the last
+        acknowledged frame are sent. Large updates are split to fit the device's JSON buffer.
+        :param led_count: Total number of LEDs.
+        :param max_bytes: Largest serialized payload to produce.
+        """
+        self.led_count = led_count
+        self.max_bytes = max_bytes
+        self.acked = np.zeros((led_count, 3), dtype=np.uint8)
+        self.acked_brightness = None
+        self.known = False  # Whether acked matches what the device shows
+
+    def reset(self):
+        """
+        Forgets the acknowledged frame, e.g. after another command changed the LEDs.
+        """
+        self.known = False
+
+    def acknowledge(self, frame, brightness=255):
+        """
+        Records a frame the device has accepted, so the next encode only sends changes.
+        """
+        np.copyto(self.acked, frame)
+        self.acked_brightness = brightness
+        self.known = True
+
+    def encode(self, frame, brightness=255):
+        """
+        Builds the payloads that update the device from the acknowledged frame to this one.
+        :param frame: (led_count, 3) uint8 RGB array.
+        :param brightness: Segment brightness (0-255).
+        :return: List of JSON payloads, empty if nothing changed.
+        """
+        frame = np.asarray(frame, dtype=np.uint8)
+        if frame.shape != (self.led_count, 3):
+            raise ValueError(f"Frame must be a ({self.led_count}, 3) uint8 array.")
+        changed = (frame != self.acked).any(axis=1) if self.known else None
+        if changed is not None and not changed.any():
+            if brightness == self.acked_brightness:
+                return []
+            return [{"seg": [{"id": 0, "bri": brightness}]}]
+
+        chunks = []
+        values, size, cursor = [], 0, -1  # cursor: index a bare color would be written to
+        for start, stop, color in zip(*color_runs(frame, changed)):
+            start, stop = int(start), int(stop)
+            if stop - start >= MIN_RANGE:
+                tokens = [start, stop, color]
+            else:
+                tokens = [color] * (stop - start) if start == cursor else [start] + [color] * (stop - start)
+            # Serialized size including quotes and the ", " separator json.dumps adds
+            cost = sum(len(str(token)) + (4 if isinstance(token, str) else 2) for token in tokens)
+            if values and size + cost > self.max_bytes - PAYLOAD_OVERHEAD:
+                chunks.append(values)
+                values, size = [], 0
+                if isinstance(tokens[0], str):
+                    tokens = [start] + tokens
+                    cost += len(str(start)) + 2
+            values.extend(tokens)
+            size += cost
+            cursor = stop
+        if values:
+            chunks.append(values)
+
+        return [{"seg": [{"id": 0, "start": 0, "stop": self.led_count, "on": True, "bri": brightness, "i": values}]}
+                for values in chunks]
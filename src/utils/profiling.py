@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class Profiler:
+    def __init__(self, enabled=True):
+        """
+        Collects wall-clock timings of named code spans.
+        A disabled profiler records nothing, so hooks can stay in hot paths.
+        :param enabled: False to make span() a no-op.
+        """
+        self.enabled = enabled
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the enclosed block under the given name.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.samples[name].append(elapsed)
+
+    def summary(self):
+        """
+        Per span statistics in milliseconds.
+        :return: Dict of name -> count, total, mean, p50, p99 and max.
+        """
+        with self.lock:
+            samples = {name: np.array(values) * 1000.0 for name, values in self.samples.items()}
+        result = {}
+        for name, values in samples.items():
+            p50, p99 = np.percentile(values, [50, 99])
+            result[name] = {"count": len(values), "total_ms": float(values.sum()), "mean_ms": float(values.mean()),
+                            "p50_ms": float(p50), "p99_ms": float(p99), "max_ms": float(values.max())}
+        return result
+
+    def format(self):
+        """
+        The summary as an aligned text table.
+        """
+        lines = [f"{'span':<28}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<28}{stats['count']:>8}{stats['mean_ms']:>10.3f}{stats['p50_ms']:>10.3f}"
+                         f"{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Writes the summary to a JSON file.
+        """
+        with open(path, "w") as json_file:
+            json.dump(self.summary(), json_file, indent=4)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+
+NULL_PROFILER = Profiler(enabled=False)
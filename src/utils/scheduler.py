@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .metrics import LatencyStats
+
+
+class FrameMetrics:
+    def __init__(self, window=600):
+        """
+        Live playback metrics shared between the render and send threads.
+        :param window: Number of recent frames used for rates and percentiles.
+        """
+        self.latency = LatencyStats(window)  # Frame deadline to send complete
+        self.send_time = LatencyStats(window)
+        self.render_time = LatencyStats(window)
+        self.sent_at = deque(maxlen=window)
+        self.frames_rendered = 0
+        self.frames_sent = 0
+        self.dropped = 0
+
+    def snapshot(self):
+        """
+        Returns the current metrics. Safe to call from any thread while playing.
+        :return: Dict with achieved FPS, frame latency, send time, render time and drop counts.
+        """
+        sent_at = list(self.sent_at)
+        fps = (len(sent_at) - 1) / (sent_at[-1] - sent_at[0]) if len(sent_at) > 1 and sent_at[-1] > sent_at[0] else 0.0
+        latency = self.latency.summary()
+        send = self.send_time.summary()
+        render = self.render_time.summary()
+        return {
+            "fps": fps,
+            "frames_rendered": self.frames_rendered,
+            "frames_sent": self.frames_sent,
+            "dropped": self.dropped,
+            "latency_p50_ms": latency["p50_ms"],
+            "latency_p99_ms": latency["p99_ms"],
+            "send_p50_ms": send["p50_ms"],
+            "send_p99_ms": send["p99_ms"],
+            "render_p99_ms": render["p99_ms"],
+        }
+
+    def format(self):
+        """
+        Formats the current metrics as a single status line.
+        """
+        s = self.snapshot()
+        fmt = lambda value: "-" if value is None else f"{value:.1f}"
+        return (f"{s['fps']:.1f} FPS | latency p50 {fmt(s['latency_p50_ms'])} ms p99 {fmt(s['latency_p99_ms'])} ms | "
+                f"send p99 {fmt(s['send_p99_ms'])} ms | dropped {s['dropped']}/{s['frames_rendered']}")
+
+
+class FrameScheduler:
+    def __init__(self, render, send, fps=40, report_every=None):
+        """
+        Plays frames at a fixed rate with rendering and sending on separate threads.
+        Frames are due on a monotonic deadline clock. If rendering falls behind, missed
+        ticks are skipped; if sending falls behind, an unsent frame is replaced by the
+        newer one. Either way the frame counts as dropped and no backlog builds up.
+        :param render: Callable (frame_index, t) returning the frame to send, or None to stop.
+                       Numpy frames are copied into preallocated slots so the renderer may reuse its buffer.
+        :param send: Callable taking a frame and transmitting it.
+        :param fps: Target frames per second.
+        :param report_every: Seconds between printed metric lines, or None for no output.
+        """
+        self.render = render
+        self.send = send
+        self.period = 1.0 / fps
+        self.report_every = report_every
+        self.metrics = FrameMetrics()
+
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.pending = None  # (slot, frame, deadline) waiting to be sent
+        self.in_flight = None
+        self.finished = False
+        self.slots = None
+        self.threads = []
+
+    def start(self):
+        """
+        Starts the render and send threads.
+        """
+        self.stop_event.clear()
+        self.finished = False
+        self.start_time = time.perf_counter()
+        self.threads = [
+            threading.Thread(target=self._render_loop, name="frame-render", daemon=True),
+            threading.Thread(target=self._send_loop, name="frame-send", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stops playback and waits for both threads to exit.
+        """
+        self.stop_event.set()
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def run(self, duration=None):
+        """
+        Plays until the renderer returns None, the duration elapses or Ctrl+C is pressed.
+        :param duration: Optional maximum playback time in seconds.
+        :return: The final metrics snapshot.
+        """
+        self.start()
+        next_report = time.perf_counter() + (self.report_every or 0)
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                if duration is not None and time.perf_counter() - self.start_time >= duration:
+                    break
+                self.threads[-1].join(timeout=0.05)
+                if self.report_every and time.perf_counter() >= next_report:
+                    print(self.metrics.format())
+                    next_report += self.report_every
+        except KeyboardInterrupt:
+            print("Stopping playback...")
+        self.stop()
+        return self.metrics.snapshot()
+
+    def _store(self, frame):
+        if not isinstance(frame, np.ndarray):
+            return None, frame
+        if self.slots is None or self.slots[0].shape != frame.shape or self.slots[0].dtype != frame.dtype:
+            self.slots = [np.empty_like(frame) for _ in range(3)]
+        with self.condition:
+            busy = {self.in_flight, self.pending[0] if self.pending else None}
+        slot = next(i for i in range(3) if i not in busy)
+        np.copyto(self.slots[slot], frame)
+        return slot, self.slots[slot]
+
+    def _render_loop(self):
+        frame_index = 0
+        while not self.stop_event.is_set():
+            deadline = self.start_time + frame_index * self.period
+            if self.stop_event.wait(max(0.0, deadline - time.perf_counter())):
+                break
+
+            # Skip ticks that are already in the past instead of rendering them late
+            behind = int((time.perf_counter() - deadline) // self.period)
+            if behind > 0:
+                self.metrics.dropped += behind
+                frame_index += behind
+                deadline = self.start_time + frame_index * self.period
+
+            render_start = time.perf_counter()
+            frame = self.render(frame_index, frame_index * self.period)
+            if frame is None:
+                break
+            slot, frame = self._store(frame)
+            self.metrics.render_time.record(time.perf_counter() - render_start)
+            self.metrics.frames_rendered += 1
+
+            with self.condition:
+                if self.pending is not None:
+                    self.metrics.dropped += 1  # Sender never got to it, replace with the fresher frame
+                self.pending = (slot, frame, deadline)
+                self.condition.notify_all()
+            frame_index += 1
+
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def _send_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or self.finished)
+                if self.pending is None or self.stop_event.is_set():
+                    return
+                slot, frame, deadline = self.pending
+                self.pending = None
+                self.in_flight = slot
+
+            send_start = time.perf_counter()
+            self.send(frame)
+            done = time.perf_counter()
+            self.metrics.send_time.record(done - send_start)
+            self.metrics.latency.record(done - deadline)
+            self.metrics.sent_at.append(done)
+            self.metrics.frames_sent += 1
+
+            with self.condition:
+                self.in_flight = None
@@ -0,0 +1,96 @@
+import numpy as np
+
+MAX_SEGMENTS = 16  # WLED's segment limit on ESP8266 builds; ESP32 builds allow 32
+SEGMENT_LIMIT = 32  # Most segments any build allows; WLED ignores IDs past a device's own limit
+MIN_RUN = 3  # Shorter runs at band edges are map jitter, not a region worth a segment
+
+
+def chain_runs(labels):
+    """
+    Splits a label per LED into runs of equal labels along the chain.
+    :param labels: (N,) int array.
+    :return: (starts, stops, labels) arrays, one entry per run.
+    """
+    labels = np.asarray(labels)
+    if not len(labels):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), labels
+    starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    stops = np.append(starts[1:], len(labels))
+    return starts, stops, labels[starts]
+
+
+def _merge_runs(starts, stops, labels, max_segments, min_length):
+    """
+    Absorbs runs shorter than min_length, then keeps merging the shortest run into a
+    neighbour until at most max_segments remain. A run joins the neighbour whose band
+    is closest to its own, the longer one on a tie, and the longer of the two keeps its band.
+    """
+    runs = [[int(start), int(stop), int(label)] for start, stop, label in zip(starts, stops, labels)]
+    while len(runs) > 1:
+        lengths = [stop - start for start, stop, _ in runs]
+        shortest = int(np.argmin(lengths))
+        if len(runs) <= max_segments and lengths[shortest] >= min_length:
+            break
+        neighbours = [i for i in (shortest - 1, shortest + 1) if 0 <= i < len(runs)]
+        other = min(neighbours, key=lambda i: (abs(runs[i][2] - runs[shortest][2]), -lengths[i]))
+        first, second = sorted((shortest, other))
+        label = runs[other][2] if lengths[other] >= lengths[shortest] else runs[shortest][2]
+        runs[first:second + 1] = [[runs[first][0], runs[second][1], label]]
+
+        # Neighbours that now share a band become one run
+        merged = [runs[0]]
+        for run in runs[1:]:
+            if run[2] == merged[-1][2]:
+                merged[-1][1] = run[1]
+            else:
+                merged.append(run)
+        runs = merged
+    return runs
+
+
+def plan_bands(positions, valid=None, bands=4, axis=1, max_segments=MAX_SEGMENTS, min_length=MIN_RUN):
+    """
+    Splits the tree into horizontal bands and maps them onto contiguous LED index ranges,
+    the only shape a WLED segment can take. LEDs are labelled with their band from the map,
+    the chain is cut wherever the label changes, and the runs are merged until they fit in
+    max_segments. Each segment is reversed when the chain runs downwards through it, so
+    native effects all flow up the tree.
+    :param positions: (N, D) normalized positions (see normalize_positions), NaN for unmapped LEDs.
+    :param valid: Optional (N,) bool mask of mapped LEDs.
+    :param bands: Number of equal height bands.
+    :param axis: Position axis the bands are cut along, 1 for height.
+    :param max_segments: Most segments the device supports.
+    :param min_length: Shortest run kept as its own segment.
+    :return: List of {"start", "stop", "band", "rev"} dicts covering every LED in chain order.
+    """
+    heights = np.asarray(positions, dtype=np.float64)[:, axis]
+    valid = ~np.isnan(heights) if valid is None else np.asarray(valid, dtype=bool) & ~np.isnan(heights)
+    if not valid.any():
+        raise ValueError("Error: the LED map has no mapped LEDs.")
+
+    # Unmapped LEDs sit between their neighbours along the chain
+    index = np.arange(len(heights))
+    heights = np.interp(index, index[valid], heights[valid])
+    lo, hi = heights.min(), heights.max()
+    labels = np.minimum(((heights - lo) / max(hi - lo, 1e-9) * bands).astype(np.int64), bands - 1)
+
+    segments = []
+    for start, stop, band in _merge_runs(*chain_runs(labels), max_segments, min_length):
+        rising = np.cov(index[start:stop], heights[start:stop])[0, 1] if stop - start > 1 else 0.0
+        segments.append({"start": start, "stop": stop, "band": band, "rev": bool(rising < 0)})
+    return segments
+
+
+def segment_effects(segments, effects):
+    """
+    Gives every planned segment the native effect settings of its band.
+    :param segments: Segments from plan_bands.
+    :param effects: List of WLED segment settings such as {"fx": 9, "pal": 6, "sx": 128},
+                    one per band and repeated if there are fewer, or a callable
+                    (band, band_count) -> settings.
+    :return: List of WLED segment dicts for WLEDController.set_segments.
+    """
+    bands = max((segment["band"] for segment in segments), default=-1) + 1
+    settings = effects if callable(effects) else lambda band, _: effects[band % len(effects)]
+    return [dict(settings(segment["band"], bands), start=segment["start"], stop=segment["stop"],
+                 rev=segment["rev"]) for segment in segments]
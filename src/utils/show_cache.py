@@ -0,0 +1,186 @@
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+SHOW_MAGIC = b"XSHW"
+SHOW_VERSION = 1
+HEADER_FORMAT = "<4sHHIIfQ4x"  # magic, version, flags, frame count, LED count, fps, index offset
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FLAG_DELTA = 0x01
+SPAN_MERGE_GAP = 2  # Unchanged pixels cheaper to resend than to start a new span
+
+
+def encode_delta(previous, frame):
+    """
+    Encodes the pixels that changed between two frames as spans.
+    :param previous: (N, 3) uint8 frame already on the LEDs.
+    :param frame: (N, 3) uint8 frame to encode.
+    :return: (spans, payload) where spans is (S, 2) uint32 of [start, length] and payload holds their pixels.
+    """
+    changed = np.any(previous != frame, axis=1).view(np.int8)
+    edges = np.diff(np.concatenate(([0], changed, [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+
+    if len(starts) > 1:
+        # Merge spans separated by short unchanged gaps
+        keep = (starts[1:] - stops[:-1]) > SPAN_MERGE_GAP
+        starts = starts[np.concatenate(([True], keep))]
+        stops = stops[np.concatenate((keep, [True]))]
+
+    spans = np.stack([starts, stops - starts], axis=1).astype(np.uint32)
+    payload = np.concatenate([frame[start:stop] for start, stop in zip(starts, stops)]) if len(starts) else frame[:0]
+    return spans, payload
+
+
+def compile_show(path, frames, led_count, fps, delta=False):
+    """
+    Renders a sequence of frames into a show file.
+    :param path: Output file path.
+    :param frames: Iterable of (led_count, 3) uint8 frames.
+    :param led_count: Total number of LEDs.
+    :param fps: Playback rate stored in the header.
+    :param delta: True to store only the pixels that change between frames.
+    :return: Number of frames written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    previous = np.zeros((led_count, 3), dtype=np.uint8)
+    offsets = []
+    frame_count = 0
+
+    with open(path, "wb") as show_file:
+        show_file.write(bytes(HEADER_SIZE))  # Patched once the frame count is known
+        for frame in frames:
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            if frame.shape != (led_count, 3):
+                raise ValueError(f"Frame {frame_count} has shape {frame.shape}, expected ({led_count}, 3).")
+            if delta:
+                offsets.append(show_file.tell())
+                spans, payload = encode_delta(previous, frame)
+                show_file.write(struct.pack("<I", len(spans)))
+                show_file.write(spans.tobytes())
+                show_file.write(payload.tobytes())
+                np.copyto(previous, frame)
+            else:
+                show_file.write(frame.tobytes())
+            frame_count += 1
+
+        index_offset = 0
+        if delta:
+            offsets.append(show_file.tell())
+            index_offset = show_file.tell()
+            show_file.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+
+        show_file.seek(0)
+        show_file.write(struct.pack(HEADER_FORMAT, SHOW_MAGIC, SHOW_VERSION, FLAG_DELTA if delta else 0,
+                                    frame_count, led_count, fps, index_offset))
+    return frame_count
+
+
+class ShowFile:
+    def __init__(self, path):
+        """
+        Opens a compiled show for playback through a read-only memory map.
+        :param path: Path to the show file.
+        """
+        with open(path, "rb") as show_file:
+            header = show_file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"Error: {path} is too short to be a show file.")
+        magic, version, flags, frame_count, led_count, fps, index_offset = struct.unpack(HEADER_FORMAT, header)
+        if magic != SHOW_MAGIC:
+            raise ValueError(f"Error: {path} is not a show file.")
+        if version != SHOW_VERSION:
+            raise ValueError(f"Error: {path} has unsupported show version {version}.")
+
+        self.path = path
+        self.frame_count = frame_count
+        self.led_count = led_count
+        self.fps = fps
+        self.delta = bool(flags & FLAG_DELTA)
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+
+        if self.delta:
+            self.offsets = np.frombuffer(self.data, dtype=np.uint64, count=frame_count + 1, offset=index_offset)
+            self.buffer = np.zeros((led_count, 3), dtype=np.uint8)
+            self.decoded = -1
+        else:
+            self.frames = self.data[HEADER_SIZE:HEADER_SIZE + frame_count * led_count * 3].reshape(
+                frame_count, led_count, 3)
+
+    def __len__(self):
+        return self.frame_count
+
+    def frame(self, index):
+        """
+        Returns a frame of the show.
+        Raw shows return a read-only view into the file; delta shows decode into a
+        reusable buffer, so sequential playback only applies each frame's changes.
+        :param index: Frame index.
+        :return: (led_count, 3) uint8 array.
+        """
+        if not self.delta:
+            return self.frames[index]
+
+        if index <= self.decoded:
+            # Seeking backwards (or looping) replays from the start
+            self.buffer.fill(0)
+            self.decoded = -1
+        while self.decoded < index:
+            self.decoded += 1
+            self._apply(self.decoded)
+        return self.buffer
+
+    def _apply(self, index):
+        offset = int(self.offsets[index])
+        span_count = int(np.frombuffer(self.data, dtype=np.uint32, count=1, offset=offset)[0])
+        spans = np.frombuffer(self.data, dtype=np.uint32, count=span_count * 2, offset=offset + 4).reshape(-1, 2)
+        flat = self.buffer.reshape(-1)
+        position = offset + 4 + span_count * 8
+        for start, length in spans.tolist():
+            flat[start * 3:(start + length) * 3] = self.data[position:position + length * 3]
+            position += length * 3
+
+    def close(self):
+        """
+        Releases the memory map once no frames returned by this show are still referenced.
+        """
+        self.data = self.frames = self.offsets = None
+
+
+class ShowCache:
+    def __init__(self, max_shows=4):
+        """
+        Keeps the most recently played shows open.
+        :param max_shows: Number of shows kept mapped before the least recently used is closed.
+        """
+        self.max_shows = max_shows
+        self.shows = OrderedDict()
+
+    def open(self, path):
+        """
+        Returns an open ShowFile, reusing a cached one if the file has not changed.
+        :param path: Path to the show file.
+        """
+        key = (os.path.abspath(path), os.path.getmtime(path))
+        show = self.shows.get(key)
+        if show is not None:
+            self.shows.move_to_end(key)
+            return show
+
+        show = ShowFile(path)
+        self.shows[key] = show
+        while len(self.shows) > self.max_shows:
+            _, evicted = self.shows.popitem(last=False)
+            evicted.close()
+        return show
+
+    def close(self):
+        """
+        Closes every cached show.
+        """
+        while self.shows:
+            _, show = self.shows.popitem()
+            show.close()
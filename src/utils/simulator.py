@@ -0,0 +1,359 @@
+import json
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from .wled_realtime import DDP_FLAG_VER1, decode_ddp, decode_wled_udp
+
+SIM_EFFECTS = ["Solid", "Blink", "Breathe", "Wipe", "Wipe Random", "Random Colors", "Sweep", "Dynamic",
+               "Colorloop", "Rainbow"]
+SIM_PALETTES = ["Default", "* Random Cycle", "* Color 1", "* Colors 1&2", "* Color Gradient", "* Colors Only",
+                "Party", "Cloud", "Lava", "Ocean", "Forest", "Rainbow"]
+
+
+def parse_color(value):
+    """
+    Reads a WLED color given as "RRGGBB" or [r, g, b].
+    """
+    if isinstance(value, str):
+        return [int(value[i:i + 2], 16) for i in (0, 2, 4)]
+    return list(value[:3])
+
+
+class SimulatedWLED:
+    def __init__(self, led_count, host="127.0.0.1", http_port=0, ddp_port=0, udp_port=0,
+                 response_delay=0.005, refresh_delay=0.02):
+        """
+        Local stand-in for a WLED device implementing the parts of the JSON API and
+        realtime UDP protocols this project uses. Segment 0 is the only segment; LEDs
+        outside it are black, and fx/pal are stored but rendered as the solid color.
+        Realtime frames are shown until the next JSON state update.
+        :param led_count: Number of simulated LEDs.
+        :param host: Address to bind.
+        :param http_port: JSON API port, 0 for any free port.
+        :param ddp_port: DDP port, 0 for any free port.
+        :param udp_port: DRGB/DNRGB port, 0 for any free port.
+        :param response_delay: Seconds each JSON request takes to answer.
+        :param refresh_delay: Seconds between accepting a change and the LEDs showing it.
+        """
+        self.led_count = led_count
+        self.host = host
+        self.response_delay = response_delay
+        self.refresh_delay = refresh_delay
+        self.state = {"on": True, "bri": 255,
+                      "seg": [{"id": 0, "start": 0, "stop": led_count, "on": True, "bri": 255,
+                               "col": [[255, 160, 0]], "fx": 0, "pal": 0}]}
+        self.segment_pixels = np.zeros((led_count, 3), dtype=np.uint8)
+        self.segment_pixels[:] = self.state["seg"][0]["col"][0]
+        self.realtime = np.zeros((led_count, 3), dtype=np.uint8)
+        self.realtime_active = False
+        self.history = deque([(0.0, np.zeros((led_count, 3), dtype=np.uint8))], maxlen=64)
+        self.state_updates = 0
+        self.frames_received = 0
+        self.lock = threading.Lock()
+        self.running = False
+        self.threads = []
+
+        self.http = ThreadingHTTPServer((host, http_port), _SimulatedWLEDHandler)
+        self.http.device = self
+        self.ddp_sock = self._bind(ddp_port)
+        self.udp_sock = self._bind(udp_port)
+        self._snapshot()
+
+    def _bind(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind((self.host, port))
+        sock.settimeout(0.2)
+        return sock
+
+    @property
+    def ip(self):
+        """
+        The "host:port" string to pass to WLEDController.
+        """
+        return f"{self.host}:{self.http.server_port}"
+
+    @property
+    def ddp_port(self):
+        return self.ddp_sock.getsockname()[1]
+
+    @property
+    def udp_port(self):
+        return self.udp_sock.getsockname()[1]
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self.http.serve_forever, name="sim-http", daemon=True),
+                        threading.Thread(target=self._receive, args=(self.ddp_sock,), name="sim-ddp", daemon=True),
+                        threading.Thread(target=self._receive, args=(self.udp_sock,), name="sim-udp", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.http.shutdown()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.http.server_close()
+        self.ddp_sock.close()
+        self.udp_sock.close()
+
+    def _snapshot(self):
+        """
+        Records what the LEDs show from refresh_delay from now. Call with the lock held.
+        """
+        if self.realtime_active:
+            shown = self.realtime.copy()
+        elif not self.state["on"] or not self.state["seg"][0]["on"]:
+            shown = np.zeros_like(self.segment_pixels)
+        else:
+            gain = self.state["bri"] * self.state["seg"][0]["bri"] / (255.0 * 255.0)
+            shown = (self.segment_pixels * gain + 0.5).astype(np.uint8)
+        self.history.append((time.perf_counter() + self.refresh_delay, shown))
+
+    def pixels_at(self, t):
+        """
+        The RGB values the LEDs showed at perf_counter time t.
+        """
+        with self.lock:
+            for shown_at, pixels in reversed(self.history):
+                if shown_at <= t:
+                    return pixels
+            return self.history[0][1]
+
+    def apply_state(self, payload):
+        """
+        Applies a JSON state update the way WLED does for segment 0.
+        """
+        with self.lock:
+            self.state_updates += 1
+            self.realtime_active = False
+            for key in ("on", "bri"):
+                if key in payload:
+                    self.state[key] = payload[key]
+            for seg in payload.get("seg", []):
+                if seg.get("id", 0) != 0:
+                    continue
+                current = self.state["seg"][0]
+                for key in ("start", "stop", "on", "bri", "fx", "pal"):
+                    if key in seg:
+                        current[key] = seg[key]
+                start, stop = current["start"], min(current["stop"], self.led_count)
+                if "start" in seg or "stop" in seg:
+                    self.segment_pixels[:start] = 0
+                    self.segment_pixels[stop:] = 0
+                if "col" in seg:
+                    current["col"] = [parse_color(color) for color in seg["col"]]
+                    self.segment_pixels[start:stop] = current["col"][0]
+                if "i" in seg:
+                    self._apply_individual(start, stop, seg["i"])
+            self._snapshot()
+
+    def _apply_individual(self, start, stop, values):
+        # "i" entries are [index, color], [start, stop, color] or bare colors continuing from the last index
+        index, pending = start, []
+        for value in values:
+            if isinstance(value, int):
+                pending.append(value)
+                continue
+            color = parse_color(value)
+            if len(pending) >= 2:
+                first, last = start + pending[-2], min(start + pending[-1], stop)
+            elif pending:
+                first, last = start + pending[0], start + pending[0] + 1
+            else:
+                first, last = index, index + 1
+            self.segment_pixels[first:last] = color
+            index, pending = last, []
+
+    def state_json(self):
+        with self.lock:
+            return json.loads(json.dumps(self.state))
+
+    def _receive(self, sock):
+        frame = np.zeros((self.led_count, 3), dtype=np.uint8)
+        while self.running:
+            try:
+                packet = sock.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if packet[0] & 0xC0 == DDP_FLAG_VER1:
+                complete = decode_ddp(packet, frame)
+            else:
+                start, count = decode_wled_udp(packet, frame)
+                complete = start + count == self.led_count
+            if complete:
+                with self.lock:
+                    np.copyto(self.realtime, frame)
+                    self.realtime_active = True
+                    self.frames_received += 1
+                    self._snapshot()
+
+
+class _SimulatedWLEDHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive like the real device
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        device = self.server.device
+        documents = {
+            "/json/state": device.state_json,
+            "/json/effects": lambda: SIM_EFFECTS,
+            "/json/palettes": lambda: SIM_PALETTES,
+            "/json/info": lambda: {"name": "WLED Simulator", "leds": {"count": device.led_count}},
+        }
+        if self.path not in documents:
+            self._reply(404, {"error": 3})
+            return
+        self._reply(200, documents[self.path]())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path not in ("/json/state", "/json"):
+            self._reply(404, {"error": 3})
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._reply(400, {"error": 9})
+            return
+        time.sleep(self.server.device.response_delay)
+        self.server.device.apply_state(payload)
+        self._reply(200, {"success": True})
+
+    def _reply(self, status, document):
+        reply = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def spiral_tree(led_count, turns=10, height=1.0, radius=0.4, jitter=0.01, seed=0):
+    """
+    3D positions of a string wound up a cone from the base to the tip.
+    :return: (N, 3) float array of (x, y, z) with y pointing up.
+    """
+    rng = np.random.default_rng(seed)
+    h = np.linspace(0.0, 1.0, led_count)
+    theta = 2 * np.pi * turns * h
+    r = radius * (1.0 - h) + 0.02
+    points = np.stack((r * np.cos(theta), h * height, r * np.sin(theta)), axis=1)
+    return points + rng.normal(0.0, jitter, points.shape)
+
+
+def project(points, angle, resolution, margin=0.1):
+    """
+    Orthographic view of 3D points from a camera circling the vertical axis.
+    :param points: (N, 3) positions with y up.
+    :param angle: Camera angle around the tree in degrees.
+    :param resolution: (width, height) of the image.
+    :param margin: Fraction of the image height left empty above and below.
+    :return: (N, 2) pixel coordinates.
+    """
+    width, height = resolution
+    a = np.radians(angle)
+    u = points[:, 0] * np.cos(a) + points[:, 2] * np.sin(a)
+    scale = height * (1 - 2 * margin) / max(float(np.ptp(points[:, 1])), 1e-9)
+    x = width / 2 + u * scale
+    y = height * (1 - margin) - (points[:, 1] - points[:, 1].min()) * scale
+    return np.stack((x, y), axis=1)
+
+
+class SyntheticCamera:
+    def __init__(self, device, points, resolution=(640, 480), led_radius=7, blur=1.5, noise=3.0,
+                 reflections=(), ambient=(), fps=60, seed=0):
+        """
+        Camera stand-in that renders a SimulatedWLED's lit LEDs at known image positions.
+        It has a cv2.VideoCapture style read(), so it can be assigned to CameraFeed.cap.
+        :param device: The SimulatedWLED to watch.
+        :param points: (N, 2) ground truth pixel position of each LED.
+        :param resolution: (width, height) of the frames.
+        :param led_radius: Radius in pixels of a lit LED.
+        :param blur: Gaussian blur sigma applied to the LEDs.
+        :param noise: Standard deviation of the sensor noise.
+        :param reflections: (led_id, (dx, dy), gain) ghosts of an LED seen at an offset, e.g. in a window.
+        :param ambient: (x, y, radius, level) static bright objects such as lamps.
+        :param fps: Frame rate read() is paced to.
+        :param seed: Seed for the noise, so runs are repeatable.
+        """
+        self.device = device
+        self.points = np.asarray(points, dtype=np.float64)
+        self.centers = np.round(self.points).astype(np.int32)
+        self.width, self.height = resolution
+        self.led_radius = led_radius
+        self.blur = blur
+        self.reflections = list(reflections)
+        self.interval = 1.0 / fps
+        self.next_frame = time.perf_counter()
+        self.opened = True
+
+        self.background = np.full((self.height, self.width, 3), 6.0, dtype=np.float32)
+        for x, y, radius, level in ambient:
+            cv2.circle(self.background, (int(x), int(y)), int(radius), (level, level, level), -1)
+        self.background = cv2.GaussianBlur(self.background, (0, 0), blur)
+
+        # A bank of precomputed noise frames keeps per-frame cost down while staying repeatable
+        rng = np.random.default_rng(seed)
+        self.noise = rng.normal(0.0, noise, (4, self.height, self.width, 3)).astype(np.float32)
+        self.frame_count = 0
+        self.canvas = np.empty_like(self.background)
+
+    def render(self, pixels):
+        """
+        Renders one frame for the given LED colors.
+        :param pixels: (N, 3) RGB values.
+        :return: (height, width, 3) BGR uint8 frame.
+        """
+        self.canvas.fill(0)
+        lit = np.flatnonzero(pixels.any(axis=1))
+        for led_id in lit:
+            r, g, b = (float(v) for v in pixels[led_id])
+            cv2.circle(self.canvas, tuple(int(v) for v in self.centers[led_id]), self.led_radius, (b, g, r), -1)
+        for led_id, (dx, dy), gain in self.reflections:
+            if pixels[led_id].any():
+                r, g, b = (float(v) * gain for v in pixels[led_id])
+                center = (int(self.centers[led_id][0] + dx), int(self.centers[led_id][1] + dy))
+                cv2.circle(self.canvas, center, self.led_radius + 2, (b, g, r), -1)
+        if len(lit):
+            cv2.GaussianBlur(self.canvas, (0, 0), self.blur, dst=self.canvas)
+        self.canvas += self.background
+        self.canvas += self.noise[self.frame_count % len(self.noise)]
+        self.frame_count += 1
+        return np.clip(self.canvas, 0, 255).astype(np.uint8)
+
+    def read(self, image=None):
+        delay = self.next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame + self.interval, time.perf_counter())
+        frame = self.render(self.device.pixels_at(time.perf_counter()))
+        if image is not None:
+            np.copyto(image, frame)
+            frame = image
+        return True, frame
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        return 1.0 / self.interval if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
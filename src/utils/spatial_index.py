@@ -0,0 +1,213 @@
+import hashlib
+import itertools
+import os
+
+import numpy as np
+
+from .led_map import load_positions
+
+INDEX_VERSION = 1
+MAX_REACH = 4  # Cells searched in each direction before nearest() falls back to brute force
+BRUTE_FORCE_CHUNK = 1 << 22  # Query x LED distances computed at once by the brute force search
+MAX_CELLS_PER_LED = 8  # Bound on the grid size, so cell_start stays proportional to the LED count
+
+
+class GridIndex:
+    def __init__(self, positions, cell_size=None):
+        """
+        Uniform grid over LED positions stored as flat NumPy arrays (CSR style):
+        LEDs sorted by cell, plus the offset where each cell's LEDs start.
+        :param positions: (N, D) float array indexed by LED ID, NaN for unmapped LEDs.
+        :param cell_size: Grid cell edge length, defaults to roughly one LED per cell.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        valid = ~np.isnan(positions).any(axis=1)
+        ids = np.flatnonzero(valid)
+        points = positions[valid]
+        dims = positions.shape[1]
+
+        self.origin = points.min(axis=0) if len(points) else np.zeros(dims)
+        extent = np.maximum((points.max(axis=0) if len(points) else np.ones(dims)) - self.origin, 1e-9)
+        if cell_size is None:
+            cell_size = float(np.prod(extent) / max(len(points), 1)) ** (1.0 / dims)
+        # Grow small cells until the whole grid, not just its longest axis, is bounded
+        max_cells = MAX_CELLS_PER_LED * max(len(points), 1)
+        shape = np.floor(extent / cell_size).astype(np.int64) + 1
+        while np.prod(shape.astype(np.float64)) > max_cells:
+            cell_size *= 1.01 * (np.prod(shape.astype(np.float64)) / max_cells) ** (1.0 / dims)
+            shape = np.floor(extent / cell_size).astype(np.int64) + 1
+        self.cell_size = float(cell_size)
+        self.shape = shape
+
+        keys = self._keys(self._cells(points))
+        order = np.argsort(keys, kind="stable")
+        self.ids = ids[order]
+        self.points = np.ascontiguousarray(points[order])
+        self.cell_start = np.searchsorted(keys[order], np.arange(int(np.prod(self.shape)) + 1))
+
+        # Per axis sort order for band queries
+        self.axis_order = np.argsort(self.points, axis=0, kind="stable").T.copy()
+        self.axis_values = np.take_along_axis(self.points, self.axis_order.T, axis=0).T.copy()
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls.__new__(cls)
+        for name in ("origin", "ids", "points", "cell_start", "axis_order", "axis_values", "shape"):
+            setattr(index, name, arrays[name])
+        index.cell_size = float(arrays["cell_size"])
+        return index
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in
+                ("origin", "ids", "points", "cell_start", "axis_order", "axis_values", "shape", "cell_size")}
+
+    def _cells(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells):
+        cells = np.clip(cells, 0, self.shape - 1)
+        return np.ravel_multi_index(tuple(cells.T), tuple(self.shape))
+
+    def query_radius(self, points, radius):
+        """
+        Finds every LED within radius of each query point.
+        :param points: (P, D) query points.
+        :param radius: Search radius in map units.
+        :return: (offsets, ids) in CSR form; LEDs near point p are ids[offsets[p]:offsets[p + 1]].
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        owner, rows = self._query_rows(points, radius)
+        return np.searchsorted(owner, np.arange(len(points) + 1)), self.ids[rows]
+
+    def _query_rows(self, points, radius):
+        # Offsets past the grid's own size cannot reach an occupied cell
+        reach = min(int(np.ceil(radius / self.cell_size)), int(self.shape.max()))
+        base = self._cells(points)
+        found_points, found_rows = [], []
+
+        for offset in itertools.product(range(-reach, reach + 1), repeat=points.shape[1]):
+            cells = base + offset
+            inside = np.all((cells >= 0) & (cells < self.shape), axis=1)
+            if not inside.any():
+                continue
+            query = np.flatnonzero(inside)
+            keys = self._keys(cells[inside])
+            starts = self.cell_start[keys]
+            counts = self.cell_start[keys + 1] - starts
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expand every (query, cell) pair into its candidate rows without a Python loop
+            owner = np.repeat(query, counts)
+            rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            close = ((self.points[rows] - points[owner]) ** 2).sum(axis=1) <= radius * radius
+            found_points.append(owner[close])
+            found_rows.append(rows[close])
+
+        if not found_points:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        owner = np.concatenate(found_points)
+        rows = np.concatenate(found_rows)
+        order = np.argsort(owner, kind="stable")
+        return owner[order], rows[order]
+
+    def nearest(self, points):
+        """
+        Finds the nearest LED to each query point.
+        The grid search starts at each point's distance to the map's bounding box and
+        doubles only for misses; points needing more than MAX_REACH cells are brute forced.
+        :param points: (P, D) query points.
+        :return: (ids, distances), with id -1 if the index is empty.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        best_ids = np.full(len(points), -1, dtype=np.int64)
+        best_distances = np.full(len(points), np.inf)
+        if not len(self.ids):
+            return best_ids, best_distances
+
+        # No LED is nearer than the bounding box, so the search starts there
+        low, high = self.points.min(axis=0), self.points.max(axis=0)
+        gap = np.linalg.norm(np.maximum(low - points, 0) + np.maximum(points - high, 0), axis=1)
+        reach = np.maximum(np.ceil(gap / self.cell_size), 1).astype(np.int64)
+        pending = np.arange(len(points))
+
+        # Anything found within the searched radius is exact, so grow the radius only for misses
+        while len(pending):
+            far = reach[pending] > MAX_REACH
+            self._nearest_brute_force(points, pending[far], best_ids, best_distances)
+            pending = pending[~far]
+            missed = []
+            for step in np.unique(reach[pending]):
+                group = pending[reach[pending] == step]
+                radius = step * self.cell_size
+                owner, rows = self._query_rows(points[group], radius)
+                distances = np.linalg.norm(self.points[rows] - points[group][owner], axis=1)
+                order = np.lexsort((distances, owner))
+                hit = np.unique(owner)
+                first = order[np.searchsorted(owner[order], hit)]
+                best_ids[group[hit]] = self.ids[rows[first]]
+                best_distances[group[hit]] = distances[first]
+                miss = np.ones(len(group), dtype=bool)
+                miss[hit] = False
+                missed.append(group[miss])
+            pending = np.concatenate(missed) if missed else pending
+            reach[pending] *= 2
+        return best_ids, best_distances
+
+    def _nearest_brute_force(self, points, queries, best_ids, best_distances):
+        """
+        Exact nearest search against every LED for the given query rows, in chunks.
+        """
+        chunk = max(1, BRUTE_FORCE_CHUNK // len(self.points))
+        for start in range(0, len(queries), chunk):
+            rows = queries[start:start + chunk]
+            squared = ((points[rows, None, :] - self.points[None, :, :]) ** 2).sum(axis=2)
+            first = squared.argmin(axis=1)
+            best_ids[rows] = self.ids[first]
+            best_distances[rows] = np.sqrt(squared[np.arange(len(rows)), first])
+
+    def in_band(self, axis, low, high):
+        """
+        Finds the LEDs whose coordinate along an axis lies within [low, high].
+        :param axis: Axis number (0 = x, 1 = y, 2 = z).
+        :param low: Lower bound, or an array of lower bounds for several bands.
+        :param high: Upper bound, or an array of upper bounds.
+        :return: Array of LED IDs sorted by coordinate, or a list of arrays for several bands.
+        """
+        values = self.axis_values[axis]
+        starts = np.searchsorted(values, low, side="left")
+        stops = np.searchsorted(values, high, side="right")
+        if np.ndim(starts) == 0:
+            return self.ids[self.axis_order[axis][starts:stops]]
+        return [self.ids[self.axis_order[axis][start:stop]] for start, stop in zip(starts, stops)]
+
+
+def map_digest(path):
+    """
+    SHA-1 of a map file, used to tell when a cached index is stale.
+    """
+    with open(path, "rb") as map_file:
+        return hashlib.sha1(map_file.read()).hexdigest()
+
+
+def load_or_build_index(map_path, led_count=None, cell_size=None):
+    """
+    Loads the spatial index cached next to a map file, rebuilding it if the map changed.
+    The cache is saved as e.g. data/2d_map.index.npz.
+    :param map_path: Path to the map JSON file.
+    :param led_count: Total number of LEDs.
+    :param cell_size: Optional grid cell size.
+    :return: A GridIndex.
+    """
+    index_path = os.path.splitext(map_path)[0] + ".index.npz"
+    digest = map_digest(map_path)
+    if os.path.exists(index_path):
+        with np.load(index_path) as cached:
+            if (int(cached["version"]) == INDEX_VERSION and str(cached["digest"]) == digest
+                    and (cell_size is None or float(cached["cell_size"]) == cell_size)):
+                return GridIndex.from_arrays(cached)
+
+    positions, _ = load_positions(map_path, led_count)
+    index = GridIndex(positions, cell_size)
+    np.savez(index_path, version=INDEX_VERSION, digest=digest, **index.to_arrays())
+    return index
@@ -0,0 +1,142 @@
+import math
+
+import cv2
+import numpy as np
+
+
+def bit_count(led_count):
+    """
+    Number of Gray-code bit planes needed to give every LED a unique code.
+    :param led_count: Total number of LEDs.
+    :return: ceil(log2(led_count)), at least 1.
+    """
+    return max(1, math.ceil(math.log2(max(led_count, 2))))
+
+
+def gray_encode(ids):
+    """
+    Converts LED IDs to their reflected binary Gray code.
+    :param ids: Integer or numpy array of LED IDs.
+    :return: Gray-coded values.
+    """
+    return ids ^ (ids >> 1)
+
+
+def gray_decode(codes):
+    """
+    Converts Gray-coded values back to plain LED IDs.
+    :param codes: Integer numpy array of Gray codes.
+    :return: Decoded LED IDs.
+    """
+    ids = np.array(codes, dtype=np.int64, copy=True)
+    shift = ids >> 1
+    while np.any(shift):
+        ids ^= shift
+        shift >>= 1
+    return ids
+
+
+def pattern_led_ids(led_count, bit, complement=False):
+    """
+    Returns the LED IDs that are lit for a given bit plane.
+    :param led_count: Total number of LEDs.
+    :param bit: The bit plane index (0 is the least significant bit).
+    :param complement: True to return the inverted pattern.
+    :return: Numpy array of LED IDs to turn on.
+    """
+    ids = np.arange(led_count)
+    lit = ((gray_encode(ids) >> bit) & 1).astype(bool)
+    if complement:
+        lit = ~lit
+    return ids[lit]
+
+
+def sample_intensity(gray, points, radius=3):
+    """
+    Samples the mean brightness of a small window around each point.
+    :param gray: Single channel frame.
+    :param points: (M, 2) array of (x, y) pixel coordinates.
+    :param radius: Half size of the square sampling window.
+    :return: (M,) float array of mean intensities.
+    """
+    size = 2 * radius + 1
+    blurred = cv2.blur(gray, (size, size))
+    h, w = gray.shape[:2]
+    xs = np.clip(np.rint(points[:, 0]).astype(np.intp), 0, w - 1)
+    ys = np.clip(np.rint(points[:, 1]).astype(np.intp), 0, h - 1)
+    return blurred[ys, xs].astype(np.float32)
+
+
+def decode_signatures(pattern_samples, complement_samples, led_count, min_contrast=10):
+    """
+    Decodes LED IDs from the on/off signature sampled at each blob.
+    :param pattern_samples: (bits, M) intensities with each bit plane lit.
+    :param complement_samples: (bits, M) intensities with the inverted bit plane lit.
+    :param led_count: Total number of LEDs.
+    :param min_contrast: Smallest pattern/complement difference accepted as a valid bit.
+    :return: (ids, margins) where ids is -1 for blobs that could not be decoded.
+    """
+    diff = np.asarray(pattern_samples, dtype=np.float32) - np.asarray(complement_samples, dtype=np.float32)
+    bits = (diff > 0).astype(np.int64)
+    weights = (1 << np.arange(bits.shape[0], dtype=np.int64))[:, None]
+    codes = (bits * weights).sum(axis=0)
+    ids = gray_decode(codes)
+
+    margins = np.abs(diff).min(axis=0)
+    ids[(margins < min_contrast) | (ids >= led_count)] = -1
+    return ids, margins
+
+
+def region_centroids(labels, ids, xs, ys, weights, led_count, min_pixels=25, area_tolerance=0.35,
+                     min_roundness=0.75):
+    """
+    Locates LEDs from per-pixel decoded IDs. Pixels are grouped by the ID they decode to
+    and the lit blob they lie in, and each group gives a brightness weighted centroid.
+    A group is only accepted when it is about the size of a single LED and round, so a
+    blob of merged LEDs is neither averaged into one point nor cut into biased pieces;
+    those LEDs are left for a per-LED retry. Where an ID shows up in several blobs,
+    such as an LED and its reflection, the brightest group is kept.
+    :param labels: (P,) label of the lit blob each pixel belongs to.
+    :param ids: (P,) LED ID decoded at each pixel, -1 where it could not be decoded.
+    :param xs: (P,) pixel x coordinates.
+    :param ys: (P,) pixel y coordinates.
+    :param weights: (P,) brightness of each pixel above the threshold.
+    :param led_count: Total number of LEDs.
+    :param min_pixels: Smallest group kept at all.
+    :param area_tolerance: Largest relative difference from a single LED's pixel count.
+    :param min_roundness: Smallest minor to major axis ratio accepted.
+    :return: (led_count, 2) float array of (x, y) positions, NaN for LEDs that were not located.
+    """
+    positions = np.full((led_count, 2), np.nan)
+    decoded = ids >= 0
+    if not decoded.any():
+        return positions
+    keys = labels[decoded].astype(np.int64) * led_count + ids[decoded]
+    groups, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    group_labels, group_ids = groups // led_count, groups % led_count
+
+    w = weights[decoded].astype(np.float64)
+    x, y = xs[decoded].astype(np.float64), ys[decoded].astype(np.float64)
+    m00 = np.bincount(inverse, weights=w, minlength=len(groups))
+    cx = np.bincount(inverse, weights=w * x, minlength=len(groups)) / m00
+    cy = np.bincount(inverse, weights=w * y, minlength=len(groups)) / m00
+    mu20 = np.bincount(inverse, weights=w * x * x, minlength=len(groups)) / m00 - cx * cx
+    mu02 = np.bincount(inverse, weights=w * y * y, minlength=len(groups)) / m00 - cy * cy
+    mu11 = np.bincount(inverse, weights=w * x * y, minlength=len(groups)) / m00 - cx * cy
+    spread = np.hypot(mu20 - mu02, 2 * mu11)
+    roundness = np.sqrt(np.maximum(mu20 + mu02 - spread, 0.0) / np.maximum(mu20 + mu02 + spread, 1e-9))
+
+    # A single LED's size, from blobs that decode to one ID only
+    large = counts >= min_pixels
+    if not large.any():
+        return positions
+    groups_per_blob = np.bincount(group_labels[large], minlength=group_labels.max() + 1)
+    alone = large & (groups_per_blob[group_labels] == 1)
+    single_pixels = np.median(counts[alone] if alone.any() else counts[large])
+
+    accepted = (large & (np.abs(counts - single_pixels) <= area_tolerance * single_pixels)
+                & (roundness >= min_roundness))
+    order = np.argsort(m00, kind="stable")  # Brightest last, so it wins for repeated IDs
+    order = order[accepted[order]]
+    positions[group_ids[order]] = np.stack((cx[order], cy[order]), axis=1)
+    return positions
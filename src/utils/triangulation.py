@@ -0,0 +1,107 @@
+import numpy as np
+
+
+def initial_cameras(angles, observations, mask):
+    """
+    Orthographic cameras for a tree rotating about its vertical axis.
+    Image y grows downwards, so it maps to -Y.
+    :param angles: (V,) view angles in degrees.
+    :param observations: (V, N, 2) image coordinates.
+    :param mask: (V, N) bool mask of observed points.
+    :return: (A, b) with A (V, 2, 3) projections and b (V, 2) image offsets.
+    """
+    theta = np.radians(np.asarray(angles, dtype=np.float64))
+    views = len(theta)
+    A = np.zeros((views, 2, 3))
+    A[:, 0, 0] = np.cos(theta)
+    A[:, 0, 2] = np.sin(theta)
+    A[:, 1, 1] = -1.0
+    b = np.array([observations[v][mask[v]].mean(axis=0) if mask[v].any() else (0.0, 0.0) for v in range(views)])
+    return A, b
+
+
+def solve_points(A, b, observations, mask, min_views=2):
+    """
+    Least-squares 3D position of every LED given fixed cameras, solved for all LEDs at once.
+    :return: (X, valid) with X (N, 3) and valid (N,) for LEDs seen in enough views.
+    """
+    weights = mask.astype(np.float64)
+    residual = observations - b[:, None, :]
+    residual[~mask] = 0.0
+
+    # Normal equations per LED: (sum_v A_v^T A_v) X_i = sum_v A_v^T (x_vi - b_v)
+    normal = np.einsum("vi,vjk->ijk", weights, np.einsum("vaj,vak->vjk", A, A))
+    rhs = np.einsum("vaj,via->ij", A, residual * weights[:, :, None])
+
+    valid = weights.sum(axis=0) >= min_views
+    valid &= np.linalg.cond(normal) < 1e6  # Views too close in angle cannot resolve depth
+    X = np.full((len(valid), 3), np.nan)
+    if valid.any():
+        X[valid] = np.linalg.solve(normal[valid], rhs[valid][:, :, None])[:, :, 0]
+    return X, valid
+
+
+def solve_cameras(X, valid, observations, mask, orthographic=True):
+    """
+    Least-squares camera for each view given fixed 3D points.
+    :param orthographic: True to project each camera onto a scaled orthographic one (rows orthogonal, equal norm).
+    :return: (A, b) with A (V, 2, 3) and b (V, 2).
+    """
+    views = len(observations)
+    A = np.zeros((views, 2, 3))
+    b = np.zeros((views, 2))
+    for v in range(views):
+        seen = mask[v] & valid
+        design = np.hstack([X[seen], np.ones((seen.sum(), 1))])
+        solution, *_ = np.linalg.lstsq(design, observations[v][seen], rcond=None)
+        A[v], b[v] = solution[:3].T, solution[3]
+        if orthographic:
+            u, s, vt = np.linalg.svd(A[v], full_matrices=False)
+            A[v] = s.mean() * (u @ vt)
+    return A, b
+
+
+def reprojection_error(A, b, X, valid, observations, mask):
+    """
+    RMS reprojection error per view in image pixels.
+    :return: (V,) array.
+    """
+    projected = np.einsum("vaj,ij->via", A, np.nan_to_num(X)) + b[:, None, :]
+    used = mask & valid[None, :]
+    squared = ((projected - observations) ** 2).sum(axis=2)
+    return np.sqrt((squared * used).sum(axis=1) / np.maximum(used.sum(axis=1), 1))
+
+
+def triangulate(observations, angles, iterations=50, tolerance=1e-4, min_views=2):
+    """
+    Recovers 3D LED positions from several 2D maps by alternating least squares
+    (a bundle adjustment over scaled orthographic cameras).
+    Cameras start from the known view angles and are refined along with the points.
+    :param observations: (V, N, 2) image coordinates, NaN where an LED was not seen.
+    :param angles: (V,) approximate view angles in degrees around the vertical axis.
+    :param iterations: Maximum number of alternations.
+    :param tolerance: Stop once the mean reprojection error improves by less than this many pixels.
+    :param min_views: Minimum number of views an LED must be seen in.
+    :return: (X, valid, errors) with X (N, 3) float64 (NaN where unsolved), valid (N,) and per-view RMS errors.
+    """
+    observations = np.asarray(observations, dtype=np.float64)
+    mask = ~np.isnan(observations).any(axis=2)
+    observations = np.nan_to_num(observations)
+
+    A, b = initial_cameras(angles, observations, mask)
+    X, valid = solve_points(A, b, observations, mask, min_views)
+    error = reprojection_error(A, b, X, valid, observations, mask).mean()
+    for _ in range(iterations):
+        A, b = solve_cameras(X, valid, observations, mask)
+        X, valid = solve_points(A, b, observations, mask, min_views)
+        # Pin the gauge: center the points so the cameras' offsets carry the translation
+        center = np.nanmean(X[valid], axis=0)
+        X -= center
+        b += np.einsum("vaj,j->va", A, center)
+        new_error = reprojection_error(A, b, X, valid, observations, mask).mean()
+        if error - new_error < tolerance:
+            error = new_error
+            break
+        error = new_error
+
+    return X, valid, reprojection_error(A, b, X, valid, observations, mask)
@@ -0,0 +1,111 @@
+import json
+import queue
+import threading
+import time
+
+
+class MetadataCache:
+    def __init__(self, controller, ttl=300.0):
+        """
+        Caches the device's effect and palette lists. Once an entry is older than
+        the TTL the stale copy keeps being served while a background thread refreshes it,
+        so only the very first request waits on the device.
+        :param controller: A WLEDController used to fetch /json/effects and /json/palettes.
+        :param ttl: Seconds before a cached list is refreshed.
+        """
+        self.controller = controller
+        self.ttl = ttl
+        self.values = {}
+        self.fetched_at = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Returns the cached JSON for a /json/ path, fetching it if it has never been loaded.
+        :param path: e.g. "effects" or "palettes".
+        :return: The decoded JSON, or an empty list if the device never answered.
+        """
+        with self.lock:
+            value = self.values.get(path)
+            stale = time.monotonic() - self.fetched_at.get(path, float("-inf")) > self.ttl
+            start_refresh = value is not None and stale and path not in self.refreshing
+            if start_refresh:
+                self.refreshing.add(path)
+        if value is None:
+            return self._refresh(path) or []
+        if start_refresh:
+            threading.Thread(target=self._refresh, args=(path,), name=f"wled-{path}", daemon=True).start()
+        return value
+
+    def _refresh(self, path):
+        value = self.controller.get_json(path)
+        with self.lock:
+            self.refreshing.discard(path)
+            if value is not None:
+                self.values[path] = value
+                self.fetched_at[path] = time.monotonic()
+            return self.values.get(path)
+
+    def effects(self):
+        return self.get("effects")
+
+    def palettes(self):
+        return self.get("palettes")
+
+
+class StateBroadcaster:
+    def __init__(self, backlog=8):
+        """
+        Fans state updates out to server-sent event subscribers.
+        A subscriber that falls behind loses its oldest updates rather than blocking publishers.
+        :param backlog: Updates kept per subscriber.
+        """
+        self.backlog = backlog
+        self.subscribers = set()
+        self.state = {}
+        self.lock = threading.Lock()
+
+    def publish(self, changes):
+        """
+        Merges changes into the current state and sends the result to every subscriber.
+        :param changes: Dict of updated state fields.
+        :return: The merged state.
+        """
+        with self.lock:
+            self.state = {**self.state, **changes}
+            state = self.state
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(state)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+        return state
+
+    def events(self, keepalive=15.0):
+        """
+        Generator of server-sent event lines for one subscriber, starting with the current state.
+        :param keepalive: Seconds between comment lines that keep idle connections open.
+        """
+        subscriber = queue.Queue(maxsize=self.backlog)
+        with self.lock:
+            self.subscribers.add(subscriber)
+            state = self.state
+        try:
+            yield f"data: {json.dumps(state)}\n\n"
+            while True:
+                try:
+                    state = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(state)}\n\n"
+        finally:
+            with self.lock:
+                self.subscribers.discard(subscriber)
@@ -0,0 +1,208 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .color_pipeline import color_pipeline_from_config
+from .segment_planner import MAX_SEGMENTS
+from .wled_controller import PipelinedWLEDController, WLEDController
+
+ANY_DEVICE = -1  # lit_device when LEDs may be lit on any device
+
+
+def ddp_timecode(t=None):
+    """
+    A DDP timecode (1/65536 s units, wrapping every 65536 s) for wall clock time t.
+    """
+    return int((time.time() if t is None else t) * 65536) & 0xFFFFFFFF
+
+
+class WLEDCluster:
+    def __init__(self, devices, verbose=False, timeout=2.0, realtime_protocol="ddp", color_config=None,
+                 pipelined=False):
+        """
+        Drives several WLED boards as one strip. Global LED IDs are mapped onto
+        (device, local index) from each device's start and count, every update is
+        split across the devices, and HTTP updates are sent to all of them concurrently.
+        :param devices: List of {"ip", "start", "count"} dicts, e.g. config["devices"].
+        :param verbose: True to print a message for every successful update.
+        :param timeout: Seconds to wait for each device to answer a request.
+        :param realtime_protocol: UDP protocol used by send_frame ("ddp", "dnrgb" or "drgb").
+        :param color_config: Color pipeline settings shared by every device; a device entry can
+                             override them, e.g. its own "max_amps" for its own supply.
+        :param pipelined: True to give every device a PipelinedWLEDController, so set_state
+                          only queues each update, as the web server needs.
+        """
+        devices = sorted(devices, key=lambda device: device["start"])
+        for previous, device in zip(devices, devices[1:]):
+            if previous["start"] + previous["count"] > device["start"]:
+                raise ValueError(f"Error: devices {previous['ip']} and {device['ip']} overlap.")
+
+        self.devices = devices
+        self.starts = np.array([device["start"] for device in devices], dtype=np.int64)
+        self.counts = np.array([device["count"] for device in devices], dtype=np.int64)
+        self.led_count = int((self.starts + self.counts).max())
+        color_config = color_config or {}
+        controller_class = PipelinedWLEDController if pipelined else WLEDController
+        self.controllers = [controller_class(device["ip"], device["count"], verbose=verbose, timeout=timeout,
+                                             realtime_protocol=realtime_protocol, realtime_port=device.get("port"),
+                                             color_pipeline=color_pipeline_from_config({**color_config, **device},
+                                                                                       device["count"]))
+                            for device in devices]
+        self.executor = ThreadPoolExecutor(max_workers=len(devices), thread_name_prefix="wled-cluster")
+        self.lit_device = ANY_DEVICE  # None once every device is dark, else the only device that may be lit
+
+    def locate(self, led_ids):
+        """
+        Maps global LED IDs onto devices.
+        :param led_ids: Array of global LED IDs.
+        :return: (device indices, local indices), device index -1 where no device drives the LED.
+        """
+        led_ids = np.asarray(led_ids, dtype=np.int64)
+        devices = np.searchsorted(self.starts, led_ids, side="right") - 1
+        local = led_ids - self.starts[np.maximum(devices, 0)]
+        devices[(devices < 0) | (local >= self.counts[np.maximum(devices, 0)])] = -1
+        return devices, local
+
+    def _each(self, calls):
+        """
+        Runs (function, args) calls concurrently and waits for all of them.
+        :return: Results in call order.
+        """
+        futures = [self.executor.submit(function, *args) for function, args in calls]
+        return [future.result() for future in futures]
+
+    def set_state(self, payload):
+        """
+        Sends the same JSON payload to every device.
+        :return: True if every device accepted it.
+        """
+        self.lit_device = ANY_DEVICE
+        return all(self._each([(controller.set_state, (payload,)) for controller in self.controllers]))
+
+    def get_json(self, path="state"):
+        """
+        Reads a document from the first device's JSON API; the boards are driven as one,
+        so its state, effects and palettes stand for the cluster.
+        :param path: The path below /json/.
+        :return: The decoded JSON, or None if the request failed.
+        """
+        return self.controllers[0].get_json(path)
+
+    def reset_segments(self):
+        """
+        Restores a single full-strip segment on every device.
+        :return: True if every device accepted the update.
+        """
+        self.lit_device = ANY_DEVICE
+        return all(self._each([(controller.reset_segments, ()) for controller in self.controllers]))
+
+    def turn_off_all_leds(self):
+        self._each([(controller.turn_off_all_leds, ()) for controller in self.controllers])
+        self.lit_device = None
+
+    def turn_on_all_leds(self, color=(255, 255, 255), brightness=255):
+        self._each([(controller.turn_on_all_leds, (color, brightness)) for controller in self.controllers])
+        self.lit_device = ANY_DEVICE
+
+    def turn_on_single_led(self, led_id, color=(255, 255, 255), brightness=255):
+        """
+        Turns on a single LED and turns off all others. Following another single LED only
+        the owning device and the previous LED's device are contacted; after anything else
+        may have lit the strip, every device is.
+        """
+        devices, local = self.locate([led_id])
+        device = int(devices[0])
+        if device < 0:
+            print(f"Error: LED ID {led_id} is not driven by any device.")
+            return
+        # Like a single controller, every other LED goes dark
+        calls = [(self.controllers[device].turn_on_single_led, (int(local[0]), color, brightness))]
+        if self.lit_device == ANY_DEVICE:
+            calls += [(controller.turn_off_all_leds, ()) for i, controller in enumerate(self.controllers)
+                      if i != device]
+        elif self.lit_device is not None and self.lit_device != device:
+            calls.append((self.controllers[self.lit_device].turn_off_all_leds, ()))
+        self._each(calls)
+        self.lit_device = device
+
+    def set_leds(self, led_ids, color=(255, 255, 255), brightness=255):
+        """
+        Turns on an arbitrary set of LEDs across all devices and turns off all others.
+        """
+        devices, local = self.locate(list(led_ids))
+        self._each([(controller.set_leds, (local[devices == i], color, brightness))
+                    for i, controller in enumerate(self.controllers)])
+        self.lit_device = ANY_DEVICE
+
+    def set_segments(self, segments, brightness=None, max_segments=MAX_SEGMENTS):
+        """
+        Splits global segments at the device boundaries and replaces every device's segments,
+        one state call each, sent concurrently.
+        :param segments: List of WLED segment dicts with global "start" and "stop".
+        :param brightness: Optional master brightness (0-255).
+        :param max_segments: Most segments each device supports.
+        :return: True if every device accepted its part.
+        """
+        calls = []
+        for controller, start, count in zip(self.controllers, self.starts, self.counts):
+            local = [dict(segment, start=int(max(segment["start"], start) - start),
+                          stop=int(min(segment["stop"], start + count) - start))
+                     for segment in segments if segment["start"] < start + count and segment["stop"] > start]
+            calls.append((controller.set_segments, (local, brightness, max_segments)))
+        self.lit_device = ANY_DEVICE
+        return all(self._each(calls))
+
+    def send_pixels(self, frame, brightness=255):
+        """
+        Sets every LED's color over the JSON API, each device getting only its changed LEDs.
+        :param frame: (led_count, 3) uint8 RGB array.
+        :param brightness: Brightness of the LEDs (0-255).
+        :return: True if every device accepted its part.
+        """
+        self.lit_device = ANY_DEVICE
+        return all(self._each([(controller.send_pixels, (frame[start:start + count], brightness))
+                               for controller, start, count in zip(self.controllers, self.starts, self.counts)]))
+
+    def send_frame(self, buffer, timecode=None):
+        """
+        Streams a global frame, sending each device a zero-copy slice of it (or its color
+        pipeline's staging buffer when it has one). Every device gets all but its final
+        packet first, then the final packets that make the devices show the frame go out
+        back to back, all stamped with one shared DDP timecode.
+        UDP sends return in microseconds, so this runs on the calling thread.
+        :param buffer: (led_count, 3) uint8 RGB numpy array.
+        :param timecode: Shared DDP timecode, defaults to the current time.
+        """
+        timecode = ddp_timecode() if timecode is None else timecode
+        self.lit_device = ANY_DEVICE
+        streamers = [controller.open_stream(timecode=True) for controller in self.controllers]
+        for controller, streamer, start, count in zip(self.controllers, streamers, self.starts, self.counts):
+            streamer.send_data(controller.prepare_frame(buffer[start:start + count]), timecode)
+        for streamer in streamers:
+            streamer.send_push()
+
+    def stats(self):
+        """
+        HTTP latency summary per device IP.
+        """
+        return {controller.ip: controller.stats.summary() for controller in self.controllers}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for controller in self.controllers:
+            controller.close()
+
+
+def controller_from_config(config, pipelined=False, **kwargs):
+    """
+    Builds a WLEDCluster when config has a "devices" list, otherwise a WLEDController for wled_ip.
+    :param config: Loaded config.json.
+    :param pipelined: True for controllers whose set_state queues updates to a background sender.
+    :param kwargs: Passed to the controller, e.g. realtime_protocol.
+    """
+    if config.get("devices"):
+        return WLEDCluster(config["devices"], color_config=config, pipelined=pipelined, **kwargs)
+    controller_class = PipelinedWLEDController if pipelined else WLEDController
+    return controller_class(config["wled_ip"], config["led_count"],
+                            color_pipeline=color_pipeline_from_config(config, config["led_count"]), **kwargs)
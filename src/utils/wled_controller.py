@@ -1,42 +1,169 @@
+import threading
+import time
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import LatencyStats
+from .pixel_encoder import JSON_MAX_BYTES, PixelEncoder
+from .segment_planner import MAX_SEGMENTS, SEGMENT_LIMIT
+from .wled_realtime import RealtimeStreamer
+
 
 class WLEDController:
-    def __init__(self, ip, led_count):
+    def __init__(self, ip, led_count, verbose=False, timeout=2.0, realtime_protocol="ddp", realtime_port=None,
+                 json_max_bytes=JSON_MAX_BYTES, color_pipeline=None):
         """
         Initialize the WLEDController with device IP and LED count.
         :param ip: The IP address of the WLED device.
         :param led_count: Total number of LEDs.
+        :param verbose: True to print a message for every successful update.
+        :param timeout: Seconds to wait for the device to answer a request.
+        :param realtime_protocol: UDP protocol used by send_frame ("ddp", "dnrgb" or "drgb").
+        :param realtime_port: UDP port override for send_frame.
+        :param json_max_bytes: Largest JSON payload send_pixels produces.
+        :param color_pipeline: Optional ColorPipeline every send_frame and send_pixels frame goes through.
         """
+        self.ip = ip
         self.api_url = f"http://{ip}/json/state"
         self.led_count = led_count
+        self.verbose = verbose
+        self.timeout = timeout
+
+        # Keep-alive session so every update reuses the same TCP connection
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.stats = LatencyStats()
+        self.pixels = PixelEncoder(led_count, json_max_bytes)
+        self.color_pipeline = color_pipeline
+
+        self.realtime_protocol = realtime_protocol
+        self.realtime_port = realtime_port
+        self.streamer = None
 
     def set_state(self, payload):
         """
         Sends a JSON payload to the WLED API.
         :param payload: The JSON payload for the WLED state.
+        :return: True if the device accepted the update.
         """
+        self.pixels.reset()  # The device may no longer show the last acknowledged pixel frame
+        return self._post(payload)
+
+    def _post(self, payload):
+        """
+        Posts a JSON payload to the WLED API without touching the pixel encoder.
+        :param payload: The JSON payload for the WLED state.
+        :return: True if the device accepted the update.
+        """
+        start = time.perf_counter()
         try:
-            response = requests.post(self.api_url, json=payload)
-            if response.status_code == 200:
-                print("State updated successfully.")
-            else:
-                print(f"Failed to update state: {response.text}")
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
         except requests.exceptions.RequestException as e:
             print(f"Error during API call: {e}")
+            return False
+        self.stats.record(time.perf_counter() - start)
+
+        if response.status_code == 200:
+            if self.verbose:
+                print("State updated successfully.")
+            return True
+        print(f"Failed to update state: {response.text}")
+        return False
+
+    def send_pixels(self, frame, brightness=255):
+        """
+        Sets every LED's color over the JSON API, sending only the LEDs that changed
+        since the last frame the device accepted, as run-length "i" ranges.
+        :param frame: (led_count, 3) uint8 RGB array.
+        :param brightness: Brightness of the LEDs (0-255).
+        :return: True if the device accepted every part of the update.
+        """
+        frame = self.prepare_frame(frame)
+        for payload in self.pixels.encode(frame, brightness):
+            if not self._post(payload):
+                return False
+        self.pixels.acknowledge(frame, brightness)
+        return True
+
+    def get_json(self, path="state"):
+        """
+        Reads a document from the WLED JSON API, e.g. "state", "effects" or "palettes".
+        :param path: The path below /json/.
+        :return: The decoded JSON, or None if the request failed.
+        """
+        try:
+            response = self.session.get(f"http://{self.ip}/json/{path}", timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching /json/{path}: {e}")
+            return None
+
+    def send_frame(self, buffer, timecode=None):
+        """
+        Streams a full per-pixel frame over WLED's realtime UDP protocol.
+        :param buffer: (led_count, 3) uint8 RGB numpy array.
+        :param timecode: Optional DDP timecode shared by the devices of a cluster.
+        """
+        self.open_stream(timecode is not None).send_frame(self.prepare_frame(buffer), timecode)
+
+    def prepare_frame(self, frame):
+        """
+        Runs a frame through the color pipeline into its staging buffer, leaving the caller's frame untouched.
+        :param frame: (led_count, 3) uint8 RGB array.
+        :return: The frame to send.
+        """
+        if self.color_pipeline is None:
+            return frame
+        return self.color_pipeline.apply(frame)
+
+    def open_stream(self, timecode=False):
+        """
+        Returns the realtime UDP streamer, creating it on first use.
+        :param timecode: True to reserve a DDP timecode field in every packet.
+        """
+        if self.streamer is None:
+            host = self.ip.split(":")[0]
+            self.streamer = RealtimeStreamer(host, self.led_count, protocol=self.realtime_protocol,
+                                             port=self.realtime_port, timecode=timecode)
+        return self.streamer
+
+    def close(self):
+        """
+        Closes the HTTP session, its pooled connections and any realtime stream.
+        """
+        self.session.close()
+        if self.streamer is not None:
+            self.streamer.close()
+
+    def _full_strip_segments(self, **settings):
+        """
+        Segment list making segment 0 span the whole strip, unreversed, and deleting every other segment.
+        """
+        return ([dict(settings, id=0, start=0, stop=self.led_count, rev=False)]
+                + [{"id": i, "stop": 0} for i in range(1, SEGMENT_LIMIT)])  # stop 0 deletes it
+
+    def reset_segments(self):
+        """
+        Restores a single segment over the whole strip, e.g. after set_segments, so the
+        segment 0 commands used everywhere else reach every LED again. Its effect is kept.
+        :return: True if the device accepted the update.
+        """
+        return self.set_state({"seg": self._full_strip_segments()})
 
     def turn_off_all_leds(self):
         """
-        Turns off all LEDs by setting their colors to black.
+        Turns off all LEDs by setting their colors to black. Segments other than segment 0
+        would keep running their effects, so they are deleted.
         """
         print("Turning off all LEDs...")
         payload = {
-            "seg": [{
-                "id": 0,
-                "start": 0,
-                "stop": self.led_count,
-                "col": [[0, 0, 0]],  # Set all LEDs to black
-                "on": True  # Keep the segment active
-            }]
+            "seg": self._full_strip_segments(
+                col=[[0, 0, 0]],  # Set all LEDs to black
+                on=True  # Keep the segment active
+            )
         }
         self.set_state(payload)
 
@@ -52,7 +179,8 @@ class WLEDController:
             print(f"Error: LED ID {led_id} is out of range. Must be between 0 and {self.led_count - 1}.")
             return
 
-        print(f"Turning on single LED {led_id}...")
+        if self.verbose:
+            print(f"Turning on single LED {led_id}...")
         payload = {
             "seg": [{
                 "id": 0,
@@ -65,6 +193,26 @@ class WLEDController:
         }
         self.set_state(payload)
 
+    def set_segments(self, segments, brightness=None, max_segments=MAX_SEGMENTS):
+        """
+        Replaces the device's segments in one state call, e.g. with native effects per region
+        from segment_planner. Segment IDs past the new ones are deleted.
+        :param segments: List of WLED segment dicts with "start", "stop" and settings such as "fx" and "pal".
+        :param brightness: Optional master brightness (0-255).
+        :param max_segments: Most segments the device supports.
+        :return: True if the device accepted the update.
+        """
+        if len(segments) > max_segments:
+            raise ValueError(f"Error: {len(segments)} segments, the device supports {max_segments}.")
+        payload = {
+            "on": True,
+            "seg": [dict(segment, id=i, on=True) for i, segment in enumerate(segments)]
+                   + [{"id": i, "stop": 0} for i in range(len(segments), max_segments)],  # stop 0 deletes it
+        }
+        if brightness is not None:
+            payload["bri"] = brightness
+        return self.set_state(payload)
+
     def turn_on_all_leds(self, color=(255, 255, 255), brightness=255):
         """
         Turns on all LEDs with the same color and brightness.
@@ -84,3 +232,112 @@ class WLEDController:
             }]
         }
         self.set_state(payload)
+
+    def set_leds(self, led_ids, color=(255, 255, 255), brightness=255):
+        """
+        Turns on an arbitrary set of LEDs in one call and turns off all others.
+        :param led_ids: Iterable of LED IDs to turn on.
+        :param color: The RGB color tuple for the lit LEDs.
+        :param brightness: Brightness of the LEDs (0-255).
+        """
+        led_ids = np.fromiter((int(led_id) for led_id in led_ids), dtype=np.int64)
+        frame = np.zeros((self.led_count, 3), dtype=np.uint8)
+        frame[led_ids[(led_ids >= 0) & (led_ids < self.led_count)]] = color
+        self.send_pixels(frame, brightness)
+
+
+class PipelinedWLEDController(WLEDController):
+    def __init__(self, ip, led_count, verbose=False, timeout=2.0, realtime_protocol="ddp", realtime_port=None,
+                 json_max_bytes=JSON_MAX_BYTES, color_pipeline=None):
+        """
+        WLEDController that hands updates to a background sender thread.
+        set_state returns immediately; if an update is still waiting to be sent
+        when a newer one arrives, the newer payload replaces it.
+        :param ip: The IP address of the WLED device.
+        :param led_count: Total number of LEDs.
+        :param verbose: True to print a message for every successful update.
+        :param timeout: Seconds to wait for the device to answer a request.
+        :param realtime_protocol: UDP protocol used by send_frame ("ddp", "dnrgb" or "drgb").
+        :param realtime_port: UDP port override for send_frame.
+        :param json_max_bytes: Largest JSON payload send_pixels produces.
+        :param color_pipeline: Optional ColorPipeline every send_frame and send_pixels frame goes through.
+        """
+        super().__init__(ip, led_count, verbose=verbose, timeout=timeout, realtime_protocol=realtime_protocol,
+                         realtime_port=realtime_port, json_max_bytes=json_max_bytes, color_pipeline=color_pipeline)
+        self.pending = None
+        self.in_flight = False
+        self.coalesced = 0
+        self.failed = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._sender, name="wled-sender", daemon=True)
+        self.thread.start()
+
+    def set_state(self, payload):
+        """
+        Queues a JSON payload, replacing any older payload that has not been sent yet.
+        :param payload: The JSON payload for the WLED state.
+        :return: True once the payload is queued.
+        """
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = payload
+            self.condition.notify_all()
+        return True
+
+    def set_state_sync(self, payload):
+        """
+        Waits for queued updates, then sends a payload and waits for the device to answer.
+        :param payload: The JSON payload for the WLED state.
+        :return: True if the device accepted the update.
+        """
+        self.flush()
+        return super().set_state(payload)
+
+    def send_pixels(self, frame, brightness=255):
+        """
+        Waits for queued updates, then sends a pixel frame synchronously. A frame can
+        span several payloads that must all arrive, so it is never coalesced.
+        :param frame: (led_count, 3) uint8 RGB array.
+        :param brightness: Brightness of the LEDs (0-255).
+        :return: True if the device accepted every part of the update.
+        """
+        self.flush()
+        return super().send_pixels(frame, brightness)
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued update has been sent.
+        :param timeout: Maximum seconds to wait, or None to wait forever.
+        :return: True if the queue drained before the timeout.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and not self.in_flight, timeout)
+
+    def _sender(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                if self.pending is None:
+                    return
+                payload, self.pending = self.pending, None
+                self.in_flight = True
+
+            if not super().set_state(payload):
+                self.failed += 1
+
+            with self.condition:
+                self.in_flight = False
+                self.condition.notify_all()
+
+    def close(self):
+        """
+        Sends any queued update, stops the sender thread and closes the session.
+        """
+        self.flush(timeout=self.timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=self.timeout)
+        super().close()
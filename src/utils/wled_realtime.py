@@ -0,0 +1,166 @@
+import socket
+import struct
+
+import numpy as np
+
+DDP_PORT = 4048
+WLED_UDP_PORT = 21324
+
+DDP_HEADER_LEN = 10
+DDP_MAX_PIXELS = 480  # Largest pixel count WLED accepts per DDP packet
+DDP_FLAG_VER1 = 0x40
+DDP_FLAG_TIMECODE = 0x10
+DDP_FLAG_PUSH = 0x01
+DDP_TYPE_RGB24 = 0x0B
+DDP_ID_DISPLAY = 1
+
+DRGB = 2
+DNRGB = 4
+DRGB_MAX_PIXELS = 490
+DNRGB_MAX_PIXELS = 489
+
+PROTOCOLS = ("ddp", "drgb", "dnrgb")
+
+
+class RealtimeStreamer:
+    def __init__(self, ip, led_count, protocol="ddp", port=None, timeout=2, timecode=False):
+        """
+        Streams full RGB frames to a WLED device over its realtime UDP protocols.
+        :param ip: The IP address of the WLED device.
+        :param led_count: Total number of LEDs.
+        :param protocol: "ddp", "dnrgb" or "drgb".
+        :param port: UDP port, defaults to 4048 for DDP and 21324 for DRGB/DNRGB.
+        :param timeout: Seconds WLED waits after the last packet before resuming its own effects (DRGB/DNRGB).
+        :param timecode: True to reserve a DDP timecode field in every packet, filled per frame by send_frame.
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Invalid realtime protocol '{protocol}'. Use one of {', '.join(PROTOCOLS)}.")
+        if protocol == "drgb" and led_count > DRGB_MAX_PIXELS:
+            raise ValueError(f"DRGB supports at most {DRGB_MAX_PIXELS} LEDs, use 'dnrgb' or 'ddp' instead.")
+
+        self.protocol = protocol
+        self.led_count = led_count
+        self.address = (ip, port or (DDP_PORT if protocol == "ddp" else WLED_UDP_PORT))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.buffer = np.zeros((led_count, 3), dtype=np.uint8)
+        self.sequence = 0
+        self.frames_sent = 0
+
+        # Headers and chunk boundaries never change, so build them once
+        self.headers = []
+        self.chunks = []
+        max_pixels = {"ddp": DDP_MAX_PIXELS, "drgb": DRGB_MAX_PIXELS, "dnrgb": DNRGB_MAX_PIXELS}[protocol]
+        for start in range(0, led_count, max_pixels):
+            stop = min(start + max_pixels, led_count)
+            self.chunks.append((start * 3, stop * 3))
+            if protocol == "ddp":
+                header = bytearray(DDP_HEADER_LEN + (4 if timecode else 0))
+                struct.pack_into(">BBBBIH", header, 0, DDP_FLAG_VER1 | (DDP_FLAG_TIMECODE if timecode else 0), 0,
+                                 DDP_TYPE_RGB24, DDP_ID_DISPLAY, start * 3, (stop - start) * 3)
+            elif protocol == "dnrgb":
+                header = bytearray(struct.pack(">BBH", DNRGB, timeout, start))
+            else:
+                header = bytearray((DRGB, timeout))
+            self.headers.append(header)
+        if protocol == "ddp":
+            self.headers[-1][0] |= DDP_FLAG_PUSH
+        self.timecode = timecode and protocol == "ddp"
+        self.data = None
+
+        # Without scatter/gather sends (Windows) assemble into preallocated packets instead
+        self.packets = None
+        if not hasattr(self.sock, "sendmsg"):
+            self.packets = [bytearray(header) + bytearray(stop - start)
+                            for header, (start, stop) in zip(self.headers, self.chunks)]
+
+    def send_frame(self, buffer=None, timecode=None):
+        """
+        Sends one frame to the device, split into as many packets as needed.
+        :param buffer: (led_count, 3) uint8 RGB array, defaults to the streamer's own buffer.
+        :param timecode: DDP timecode in 1/65536 s units, used when the streamer was built with timecode=True.
+        """
+        self.send_data(buffer, timecode)
+        self.send_push()
+
+    def send_data(self, buffer=None, timecode=None):
+        """
+        Sends every packet of a frame except the last one, which makes WLED show it.
+        Splitting the send lets several devices receive their data first and then
+        get their final packets back to back. Always follow with send_push().
+        :param buffer: (led_count, 3) uint8 RGB array, defaults to the streamer's own buffer.
+        :param timecode: DDP timecode in 1/65536 s units, used when the streamer was built with timecode=True.
+        """
+        frame = self.buffer if buffer is None else buffer
+        if frame.shape != (self.led_count, 3) or frame.dtype != np.uint8 or not frame.flags.c_contiguous:
+            raise ValueError(f"Frame must be a contiguous ({self.led_count}, 3) uint8 array.")
+        self.data = memoryview(frame).cast("B")
+
+        if self.protocol == "ddp":
+            self.sequence = self.sequence % 15 + 1
+            for header in self.headers:
+                header[1] = self.sequence
+                if self.timecode:
+                    struct.pack_into(">I", header, DDP_HEADER_LEN, (timecode or 0) & 0xFFFFFFFF)
+
+        for i in range(len(self.headers) - 1):
+            self._send_packet(i)
+
+    def send_push(self):
+        """
+        Sends the final packet of the frame passed to send_data.
+        """
+        self._send_packet(len(self.headers) - 1)
+        self.data = None
+        self.frames_sent += 1
+
+    def _send_packet(self, i):
+        header = self.headers[i]
+        start, stop = self.chunks[i]
+        if self.packets is None:
+            self.sock.sendmsg([header, self.data[start:stop]], [], 0, self.address)
+        else:
+            packet = self.packets[i]
+            packet[:len(header)] = header
+            packet[len(header):] = self.data[start:stop]
+            self.sock.sendto(packet, self.address)
+
+    def close(self):
+        """
+        Closes the UDP socket.
+        """
+        self.sock.close()
+
+
+def decode_ddp(packet, frame):
+    """
+    Writes the pixel data of a DDP packet into a frame.
+    :param packet: The raw UDP payload.
+    :param frame: (led_count, 3) uint8 array to update.
+    :return: True if the packet has the push flag set (the frame is complete).
+    """
+    flags, _, _, _, offset, length = struct.unpack_from(">BBBBIH", packet, 0)
+    header_len = DDP_HEADER_LEN + (4 if flags & DDP_FLAG_TIMECODE else 0)  # Optional timecode
+    flat = frame.reshape(-1)
+    length = min(length, flat.size - offset, len(packet) - header_len)
+    flat[offset:offset + length] = np.frombuffer(packet, dtype=np.uint8, count=length, offset=header_len)
+    return bool(flags & DDP_FLAG_PUSH)
+
+
+def decode_wled_udp(packet, frame):
+    """
+    Writes the pixel data of a DRGB or DNRGB packet into a frame.
+    :param packet: The raw UDP payload.
+    :param frame: (led_count, 3) uint8 array to update.
+    :return: (first LED index, number of LEDs written).
+    """
+    protocol = packet[0]
+    if protocol == DNRGB:
+        start, header_len = struct.unpack_from(">H", packet, 2)[0], 4
+    elif protocol == DRGB:
+        start, header_len = 0, 2
+    else:
+        raise ValueError(f"Unsupported WLED UDP protocol {protocol}.")
+    count = min((len(packet) - header_len) // 3, len(frame) - start)
+    pixels = np.frombuffer(packet, dtype=np.uint8, count=count * 3, offset=header_len)
+    frame[start:start + count] = pixels.reshape(count, 3)
+    return start, count